@@ -0,0 +1,150 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import vcc_functions
+import vcc_metrics
+import vcc_input
+import numpy
+import argparse
+from timeit import default_timer
+
+# Description:
+# This file compares the property backends of CoolProp on a grid of operating points.
+
+# The grid is solved with calculate_batch on the reference backend, e.g. REFPROP, and on every other backend, e.g.
+# the tabular 'BICUBIC&HEOS' or 'BICUBIC&REFPROP'. For each backend the deviations from the reference of COP2 and
+# the cooling capacity [%] and of the discharge temperature [K] are reported as max and mean of their absolute
+# values together with the speedup of the batch.
+
+# The setup, creating the state and solving a first operating point, is timed separately since it includes building
+# the tables the first time a fluid is used with a tabular backend. CoolProp keeps the tables on disk, later runs
+# only load them. The batch time is taken after the setup with the caches of Vcc cleared.
+
+# Example:
+# python vcc_backends.py R448A --reference REFPROP --backends BICUBIC&REFPROP TTSE&REFPROP
+#
+# import vcc_backends
+#
+# results = vcc_backends.compare('R134a', ['BICUBIC&HEOS', 'TTSE&HEOS'], 'HEOS')
+# vcc_backends.report(results)
+
+# <--- File begin --->
+
+# Constants
+k = 273.15
+
+# Metrics that are compared, relative deviations in percent unless absolute
+deviations = [('cop_2', 'COP2 [%]', False), ('cooling_capacity', 'capacity [%]', False),
+              ('discharge_temperature', 'discharge [K]', True)]
+
+def grid(ev_temperatures=None, co_temperatures=None):
+    # All combinations of the evaporator and condenser temperatures
+    if ev_temperatures is None:
+        ev_temperatures = numpy.linspace(-40, 0, 9) + k
+
+    if co_temperatures is None:
+        co_temperatures = numpy.array([25, 35, 45]) + k
+
+    ev_temperatures, co_temperatures = numpy.meshgrid(ev_temperatures, co_temperatures)
+
+    return ev_temperatures.ravel(), co_temperatures.ravel()
+
+def run(refrigerant_data, ev_temperatures, co_temperatures, compressor_data, input_data=None):
+    # The batch of one backend with the setup and batch times [s]
+    start = default_timer()
+
+    vcc = vcc_functions.Vcc(refrigerant_data, shared=False)
+    vcc.set_input_data(input_data if input_data is not None else vcc_input.manual())
+    vcc.set_compressor_data(compressor_data)
+    vcc.set_input('ev_temperature', ev_temperatures[0])
+    vcc.set_input('co_temperature', co_temperatures[0])
+    vcc.calculate()
+
+    setup = default_timer() - start
+
+    # The first point is not taken from the cache
+    vcc.clear_cache()
+
+    start = default_timer()
+    batch = vcc.calculate_batch(ev_temperatures, co_temperatures, errors='record')
+
+    return batch, setup, default_timer() - start
+
+def compare(name, backends, reference=None, ev_temperatures=None, co_temperatures=None, compressor_data=0.7,
+            input_data=None):
+    # Deviations and speedup of every backend from the reference, by backend
+    if reference is None:
+        reference = vcc_input.default_backend
+
+    ev_temperatures, co_temperatures = grid(ev_temperatures, co_temperatures)
+
+    baseline, setup, time = run(vcc_input.refrigerant(name, reference), ev_temperatures, co_temperatures,
+                                compressor_data, input_data)
+
+    results = {reference: {'setup': setup, 'time': time, 'speedup': 1.0, 'failed': int(numpy.sum(baseline.failed()))}}
+
+    for backend in backends:
+        try:
+            batch, setup, time = run(vcc_input.refrigerant(name, backend), ev_temperatures, co_temperatures,
+                                     compressor_data, input_data)
+        except Exception as error:
+            print('Compare backends: ' + backend + ' failed, ' + error.__class__.__name__ + ': ' + str(error))
+            continue
+
+        results[backend] = {'setup': setup, 'time': time, 'speedup': results[reference]['time'] / time,
+                            'failed': int(numpy.sum(batch.failed()))}
+
+        for metric, label, absolute in deviations:
+            if absolute:
+                deviation = vcc_metrics.evaluate(metric, batch) - vcc_metrics.evaluate(metric, baseline)
+            else:
+                deviation = vcc_metrics.evaluate(metric + '_relative', batch, baseline)
+
+            deviation = numpy.abs(deviation[numpy.isfinite(deviation)])
+
+            if len(deviation) == 0:
+                results[backend][metric] = {'max': numpy.nan, 'mean': numpy.nan}
+            else:
+                results[backend][metric] = {'max': float(deviation.max()), 'mean': float(deviation.mean())}
+
+    return results
+
+def report(results, reference=None):
+    # One row per backend, the reference first
+    if reference is None:
+        reference = [backend for backend in results if deviations[0][0] not in results[backend]][0]
+
+    print('%-18s %9s %9s %8s %6s' % ('backend', 'setup [s]', 'batch [s]', 'speedup', 'failed') +
+          ''.join([' %20s' % label for metric, label, absolute in deviations]))
+    print('%-18s %9s %9s %8s %6s' % ('', '', '', '', '') + ''.join([' %9s %10s' % ('max', 'mean')
+                                                                    for metric in deviations]))
+
+    for backend in [reference] + sorted([backend for backend in results if backend != reference]):
+        result = results[backend]
+        row = '%-18s %9.3f %9.3f %8.2f %6d' % (backend, result['setup'], result['time'], result['speedup'],
+                                                result['failed'])
+
+        for metric, label, absolute in deviations:
+            if metric in result:
+                row += ' %9.2e %10.2e' % (result[metric]['max'], result[metric]['mean'])
+
+        print(row)
+
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Accuracy and speed of CoolProp property backends')
+    parser.add_argument('refrigerant', help='Refrigerant of vcc_input.refrigerant(), e.g. R448A')
+    parser.add_argument('--reference', default=vcc_input.default_backend, help='Backend the others are compared to')
+    parser.add_argument('--backends', nargs='+', default=['BICUBIC&REFPROP', 'TTSE&REFPROP'],
+                        help='Backends to compare, e.g. HEOS BICUBIC&HEOS TTSE&HEOS')
+    parser.add_argument('--compressor', default='0.7',
+                        help='Compressor file of the catalog or an isentropic efficiency')
+    arguments = parser.parse_args()
+
+    try:
+        compressor_data = float(arguments.compressor)
+    except ValueError:
+        compressor_data = arguments.compressor
+
+    report(compare(arguments.refrigerant, arguments.backends, arguments.reference, compressor_data=compressor_data),
+           arguments.reference)
@@ -0,0 +1,263 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import vcc_functions
+import vcc_input
+import vcc_catalog
+import vcc_saturation
+import vcc_cache
+import CoolProp
+import numpy
+import argparse
+import platform
+import timeit
+import tempfile
+import xlwt
+import json
+import time
+import sys
+import os
+
+# Description:
+# This file benchmarks the hot paths of the cycle model.
+
+# The benchmarks run on the HEOS backend bundled with CoolProp, no REFPROP license is needed, with R134a as a pure
+# fluid. The compressor is a synthetic EN 12900 polynomial, written to xls files laid out as the Bitzer files in
+# input/compressor of a temporary folder, so no compressor data is needed either. The benchmarks run in that folder
+# and read the files through vcc_catalog like any other compressor. Every benchmark is timed with timeit as the best
+# and mean of a number of repeats.
+
+# The results are written as JSON together with the versions of Python, numpy and CoolProp. Two result files, e.g.
+# of two commits, are compared with --compare and slower benchmarks are marked.
+
+# Example:
+# python vcc_benchmark.py --output before.json
+# python vcc_benchmark.py --output after.json
+# python vcc_benchmark.py --compare before.json after.json
+
+# <--- File begin --->
+
+# Constants
+k = 273.15
+
+refrigerant_data = ['R134a', 'HEOS', 'R134a', [1.0], 'HEOS::R134a']
+
+# Synthetic compressor, a mass flow [kg/h] and a specific work [J/kg] with to and tc in C that make up EN 12900
+# polynomials of cubic order at most
+def synthetic_compressor():
+    to, tc = numpy.meshgrid(numpy.linspace(-40, 10, 11), numpy.linspace(20, 60, 9))
+
+    mass_flow_rate = 600 + 15 * to - 2 * tc + 0.1 * to ** 2
+    specific_work = 25e3 + 700 * (tc - to)
+
+    power = mass_flow_rate / 3600 * specific_work
+    capacity = mass_flow_rate / 3600 * 150e3
+    current = power / 400
+
+    # Least squares fit of the ten parameters, exact for these polynomials
+    basis = vcc_functions.monomials(to.ravel() + k, tc.ravel() + k).reshape(10, -1).T
+    parameters = [numpy.linalg.lstsq(basis, y.ravel(), rcond=-1)[0] for y in (capacity, power, mass_flow_rate,
+                                                                                 current)]
+
+    return numpy.array(parameters)
+
+compressor_name = 'R134a-BENCH-1.xls'
+compressor_limits = [-40 + k, 10 + k, 20 + k, 60 + k]
+
+# Temporary folder with the synthetic compressor files of this process
+_folder = []
+
+def write_xls(path, refrigerant, parameters, limits):
+    # A compressor file with the cells that vcc_catalog.read_xls() reads, the limits in C
+    workbook = xlwt.Workbook()
+    worksheet = workbook.add_sheet('Compressor')
+
+    worksheet.write(12, 3, refrigerant)
+
+    for r in range(0, 4):
+        for c in range(0, 10):
+            worksheet.write(27 + r, 1 + c, float(parameters[r, c]))
+
+    worksheet.write(34, 3, limits[0] - k)
+    worksheet.write(34, 5, limits[1] - k)
+    worksheet.write(35, 3, limits[2] - k)
+    worksheet.write(35, 5, limits[3] - k)
+
+    workbook.save(path)
+
+    return True
+
+def fixtures(folder, variants=8):
+    # The synthetic compressor and super heating variants of it in folder/input/compressor
+    path = os.path.join(folder, 'input', 'compressor')
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    parameters = synthetic_compressor()
+    names = [compressor_name] + ['R134a-BENCH-1-Super-%d.xls' % (5 * i) for i in range(1, variants)]
+
+    for name in names:
+        write_xls(os.path.join(path, name), 'R134a', parameters, compressor_limits)
+
+    return path
+
+def setup():
+    # A Vcc with the synthetic compressor and the pressure loop caches turned off
+    # The working directory is changed to the folder of the compressor files, vcc_catalog reads them from there
+    if not _folder:
+        _folder.append(tempfile.mkdtemp(prefix='vcc_benchmark_'))
+        fixtures(_folder[0])
+
+    os.chdir(_folder[0])
+
+    vcc = vcc_functions.Vcc(refrigerant_data)
+    vcc.set_input_data(vcc_input.manual())
+    vcc.set_input('ev_temperature', -10 + k)
+    vcc.set_input('co_temperature', 40 + k)
+    vcc.set_compressor_data(compressor_name)
+    vcc.set_cache_size(0)
+    vcc.calculate()
+
+    return vcc
+
+def benchmarks(vcc):
+    # Benchmarks by name, each a function without arguments and the number of calls per repeat
+    random = numpy.random.RandomState(0)
+
+    def condenser():
+        vcc._recalculate_condenser = True
+        vcc.calculate_condenser()
+
+    def evaporator():
+        vcc._recalculate_evaporator = True
+        vcc.calculate_evaporator()
+
+    def calculate():
+        vcc._recalculate_condenser = True
+        vcc._recalculate_evaporator = True
+        vcc.calculate()
+
+    compressor = vcc_functions.Compressor()
+    compressor.set(compressor_name)
+
+    folder = os.path.join(_folder[0], 'input', 'compressor')
+
+    def catalog_scan():
+        # All files read again and indexed
+        if os.path.isfile(os.path.join(folder, vcc_catalog.index_name)):
+            os.remove(os.path.join(folder, vcc_catalog.index_name))
+
+        vcc_catalog.Catalog(folder)
+
+    ev_grid, co_grid = numpy.meshgrid(numpy.linspace(-40, 10, 100) + k, numpy.linspace(20, 60, 100) + k)
+
+    # Two noisy series with a number of crossings
+    a_x = numpy.sort(random.uniform(0, 100, 1000))
+    b_x = numpy.sort(random.uniform(0, 100, 1000))
+    a_y = numpy.sin(a_x) + random.normal(0, 0.1, 1000)
+    b_y = numpy.cos(b_x) + random.normal(0, 0.1, 1000)
+
+    ev_temperatures = numpy.linspace(-30, 0, 10) + k
+    co_temperatures = numpy.array([35, 45]) + k
+
+    def sweep():
+        vcc.calculate_batch(numpy.tile(ev_temperatures, len(co_temperatures)),
+                            numpy.repeat(co_temperatures, len(ev_temperatures)))
+
+    return [
+        ('vcc_init', lambda: vcc_functions.Vcc(refrigerant_data), 10),
+        ('vcc_init_unshared', lambda: vcc_functions.Vcc(refrigerant_data, shared=False), 3),
+        ('calculate_condenser', condenser, 20),
+        ('calculate_evaporator', evaporator, 20),
+        ('calculate', calculate, 20),
+        ('read_xls', lambda: vcc_catalog.read_xls(os.path.join(folder, compressor_name)), 100),
+        ('catalog_scan', catalog_scan, 3),
+        ('catalog_load', lambda: vcc_catalog.Catalog(folder), 100),
+        ('compressor_set', lambda: compressor.set(compressor_name), 1000),
+        ('compressor_core', lambda: compressor.core(0, -10 + k, 40 + k), 1000),
+        ('compressor_evaluate_10000', lambda: compressor.evaluate(ev_grid, co_grid), 100),
+        ('saturation_dome', lambda: vcc_saturation.dome(vcc._refrigerant, 0.5e5, 40), 3),
+        ('data_intersect_1000', lambda: vcc_functions.data_intersect(a_x, a_y, b_x, b_y), 100),
+        ('sweep_20', sweep, 1)
+    ]
+
+def run(repeat=5, names=None):
+    # Time the benchmarks, a benchmark that fails is recorded with its error
+    working_directory = os.getcwd()
+    vcc = setup()
+    results = {}
+
+    # Arrays persisted by vcc_cache are kept in the temporary folder, not in the working directory of the caller
+    cache_folder = vcc_cache.folder
+    vcc_cache.folder = os.path.join(_folder[0], 'cache')
+
+    try:
+        for name, function, number in benchmarks(vcc):
+            if names and name not in names:
+                continue
+
+            try:
+                times = numpy.array(timeit.Timer(function).repeat(repeat, number)) / number
+                results[name] = {'best': times.min(), 'mean': times.mean(), 'repeat': repeat, 'number': number}
+                print('%-28s best %12.6f ms   mean %12.6f ms' % (name, times.min() * 1e3, times.mean() * 1e3))
+            except Exception as error:
+                results[name] = {'error': error.__class__.__name__ + ': ' + str(error)}
+                print('%-28s error %s' % (name, results[name]['error']))
+    finally:
+        vcc_cache.folder = cache_folder
+        os.chdir(working_directory)
+
+    return {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'coolprop': CoolProp.__version__,
+        'platform': platform.platform(),
+        'results': results
+    }
+
+def compare(before, after, threshold=0.1):
+    # Ratio of the best times, benchmarks more than threshold slower are marked
+    print('%-28s %12s %12s %8s' % ('benchmark', 'before [ms]', 'after [ms]', 'ratio'))
+
+    slower = []
+
+    for name in sorted(set(before['results']) | set(after['results'])):
+        a = before['results'].get(name, {}).get('best', numpy.nan)
+        b = after['results'].get(name, {}).get('best', numpy.nan)
+        ratio = b / a if a > 0 else numpy.nan
+
+        if ratio > 1 + threshold:
+            slower.append(name)
+
+        print('%-28s %12.6f %12.6f %8.2f %s' % (name, a * 1e3, b * 1e3, ratio, '<-- slower' if name in slower else ''))
+
+    return slower
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks of the cycle model on CoolProp HEOS')
+    parser.add_argument('--output', help='JSON file to write the results to')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of repeats of every benchmark')
+    parser.add_argument('--only', nargs='*', help='Names of the benchmarks to run')
+    parser.add_argument('--compare', nargs='+', metavar='JSON',
+                        help='Compare two result files, or one with a new run')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Relative slow down that is marked')
+    arguments = parser.parse_args()
+
+    if arguments.compare:
+        with open(arguments.compare[0], 'r') as stream:
+            before = json.load(stream)
+
+        if len(arguments.compare) > 1:
+            with open(arguments.compare[1], 'r') as stream:
+                after = json.load(stream)
+        else:
+            after = run(arguments.repeat, arguments.only)
+
+        sys.exit(1 if compare(before, after, arguments.threshold) else 0)
+
+    results = run(arguments.repeat, arguments.only)
+
+    if arguments.output:
+        with open(arguments.output, 'w') as stream:
+            json.dump(results, stream, indent=1, sort_keys=True)
@@ -0,0 +1,117 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import vcc_saturation
+import numpy
+import collections
+import hashlib
+import tempfile
+import os
+
+# Description:
+# This file contains the caches used to avoid solving the same thing twice.
+
+# LruCache is a bounded memo of the least recently used kind. Vcc keeps one for the condenser and one for the
+# evaporator solutions, keyed by the inputs each of them depends on.
+
+# persisted() keeps arrays on disk in the cache folder, content addressed by the hash of what they are computed from,
+# and loads them memory mapped. saturation_dome() uses it for the bubble and dew curves of the envelope plots,
+# which only depend on the fluid, its composition and the resolution. Set folder to None to turn it off.
+
+# <--- File begin --->
+
+# Folder of the persisted arrays
+folder = os.path.join(os.getcwd(), 'cache')
+
+# Least recently used cache with hit and miss counters
+class LruCache:
+
+    def __init__(self, size=256):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+        self._items = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        # The value of key or None, a hit moves the key to the most recently used end
+        if key in self._items:
+            value = self._items.pop(key)
+            self._items[key] = value
+            self.hits += 1
+
+            return value
+
+        self.misses += 1
+
+        return None
+
+    def put(self, key, value):
+        if self.size <= 0:
+            return False
+
+        self._items.pop(key, None)
+        self._items[key] = value
+
+        # Drop the least recently used
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+        return True
+
+    def clear(self):
+        self._items.clear()
+
+        return True
+
+    def info(self):
+        lookups = self.hits + self.misses
+
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._items), 'size': self.size,
+                'hit_rate': float(self.hits) / lookups if lookups > 0 else 0.0}
+
+def persisted(key, compute, valid=None):
+    # The array of compute(), stored under the hash of key and memory mapped when loaded again
+    # With valid, a function of the array, an array that is not valid is returned but not stored
+    if folder is None:
+        return compute()
+
+    path = os.path.join(folder, hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.npy')
+
+    if os.path.isfile(path):
+        return numpy.load(path, mmap_mode='r')
+
+    array = compute()
+
+    if valid is not None and not valid(array):
+        return array
+
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    # Write to a temporary file that is renamed when complete
+    handle, temporary = tempfile.mkstemp(suffix='.npy', dir=folder)
+
+    with os.fdopen(handle, 'wb') as stream:
+        numpy.save(stream, array)
+
+    try:
+        os.rename(temporary, path)
+    except OSError:
+        # Written by another process in the meantime (Windows does not rename onto an existing file)
+        os.remove(temporary)
+
+    return array
+
+def saturation_dome(refrigerant, refrigerant_data, p_min, resolution):
+    # Bubble and dew curves of vcc_saturation.dome() for the refrigerant, computed once per composition
+    key = ('dome', refrigerant_data[1], refrigerant_data[2], tuple([float(f) for f in refrigerant_data[3]]),
+           float(p_min), int(resolution))
+
+    curves = persisted(key, lambda: vcc_saturation.dome(refrigerant, p_min, resolution))
+
+    return {'T': curves[0],
+            'bubble_p': curves[1], 'bubble_h': curves[2], 'bubble_s': curves[3],
+            'dew_p': curves[4], 'dew_h': curves[5], 'dew_s': curves[6]}
@@ -0,0 +1,226 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import xlrd as xlrd
+import numpy
+import tempfile
+import os
+
+# Description:
+# This file contains the catalog of compressor data, parsed once from the Bitzer xls files.
+
+# The xls files in input/compressor are read once and their polynomial parameters, application limits and refrigerant
+# names are kept in the index file catalog.npz in the same folder. A file is read again only when its modification
+# time or size has changed, also while a process is running. Compressor.set(filename) then is a dictionary lookup
+# and a stat of the file. A file that can not be read, e.g. a lock file of Excel, is reported and skipped, and read
+# again only when it has changed.
+
+# The file names follow <refrigerant>-<model>[-<Sub|Super>-<value>].xls, e.g. R404A-4GE-30Y-Super-10.xls, and can
+# also be looked up by (refrigerant, model, variant).
+
+# Example:
+# import vcc_catalog
+#
+# catalog = vcc_catalog.default()
+# entry = catalog.lookup('R404A', '4GE-30Y', 'Super-10')
+# print(entry['parameters'])
+
+# <--- File begin --->
+
+# Constants
+k = 273.15
+
+# Index file in the compressor folder
+index_name = 'catalog.npz'
+
+# Catalogs by folder
+_catalogs = {}
+
+def read_xls(path):
+    # https://www.bitzer.de/websoftware/Calculate.aspx
+    workbook = xlrd.open_workbook(path)
+
+    # Set working sheet
+    worksheet = workbook.sheet_by_index(0)
+
+    parameters = numpy.zeros((4, 10), numpy.float)
+
+    # Polynomial parameters
+    for r in range(0, 4):
+        for c in range(0, 10):
+            parameters[r, c] = worksheet.cell_value(27 + r, 1 + c)
+
+    # Boundaries, evaporator min max and condenser min max
+    limits = numpy.array([worksheet.cell_value(34, 3) + k, worksheet.cell_value(34, 5) + k,
+                          worksheet.cell_value(35, 3) + k, worksheet.cell_value(35, 5) + k])
+
+    return {'refrigerant': worksheet.cell_value(12, 3), 'parameters': parameters, 'limits': limits}
+
+def split_name(filename):
+    # Refrigerant, model and variant of a file name
+    parts = os.path.splitext(os.path.basename(filename))[0].split('-')
+
+    if len(parts) >= 4 and parts[-2] in ('Sub', 'Super'):
+        return parts[0], '-'.join(parts[1:-2]), '-'.join(parts[-2:])
+
+    return parts[0], '-'.join(parts[1:]), None
+
+class Catalog:
+
+    def __init__(self, folder):
+        self.folder = folder
+
+        # Entries by file name, and file names by refrigerant, model and variant
+        self.entries = {}
+        self._names = {}
+
+        # Modification time and size of the files that could not be read, by file name
+        self._failed = {}
+
+        self.load()
+        self.scan()
+
+    def load(self):
+        # Read the index file
+        path = os.path.join(self.folder, index_name)
+
+        if not os.path.isfile(path):
+            return False
+
+        index = numpy.load(path)
+
+        for i in range(0, len(index['names'])):
+            self._put(str(index['names'][i]), {
+                'refrigerant': str(index['refrigerants'][i]),
+                'parameters': index['parameters'][i],
+                'limits': index['limits'][i],
+                'mtime': float(index['mtimes'][i]),
+                'size': int(index['sizes'][i])
+            })
+
+        return True
+
+    def save(self):
+        # Write the index file through a temporary file
+        if not os.path.isdir(self.folder):
+            return False
+
+        # Entries without xls file are not indexed
+        names = sorted([n for n in self.entries if self.entries[n]['mtime'] >= 0])
+
+        handle, temporary = tempfile.mkstemp(suffix='.npz', dir=self.folder)
+
+        with os.fdopen(handle, 'wb') as stream:
+            numpy.savez(stream,
+                        names=numpy.array(names, dtype='U'),
+                        refrigerants=numpy.array([self.entries[n]['refrigerant'] for n in names], dtype='U'),
+                        parameters=numpy.array([self.entries[n]['parameters'] for n in names]).reshape(-1, 4, 10),
+                        limits=numpy.array([self.entries[n]['limits'] for n in names]).reshape(-1, 4),
+                        mtimes=numpy.array([self.entries[n]['mtime'] for n in names]),
+                        sizes=numpy.array([self.entries[n]['size'] for n in names]))
+
+        path = os.path.join(self.folder, index_name)
+
+        # Windows does not rename onto an existing file
+        if os.name == 'nt' and os.path.isfile(path):
+            os.remove(path)
+
+        os.rename(temporary, path)
+
+        return True
+
+    def scan(self):
+        # Read the xls files that are new or changed since they were indexed, forget the removed ones
+        if not os.path.isdir(self.folder):
+            return False
+
+        changed = False
+        names = [n for n in os.listdir(self.folder) if n.split(".")[-1] == 'xls']
+
+        for name in names:
+            status = os.stat(os.path.join(self.folder, name))
+            entry = self.entries.get(name)
+
+            if entry is None or entry['mtime'] != status.st_mtime or entry['size'] != status.st_size:
+                if self._failed.get(name) == (status.st_mtime, status.st_size):
+                    continue
+
+                try:
+                    entry = read_xls(os.path.join(self.folder, name))
+                except Exception as error:
+                    print('Compressor data: ' + name + ' skipped, ' + error.__class__.__name__ + ': ' + str(error))
+                    self._failed[name] = (status.st_mtime, status.st_size)
+                    continue
+
+                self._failed.pop(name, None)
+                entry['mtime'] = status.st_mtime
+                entry['size'] = status.st_size
+
+                self._put(name, entry)
+                changed = True
+
+                print('Loaded compressor data: ' + name)
+
+        for name in list(self.entries.keys()):
+            if name not in names and self.entries[name]['mtime'] >= 0:
+                del self._names[split_name(name)]
+                del self.entries[name]
+                changed = True
+
+        if changed:
+            self.save()
+
+        return changed
+
+    def add(self, name, refrigerant, parameters, limits):
+        # An entry without xls file, e.g. synthetic data, it is kept in memory only
+        self._put(name, {'refrigerant': refrigerant, 'parameters': numpy.asarray(parameters, numpy.float),
+                         'limits': numpy.asarray(limits, numpy.float), 'mtime': -1.0, 'size': 0})
+
+        return True
+
+    def _put(self, name, entry):
+        self.entries[name] = entry
+        self._names[split_name(name)] = name
+
+    def changed(self, name):
+        # Has the xls file of an entry been changed or removed since it was read
+        entry = self.entries[name]
+
+        # Entries without xls file do not change
+        if entry['mtime'] < 0:
+            return False
+
+        try:
+            status = os.stat(os.path.join(self.folder, name))
+        except OSError:
+            return True
+
+        return entry['mtime'] != status.st_mtime or entry['size'] != status.st_size
+
+    def get(self, name):
+        # Entry by file name, None if there is no such file
+        if name not in self.entries or self.changed(name):
+            self.scan()
+
+        return self.entries.get(name)
+
+    def lookup(self, refrigerant, model, variant=None):
+        # Entry by refrigerant, model and sub cooling or super heating variant
+        name = self._names.get((refrigerant, model, variant))
+
+        if name is None:
+            return None
+
+        if self.changed(name):
+            self.scan()
+
+        return self.entries.get(name)
+
+def default():
+    # The catalog of input/compressor in the working directory
+    folder = os.path.join(os.getcwd(), 'input', 'compressor')
+
+    if folder not in _catalogs:
+        _catalogs[folder] = Catalog(folder)
+
+    return _catalogs[folder]
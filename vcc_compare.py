@@ -2,7 +2,11 @@ __author__ = 'PeterE-Mac'
 
 import vcc_input
 import vcc_functions
+import vcc_sweep
+import vcc_store
+import vcc_export
 import numpy
+import multiprocessing
 import time
 import pprint
 import matplotlib.pyplot as pyplot
@@ -48,8 +52,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'COP2',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"VCC_"+aref+".cop_2()"',
+            'x':'ev_temperature',
+            'y':'cop_2',
             'calc_intersect':True
         },
         {
@@ -57,8 +61,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'COP2',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"(VCC_"+aref+".cop_2()-VCC_"+ref+".cop_2())/VCC_"+ref+".cop_2()*1e2"'
+            'x':'ev_temperature',
+            'y':'cop_2_relative'
         },
 
 
@@ -69,8 +73,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'volumetric',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"VCC_"+aref+".volumetric_cooling_capacity()/1e3"',
+            'x':'ev_temperature',
+            'y':'volumetric_cooling_capacity',
             'calc_intersect':True
         },
         {
@@ -78,8 +82,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'volumetric',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"(VCC_"+aref+".volumetric_cooling_capacity()-VCC_"+ref+".volumetric_cooling_capacity())/VCC_"+ref+".volumetric_cooling_capacity()*1e2"'
+            'x':'ev_temperature',
+            'y':'volumetric_cooling_capacity_relative'
         },
 
         # Discharge temperature
@@ -88,16 +92,16 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'discharge',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"VCC_"+aref+".discharge_temperature() - k"'
+            'x':'ev_temperature',
+            'y':'discharge_temperature'
         },
         {
             'name':'Discharge-temperature_MR',
             'xlabel':'evaporator',
             'ylabel':'discharge',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"(VCC_"+aref+".discharge_temperature()-VCC_"+ref+".discharge_temperature())/(VCC_"+ref+".discharge_temperature()-k)*1e2"'
+            'x':'ev_temperature',
+            'y':'discharge_temperature_relative'
         },
 
         # Mass flow rate
@@ -106,16 +110,16 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'massflowrate',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"VCC_"+aref+".mass_flow_rate()*3600"'
+            'x':'ev_temperature',
+            'y':'mass_flow_rate'
         },
         {
             'name':'Mass-flow-rate_MR',
             'xlabel':'evaporator',
             'ylabel':'massflowrate',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"(VCC_"+aref+".mass_flow_rate()-VCC_"+ref+".mass_flow_rate())/VCC_"+ref+".mass_flow_rate()*1e2"'
+            'x':'ev_temperature',
+            'y':'mass_flow_rate_relative'
         },
 
         # Volumetric flow rate
@@ -124,16 +128,16 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'volumetricflowrate',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"VCC_"+aref+".volumetric_flow_rate()*3600"'
+            'x':'ev_temperature',
+            'y':'volumetric_flow_rate'
         },
         {
             'name':'Volumetric-flow-rate_MR',
             'xlabel':'evaporator',
             'ylabel':'volumetricflowrate',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"(VCC_"+aref+".volumetric_flow_rate()-VCC_"+ref+".volumetric_flow_rate())/VCC_"+ref+".volumetric_flow_rate()*1e2"'
+            'x':'ev_temperature',
+            'y':'volumetric_flow_rate_relative'
         },
 
         # Isentropic efficiency
@@ -142,8 +146,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'isentropic',
             'tc':t_cond_mid,
-            'xfunc':'"VCC_"+aref+".p(1)/VCC_"+aref+".p(0)"',
-            'yfunc':'"VCC_"+aref+".isentropic_efficiency()"',
+            'x':'pressure_ratio',
+            'y':'isentropic_efficiency',
             'calc_intersect':True
         },
         {
@@ -151,8 +155,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'isentropic',
             'tc':t_cond_mid,
-            'xfunc':'"VCC_"+aref+".p(1)/VCC_"+aref+".p(0)"',
-            'yfunc':'"(VCC_"+aref+".isentropic_efficiency()-VCC_"+ref+".isentropic_efficiency())/VCC_"+ref+".isentropic_efficiency()*1e2"'
+            'x':'pressure_ratio',
+            'y':'isentropic_efficiency_relative'
         },
 
         # Specific power
@@ -161,8 +165,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'enthaplyrise',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"VCC_"+aref+"._compressor.specific_power()"',
+            'x':'ev_temperature',
+            'y':'specific_power',
             'calc_intersect':True
         },
         {
@@ -170,8 +174,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'enthaplyrise',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"(VCC_"+aref+"._compressor.specific_power()-VCC_"+ref+"._compressor.specific_power())/VCC_"+ref+"._compressor.specific_power()*1e2"'
+            'x':'ev_temperature',
+            'y':'specific_power_relative'
         },
 
         # Cooling capacity
@@ -180,8 +184,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'refrigeratingcapacity',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"VCC_"+aref+".cooling_capacity()/1e3"',
+            'x':'ev_temperature',
+            'y':'cooling_capacity',
             'calc_intersect':True
         },
         {
@@ -189,8 +193,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'refrigeratingcapacity',
             'tc':t_cond_mid,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"(VCC_"+aref+".cooling_capacity()-VCC_"+ref+".cooling_capacity())/VCC_"+ref+".cooling_capacity()*1e2"'
+            'x':'ev_temperature',
+            'y':'cooling_capacity_relative'
         },
 
         # <--- High temperature --->
@@ -201,8 +205,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'COP2',
             'tc':t_cond_high,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"VCC_"+aref+".cop_2()"',
+            'x':'ev_temperature',
+            'y':'cop_2',
             'calc_intersect':True
         },
         {
@@ -210,9 +214,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'COP2',
             'tc':t_cond_high,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"(VCC_"+aref+".cop_2()-VCC_"+ref+".cop_2())/VCC_"+ref+".cop_2()*100"'
-            #'yfunc':'"VCC_"+aref+".cop_2()/VCC_"+ref+".cop_2()"'
+            'x':'ev_temperature',
+            'y':'cop_2_relative'
         },
 
         # Isentropic efficiency
@@ -221,8 +224,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'isentropic',
             'tc':t_cond_high,
-            'xfunc':'"VCC_"+aref+".p(1)/VCC_"+aref+".p(0)"',
-            'yfunc':'"VCC_"+aref+".isentropic_efficiency()"',
+            'x':'pressure_ratio',
+            'y':'isentropic_efficiency',
             'calc_intersect':True
         },
 
@@ -232,8 +235,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'isentropic',
             'tc':t_cond_high,
-            'xfunc':'"VCC_"+aref+".p(1)/VCC_"+aref+".p(0)"',
-            'yfunc':'"(VCC_"+aref+".isentropic_efficiency()-VCC_"+ref+".isentropic_efficiency())/VCC_"+ref+".isentropic_efficiency()*1e2"'
+            'x':'pressure_ratio',
+            'y':'isentropic_efficiency_relative'
         },
 
         # Cooling capacity
@@ -242,8 +245,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'refrigeratingcapacity',
             'tc':t_cond_high,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"VCC_"+aref+".cooling_capacity()/1e3"',
+            'x':'ev_temperature',
+            'y':'cooling_capacity',
             'calc_intersect':True
         },
         {
@@ -251,8 +254,8 @@ ops = [
             'xlabel':'evaporator',
             'ylabel':'refrigeratingcapacity',
             'tc':t_cond_high,
-            'xfunc':'te+"-"+k',
-            'yfunc':'"(VCC_"+aref+".cooling_capacity()-VCC_"+ref+".cooling_capacity())/VCC_"+ref+".cooling_capacity()*1e2"'
+            'x':'ev_temperature',
+            'y':'cooling_capacity_relative'
         },
 
       ]
@@ -262,86 +265,65 @@ values = dict()
 folder = '../../Report/LaTeX/data/'
 #folder = './test/'
 
-# Instantiate Vcc:s for each refrigerant
-for r in range(0, len(refs)):
-    locals()["REF_" + refs[r]] = vcc_input.refrigerant(refs[r])
-    locals()["VCC_" + refs[r]] = vcc_functions.Vcc(locals()["REF_" + refs[r]])
-
-    locals()["VCC_" + refs[r]].set_input_data(input_data)
+# Columnar store of the sweep results
+store_folder = './results/compare/'
+checkpoint_folder = './results/checkpoint/'
 
-    locals()["VCC_" + refs[r]].set_compressor_data(refs[r] + compressor_extension)
-    #locals()["VCC_" + refs[r]].set_compressor_data(1.0)
+# Worker processes of the sweep
+jobs = multiprocessing.cpu_count()
 
+# Solve all operating points of all refrigerants in parallel
+# Condenser temperature outer and evaporator temperature inner as the serial loops
+points = vcc_sweep.grid([t_cond_mid, t_cond_high], t_evap)
+# Solved chunks are kept in the checkpoint folder, an interrupted run continues where it stopped
+results = vcc_sweep.run(points, refs, [refs[r] + compressor_extension for r in range(0, len(refs))], input_data, jobs,
+                        checkpoint=checkpoint_folder)
 
-#locals()["VCC_" + refs[1]].set_super_heating(input_data['ev_super_heat']-0.8/3)
-#locals()["VCC_" + refs[2]].set_super_heating(input_data['ev_super_heat']-0.8/3)
+# Keep the results in the columnar store, the .dat files are derived from it
+store = vcc_store.Store(store_folder, overwrite=True)
 
-# Open file streams and write first row
 for r in range(0, len(refs)):
+    store.append(refs[r], results[refs[r]])
     values[refs[r]] = dict()
 
-    for o in range(0, len(ops)):
-        filename = str("%s_%s" % (ops[o]['name'], refs[r]))
-        path = str("%s%s.dat" % (folder, filename))
-        #print("Opened file: " + filename)
-
-        locals()[str("FILE_%s_%s" % (ops[o]['name'], refs[r]))] = open(path, 'w+')
-        locals()[str("FILE_%s_%s" % (ops[o]['name'], refs[r]))].write(ops[o]['xlabel']+" "+ops[o]['ylabel']+"\n")
-
-        values[refs[r]][o] = {
-                            'xvalue': numpy.zeros(t_evap_res),
-                            'yvalue': numpy.zeros(t_evap_res),
-                             }
-
-    #print(" ")
+# Files to export
+files = []
 
 # Loop through condenser temperatures
 for t_cond_act in [t_cond_mid, t_cond_high]:
     print("Tc: " + str(t_cond_act))
-    # Loop through evaporator temperatures
-    for e in range(0, len(t_evap)):
-        print("  Te: " + str(t_evap[e]))
-        # Loop through refrigerants
-        for r in range(0, len(refs)):
-            # Set condenser temperature
-            locals()["VCC_" + refs[r]].set_condenser_temperature(t_cond_act)
-
-            # Set evaporator temperature
-            locals()["VCC_" + refs[r]].set_evaporator_temperature(t_evap[e])
 
-            # Calculate Vcc
-            locals()["VCC_" + refs[r]].calculate()
+    # Loop through refrigerants
+    for r in range(0, len(refs)):
+        # Loop through all operations
+        for o in range(0, len(ops)):
+            if ops[o]['tc'] == t_cond_act:
+                path = str("%s%s_%s.dat" % (folder, ops[o]['name'], refs[r]))
 
-            # Loop through all operations
-            for o in range(0, len(ops)):
-                if ops[o]['tc'] == t_cond_act:
-                    xvalue = eval(eval(ops[o]['xfunc'], {}, {'te': str(t_evap[e]), 'k': str(k), 'ref': refs[0], 'aref': refs[r]}))
-                    yvalue = eval(eval(ops[o]['yfunc'], {}, {'ref': refs[0], 'aref': refs[r]}))
+                # Relative metrics compare with the first refrigerant
+                files.append(store.dat(path, refs[r], ops[o]['x'], ops[o]['y'], ops[o]['xlabel'], ops[o]['ylabel'],
+                                       where={'co_temperature': t_cond_act}, baseline=refs[0]))
 
-                    locals()[str("FILE_%s_%s" % (ops[o]['name'], refs[r]))].write(
-                        str("%f %f\n" % (xvalue, yvalue))
-                    )
+                values[refs[r]][o] = {'xvalue': files[-1][2][0], 'yvalue': files[-1][2][1]}
 
-                    values[refs[r]][o]['xvalue'][e] = xvalue
-                    values[refs[r]][o]['yvalue'][e] = yvalue
+# Write all files at once
+vcc_export.write_all(files)
 
 
 # Calculate intersections
 # Loop through all operations
 for o in range(0, len(ops)):
-    if ops[o].has_key('calc_intersect'):
-        if ops[o]['calc_intersect']:
-            for r in range(1, len(refs)):
-                print('Intersection of ' + ops[o]['name'] + '_' + refs[r])
+    if ops[o].get('calc_intersect'):
+        for r in range(1, len(refs)):
+            print('Intersection of ' + ops[o]['name'] + '_' + refs[r])
 
-                vcc_functions.data_intersect(values[refs[0]][o]['xvalue'], values[refs[0]][o]['yvalue'],
-                                             values[refs[r]][o]['xvalue'], values[refs[r]][o]['yvalue'])
+            x_intersect, y_intersect = vcc_functions.data_intersect(
+                values[refs[0]][o]['xvalue'], values[refs[0]][o]['yvalue'],
+                values[refs[r]][o]['xvalue'], values[refs[r]][o]['yvalue'])
 
+            for i in range(0, len(x_intersect)):
+                print("intersection at: " + str(x_intersect[i]))
 
-# Close file streams
-for r in range(0, len(refs)):
-    for op in ops:
-        locals()[str("FILE_%s_%s" % (op['name'], refs[r]))].close()
 
 end = time.time()
 print("Time required: " + str(end - start))
@@ -0,0 +1,83 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import vcc_metrics
+import numpy
+from scipy.optimize import brentq
+
+# Description:
+# This file finds the crossovers of a metric between two refrigerants directly on the cycle model.
+
+# A crossover is the value of an input, e.g. the evaporator temperature, where a metric such as cop_2 is the same
+# for both refrigerants. find_crossover() solves for it with Brent's method within a bracket. Both cycles are only
+# calculated where the root finder asks, about ten times for a tolerance of 1 mK, and the crossover is exact to the
+# tolerance instead of being interpolated on a sweep like data_intersect.
+
+# Between evaluations only the variable changes, the condenser is kept when the variable is an evaporator input and
+# the pressure loops are warm started from the previous solution, see Vcc.set_solver.
+
+# Every value the root finder asks for must be within the application limits of both compressors, outside of them
+# the compressor polynomials have no results and a ValueError is raised.
+
+# Example:
+# import vcc_crossover
+#
+# te, cop = vcc_crossover.find_crossover(R404A, R448A, 'cop_2', 'ev_temperature', (-40 + k, 0 + k))
+# print("intersection at: " + str(te - k))
+
+# <--- File begin --->
+
+def difference(vcc_a, vcc_b, metric, variable, value):
+    # Metric of b minus metric of a with the variable set to value
+    values = []
+
+    for vcc in (vcc_a, vcc_b):
+        vcc.set_input(variable, value)
+
+        if not vcc._compressor.in_envelope(vcc._ev_temperature, vcc._co_temperature):
+            raise ValueError(vcc._compressor._refrigerant_name + ' compressor out of range at ' + variable + ' ' +
+                             str(value))
+
+        vcc.calculate()
+        values.append(float(vcc_metrics.evaluate(metric, vcc)))
+
+    return values[1] - values[0]
+
+def find_crossover(vcc_a, vcc_b, metric, variable='ev_temperature', bracket=None, tolerance=1e-3, max_iterations=50):
+    # Value of variable within bracket where the metric of both refrigerants is the same, and the metric there
+    # Returns nan, nan if the metric difference does not change sign over the bracket
+    if bracket is None:
+        print('Find crossover: A bracket (lower, upper) of ' + variable + ' is needed')
+        return numpy.nan, numpy.nan
+
+    # Keep the inputs and solver settings, they are restored when the crossover is found
+    start = [getattr(vcc, '_' + variable) for vcc in (vcc_a, vcc_b)]
+    warm_start = [vcc._warm_start for vcc in (vcc_a, vcc_b)]
+    quiet = [vcc._compressor.quiet for vcc in (vcc_a, vcc_b)]
+
+    for vcc in (vcc_a, vcc_b):
+        vcc._warm_start = True
+        vcc._compressor.quiet = True
+
+    try:
+        lower = difference(vcc_a, vcc_b, metric, variable, bracket[0])
+        upper = difference(vcc_a, vcc_b, metric, variable, bracket[1])
+
+        if not numpy.sign(lower) * numpy.sign(upper) <= 0:
+            print('Find crossover: No crossover of ' + metric + ' between ' + str(bracket[0]) + ' and ' +
+                  str(bracket[1]))
+            return numpy.nan, numpy.nan
+
+        root = brentq(lambda value: difference(vcc_a, vcc_b, metric, variable, value), bracket[0], bracket[1],
+                      xtol=tolerance, maxiter=max_iterations)
+
+        # The metric at the crossover
+        vcc_a.set_input(variable, root)
+        vcc_a.calculate()
+
+        return root, float(vcc_metrics.evaluate(metric, vcc_a))
+
+    finally:
+        for i, vcc in enumerate((vcc_a, vcc_b)):
+            vcc._warm_start = warm_start[i]
+            vcc._compressor.quiet = quiet[i]
+            vcc.set_input(variable, start[i])
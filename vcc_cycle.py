@@ -2,6 +2,7 @@ __author__ = 'Peter Eriksson @ KTH 2015'
 
 import vcc_input
 import vcc_functions
+import vcc_export
 
 # Description:
 # This file describes the vcc cycle for the introduction
@@ -52,86 +53,32 @@ R404A.set_compressor_data(input_data["efficiency_isentropic"])
 R404A.calculate()
 envelope = R404A.build_envelope()
 
-# Write the envelope
-file_envelope = open(str("%s%s.dat" % (folder, 'Nomenclature-envelope')), 'w+')
-file_envelope.write("ethalpy pressure\n")
-
-for f in range(0, len(envelope['p'])):
-    file_envelope.write(str("%f %f\n" % (envelope['h'][f], envelope['p'][f])))
-
-file_envelope.close()
-
-# Write the cycle
-file_cycle = open(str("%s%s.dat" % (folder, 'Nomenclature-cycle')), 'w+')
-file_cycle.write("ethalpy pressure\n")
-
-for f in range(-1, 10):
-    file_cycle.write(str("%f %f\n" % (R404A._h[f]/1e3, R404A._p[f]/1e5)))
-
-file_cycle.close()
-
-
-# Write the hs
-file_hs = open(str("%s%s.dat" % (folder, 'Nomenclature-hs')), 'w+')
-file_hs.write("ethalpy pressure\n")
-
-file_hs.write(str("%f %f\n" % (R404A._h[7]/1e3, R404A._p[7]/1e5)))
-file_hs.write(str("%f %f\n" % (R404A._h[7]/1e3, 0.5)))
-
-file_hs.close()
-
-# Write the h2k
-file_h1k = open(str("%s%s.dat" % (folder, 'Nomenclature-h1k')), 'w+')
-file_h1k.write("ethalpy pressure\n")
-
-file_h1k.write(str("%f %f\n" % (R404A._h[1]/1e3, R404A._p[1]/1e5)))
-file_h1k.write(str("%f %f\n" % (R404A._h[1]/1e3, 0.5)))
-
-file_h1k.close()
-
-# Write the h2k
-file_h2k = open(str("%s%s.dat" % (folder, 'Nomenclature-h2k')), 'w+')
-file_h2k.write("ethalpy pressure\n")
-
-file_h2k.write(str("%f %f\n" % (R404A._h[0]/1e3, R404A._p[0]/1e5)))
-file_h2k.write(str("%f %f\n" % (R404A._h[0]/1e3, 0.5)))
-
-file_h2k.close()
-
-# Write the h1kis-line
-file_h1kis_line = open(str("%s%s.dat" % (folder, 'Nomenclature-h1kis-line')), 'w+')
-file_h1kis_line.write("ethalpy pressure\n")
-
-file_h1kis_line.write(str("%f %f\n" % (R404A._h[0]/1e3, R404A._p[0]/1e5)))
-file_h1kis_line.write(str("%f %f\n" % (R404A._h1k_is/1e3, R404A._p[1]/1e5)))
-
-file_h1kis_line.close()
-
-
-# Write the h1kis
-file_h1kis = open(str("%s%s.dat" % (folder, 'Nomenclature-h1kis')), 'w+')
-file_h1kis.write("ethalpy pressure\n")
-
-file_h1kis.write(str("%f %f\n" % (R404A._h1k_is/1e3, R404A._p[1]/1e5)))
-file_h1kis.write(str("%f %f\n" % (R404A._h1k_is/1e3, 0.5)))
-
-file_h1kis.close()
-
-
-# Write the p1m
-file_p1m = open(str("%s%s.dat" % (folder, 'Nomenclature-p1m')), 'w+')
-file_p1m.write("ethalpy pressure\n")
-
-file_p1m.write(str("%f %f\n" % ((R404A.h(3)+R404A.h(4))/2e3, (R404A.p(3)+R404A.p(4))/2e5-0.1)))
-file_p1m.write(str("%f %f\n" % (50, (R404A.p(3)+R404A.p(4))/2e5-0.1)))
-
-file_p1m.close()
-
-# Write the p1m
-file_p2m = open(str("%s%s.dat" % (folder, 'Nomenclature-p2m')), 'w+')
-file_p2m.write("ethalpy pressure\n")
-
-file_p2m.write(str("%f %f\n" % ((R404A.h(7)+R404A.h(8))/2e3, (R404A.p(7)+R404A.p(8))/2e5-0.05)))
-file_p2m.write(str("%f %f\n" % (50, (R404A.p(7)+R404A.p(8))/2e5-0.05)))
-
-file_p2m.close()
\ No newline at end of file
+# Files of the envelope, the cycle and the annotation lines, all with enthalpy in kJ/kg and pressure in bar
+header = ["ethalpy", "pressure"]
+
+# The cycle is closed by starting in the last state point
+cycle = [-1] + list(range(0, 10))
+
+h_p1m = (R404A.h(3)+R404A.h(4))/2e3
+p_p1m = (R404A.p(3)+R404A.p(4))/2e5-0.1
+h_p2m = (R404A.h(7)+R404A.h(8))/2e3
+p_p2m = (R404A.p(7)+R404A.p(8))/2e5-0.05
+
+files = [
+    (str("%s%s.dat" % (folder, 'Nomenclature-envelope')), header, [envelope['h'], envelope['p']]),
+    (str("%s%s.dat" % (folder, 'Nomenclature-cycle')), header, [R404A._h[cycle]/1e3, R404A._p[cycle]/1e5]),
+    (str("%s%s.dat" % (folder, 'Nomenclature-hs')), header,
+     [[R404A._h[7]/1e3, R404A._h[7]/1e3], [R404A._p[7]/1e5, 0.5]]),
+    (str("%s%s.dat" % (folder, 'Nomenclature-h1k')), header,
+     [[R404A._h[1]/1e3, R404A._h[1]/1e3], [R404A._p[1]/1e5, 0.5]]),
+    (str("%s%s.dat" % (folder, 'Nomenclature-h2k')), header,
+     [[R404A._h[0]/1e3, R404A._h[0]/1e3], [R404A._p[0]/1e5, 0.5]]),
+    (str("%s%s.dat" % (folder, 'Nomenclature-h1kis-line')), header,
+     [[R404A._h[0]/1e3, R404A._h1k_is/1e3], [R404A._p[0]/1e5, R404A._p[1]/1e5]]),
+    (str("%s%s.dat" % (folder, 'Nomenclature-h1kis')), header,
+     [[R404A._h1k_is/1e3, R404A._h1k_is/1e3], [R404A._p[1]/1e5, 0.5]]),
+    (str("%s%s.dat" % (folder, 'Nomenclature-p1m')), header, [[h_p1m, 50], [p_p1m, p_p1m]]),
+    (str("%s%s.dat" % (folder, 'Nomenclature-p2m')), header, [[h_p2m, 50], [p_p2m, p_p2m]]),
+]
+
+vcc_export.write_all(files)
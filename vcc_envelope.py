@@ -1,54 +1,40 @@
 __author__ = 'Peter Eriksson @ KTH 2015'
 
 import numpy as numpy
-import CoolProp.CoolProp as CoolProp
+import vcc_input
+import vcc_state
+import vcc_cache
+import vcc_export
 
 # Description:
 # This file generates data for LaTeX to render an illustration of the envelope, 2-phase region and the critical point
 
+refrigerant_data = vcc_input.refrigerant('R1234yf')
+
 # Initiate CoolProp with AbstractState meaning low-level interface
-refrigerant = CoolProp.AbstractState("REFPROP","R1234yf")
+refrigerant = vcc_state.abstract_state(refrigerant_data, envelope=False)
 
-# Get the temperature at minimum pressure at 1 bar
+# Bubble and dew curves from the temperature at minimum pressure at 1 bar to the critical temperature
 # Below is uninteresting since during leakage the air would leak in instead of refrigerant out.
-refrigerant.update(CoolProp.PQ_INPUTS, 1e5, 0)
-temperature_min = refrigerant.T()
-
-# Get the critical temperature, top of the two-phase plot
-temperature_critical = refrigerant.true_critical_point()[0]
-
-refrigerant.update(CoolProp.QT_INPUTS, 0, temperature_critical)
-pressure_critical = refrigerant.p()
-enthalpy_critical = refrigerant.hmass()
-
-# Create a vector with temperatures
-temperatures = numpy.linspace(temperature_min, temperature_critical, 50)
-
-# Open files
-file_1 = open('../../Report/LaTeX/data/envelope_bubble.dat', 'w+')
-file_2 = open('../../Report/LaTeX/data/envelope_dew.dat', 'w+')
-file_3 = open('../../Report/LaTeX/data/envelope_crit.dat', 'w+')
-
-file_1.write("ethalpy pressure\n")
-file_2.write("ethalpy pressure\n")
-file_3.write("ethalpy pressure\n")
+# Loaded from the cache folder after the first run
+dome = vcc_cache.saturation_dome(refrigerant, refrigerant_data, 1e5, 50)
 
-# Loop through all temperatures
-for i in range(0, len(temperatures)):
+# The critical point is the top of the two-phase plot, the last temperature of the curves
+pressure_critical = dome['bubble_p'][-1]
+enthalpy_critical = dome['bubble_h'][-1]
 
-    # Calculate the envelope for Q = 0
-    refrigerant.update(CoolProp.QT_INPUTS, 0, temperatures[i])
-    file_1.write(str("%f %f\n" % (refrigerant.hmass()/1e3, refrigerant.p()/1e5)))
+folder = '../../Report/LaTeX/data/'
+header = ["ethalpy", "pressure"]
 
-    # Calculate the envelope for Q = 1
-    refrigerant.update(CoolProp.QT_INPUTS, 1, temperatures[i])
-    file_2.write(str("%f %f\n" % (refrigerant.hmass()/1e3, refrigerant.p()/1e5)))
+vcc_export.write_all([
+    # The envelope for Q = 0
+    (folder + 'envelope_bubble.dat', header, [dome['bubble_h']/1e3, dome['bubble_p']/1e5]),
 
-file_2.write(str("%f %f\n" % (enthalpy_critical/1e3, pressure_critical/1e5)))
-file_3.write(str("%f %f\n" % (enthalpy_critical/1e3, pressure_critical/1e5)))
-file_3.write(str("%f %f\n" % (enthalpy_critical/1e3, 120)))
+    # The envelope for Q = 1, closed at the critical point
+    (folder + 'envelope_dew.dat', header, [numpy.append(dome['dew_h'], enthalpy_critical)/1e3,
+                                           numpy.append(dome['dew_p'], pressure_critical)/1e5]),
 
-# Close files
-file_1.close()
-file_2.close()
-file_3.close()
+    # The critical point
+    (folder + 'envelope_crit.dat', header, [[enthalpy_critical/1e3, enthalpy_critical/1e3],
+                                            [pressure_critical/1e5, 120]])
+])
@@ -0,0 +1,132 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+from multiprocessing.pool import ThreadPool
+import numpy
+import tempfile
+import os
+
+# Description:
+# This file writes the pgfplots .dat files of the report.
+
+# A .dat file is a header row with the column names followed by one row per point. write_dat() formats all rows
+# with one % operation on a repeated row format and writes them in one call. The file is written to a temporary
+# file in the same folder and then renamed onto the .dat file, so an interrupted run leaves either the previous
+# or the new file but never half of one. write_all() writes a list of files on a pool of threads.
+
+# Columns are numeric arrays, formatted with %f, or sequences of strings, formatted with %s, e.g. the refrigerant
+# names of the TEWI bars.
+
+# DatStream writes a .dat file row by row as the operating points are solved, see vcc_stream. The rows go to the
+# file with the suffix .part, which is flushed after every row and renamed onto the .dat file when it is complete.
+
+# Example:
+# import vcc_export
+#
+# files = [(folder + 'COP2_M_R448A.dat', ['evaporator', 'COP2'], [t_evap - k, cop_2])]
+# vcc_export.write_all(files)
+
+# <--- File begin --->
+
+def column_format(column):
+    # Strings as they are, numbers with six decimals as before
+    if numpy.asarray(column).dtype.kind in 'SUO':
+        return '%s'
+
+    return '%f'
+
+def format_rows(columns, formats=None):
+    # All rows of the columns as one string
+    if formats is None:
+        formats = [column_format(column) for column in columns]
+
+    rows = len(columns[0]) if len(columns) > 0 else 0
+
+    if rows == 0:
+        return ''
+
+    # Row major values as Python objects, the numbers are formatted as the floats they were written as before
+    values = numpy.column_stack([numpy.asarray(column, dtype=object) for column in columns]).ravel().tolist()
+
+    return (' '.join(formats) + '\n') * rows % tuple(values)
+
+def replace(temporary, path):
+    # Rename a complete temporary file onto path
+    # mkstemp creates the file readable by the owner only
+    os.chmod(temporary, 0o644)
+
+    # Windows does not rename onto an existing file
+    if os.name == 'nt' and os.path.isfile(path):
+        os.remove(path)
+
+    os.rename(temporary, path)
+
+    return True
+
+def write_dat(path, header, columns, formats=None):
+    # Write the header row and the columns through a temporary file
+    text = ' '.join(header) + '\n' + format_rows(columns, formats)
+
+    folder = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(suffix='.part', dir=folder)
+
+    try:
+        with os.fdopen(handle, 'w') as stream:
+            stream.write(text)
+
+        replace(temporary, path)
+    except:
+        if os.path.isfile(temporary):
+            os.remove(temporary)
+        raise
+
+    return True
+
+class DatStream:
+
+    def __init__(self, path, header, formats=None):
+        self.path = path
+        self.formats = formats
+        self.rows = 0
+
+        self._temporary = path + '.part'
+        self._stream = open(self._temporary, 'w')
+        self._stream.write(' '.join(header) + '\n')
+
+    def write(self, *values):
+        # One row, the formats are taken from the first one unless given
+        if self.formats is None:
+            self.formats = [column_format([value]) for value in values]
+
+        self._stream.write(format_rows([[value] for value in values], self.formats))
+        self._stream.flush()
+        self.rows += 1
+
+        return True
+
+    def close(self, complete=True):
+        # Rename onto the .dat file, an incomplete file is left as .part
+        if self._stream.closed:
+            return False
+
+        self._stream.close()
+
+        if complete:
+            replace(self._temporary, self.path)
+
+        return True
+
+def _write(file):
+    return write_dat(*file)
+
+def write_all(files, threads=8):
+    # Write files of (path, header, columns) or (path, header, columns, formats) on a pool of threads
+    if len(files) <= 1 or threads <= 1:
+        return all([_write(file) for file in files])
+
+    pool = ThreadPool(min(threads, len(files)))
+
+    try:
+        return all(pool.map(_write, files))
+    finally:
+        pool.close()
+        pool.join()
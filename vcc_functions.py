@@ -2,9 +2,17 @@ __author__ = 'Peter Eriksson @ KTH 2015'
 
 import numpy as numpy
 import CoolProp.CoolProp as CoolProp
-import xlrd as xlrd
 import os
+import copy
 import six
+import vcc_saturation
+import vcc_solver
+import vcc_cache
+import vcc_state
+import vcc_catalog
+import vcc_instrument
+import vcc_surrogate
+import vcc_metrics
 from matplotlib import pyplot
 
 # Description:
@@ -39,17 +47,103 @@ from matplotlib import pyplot
 # print(R404A.p(0))
 # R404A.output_list()
 # R404A.plot_hlogp()
+#
+# Whole maps of operating points are solved with calculate_batch(), which returns a VccBatch with the same getters
+# and performance functions as Vcc, but evaluated on arrays with one value per operating point.
+#
+# result = R404A.calculate_batch(numpy.linspace(-40, 0, 30) + k, 35 + k, ev_super_heat=7)
+# print(result.cop_2())
+#
+# With metrics, calculate(metrics=['cop_2']) and calculate_batch(..., metrics=['cop_2']) only flash the state points
+# that the metrics of vcc_metrics read. The compressor outlet (point 1) is then flashed only for its temperature,
+# entropy and density and the condenser inlet (point 2) not at all, unless a metric asks for them. Skipped points are
+# nan and a Vcc flashes them when they are read through T(), h(), s(), d() or discharge_temperature().
 
 # <--- File begin --->
 
 # Constants
 k = 273.15
 
+# Inputs in the order of input_data
+input_names = ('ev_temperature', 'ev_super_heat', 'ev_pressure_drop',
+               'sl_temperature_change', 'sl_pressure_drop',
+               'capacity_volumetric', 'efficiency_isentropic', 'efficiency_volymetric',
+               'dl_temperature_change', 'dl_pressure_drop',
+               'co_temperature', 'co_sub_cooling', 'co_pressure_drop',
+               'll_temperature_change', 'll_pressure_drop')
+
+# Inputs that the condenser (points 3-6) and the evaporator (points 7-9) solutions depend on
+condenser_inputs = ('co_temperature', 'co_sub_cooling', 'co_pressure_drop', 'll_temperature_change', 'll_pressure_drop')
+evaporator_inputs = ('ev_temperature', 'ev_super_heat', 'ev_pressure_drop')
+
+# Properties of the points that calculate(metrics) leaves to resolve(), the compressor outlet enthalpy is known
+deferred_properties = {1: ('T', 's', 'd'), 2: ('T', 'h', 's', 'd')}
+
+# Record type of one state point in a batch result
+state_dtype = numpy.dtype([('T', numpy.float), ('p', numpy.float), ('h', numpy.float),
+                           ('s', numpy.float), ('d', numpy.float), ('x', numpy.float)])
+
+# Performance data of a solved cycle, shared by Vcc and VccBatch
+# Both keep the state points in _T, _p, _h, _s and _d, indexed by the point first, and the compressor in _compressor.
+# On a VccBatch every value is an array with one value per operating point.
+class Performance:
+
+    def discharge_temperature(self):
+        # Through T(), a Vcc flashes the compressor outlet when calculate(metrics) left it
+        return self.T(1)
+
+    def mass_flow_rate(self):
+        # Is the compressor modeled with polynomial or fixed value
+        if self._compressor.EN12900:
+            # m dot from compressor
+            return self._compressor.mass_flow_rate()
+        else:
+            # m dot theoretical
+            return self._volumetric_flow_rate * self._d[0]
+
+    def compressor_power(self):
+
+        return self.compressor_specific_power() * self.mass_flow_rate()
+
+    def compressor_specific_power(self):
+
+        if self._compressor.EN12900:
+            return self._compressor.specific_power()
+        else:
+            return self._h[1]-self._h[0]
+
+    def volumetric_flow_rate(self):
+        # V dot index 2
+        return self.mass_flow_rate() / (self._d[0])
+
+    def cooling_capacity(self):
+        # Q dot
+        return self.mass_flow_rate() * (self._h[0] - self._h[6])
+
+    def volumetric_cooling_capacity(self):
+        # enthalpy at the compressor inlet - enthalpy at evaporator inlet / specific volume at compressor inlet
+        return (self._h[0] - self._h[6]) * self._d[0]
+
+    def cop_1(self):
+        # Heating COP1
+        # Enthalpy(Expansion valve to Compressor outlet) / (Compressor intel to outlet)
+        return (self._h[1] - self._h[6]) / (self._h[1] - self._h[0])
+
+    def cop_2(self):
+        # Cooling COP2
+        # Enthalpy(Expansion valve to Compressor inlet) / (Compressor intel to outlet)
+        return (self._h[0] - self._h[7]) / (self._h[1] - self._h[0])
+
+    def isentropic_efficiency(self):
+        # Isentropic
+        return (self._h1k_is - self._h[0])/(self._h[1] - self._h[0])
+
 # Vapor compression cycle class
-class Vcc:
+class Vcc(Performance):
 
     # Initiate class with definition of all variables specific to the instance
-    def __init__(self, refrigerant_data):
+    # By default the AbstractState is shared with the other instances of the refrigerant in the thread, see vcc_state
+    def __init__(self, refrigerant_data, shared=True):
         # Create instances of results
         self._T = numpy.zeros(10, dtype=numpy.float)  # Temperature
         self._p = numpy.zeros(10, dtype=numpy.float)  # Pressure
@@ -107,55 +201,81 @@ class Vcc:
         self._recalculate_condenser = True
         self._recalculate_evaporator = True
 
-        # Initiate CoolProp with AbstractState meaning low-level interface
-        self._refrigerant = CoolProp.AbstractState(refrigerant_data[1], refrigerant_data[2])
+        self._refrigerant_data = refrigerant_data
 
-        # Set mole fractions
-        self._refrigerant.set_mole_fractions(refrigerant_data[3])
+        # Initiate CoolProp with AbstractState meaning low-level interface, with mole fractions and custom
+        # composition envelope
+        if shared:
+            self._refrigerant = vcc_state.abstract_state(refrigerant_data)
+        else:
+            self._refrigerant = vcc_state.new_state(refrigerant_data)
 
-        # Build custom composition envelope
-        self._refrigerant.build_phase_envelope(refrigerant_data[0])
+        # Saturation properties for the pressure loops, exact and optionally tabulated
+        self._saturation = vcc_saturation.Saturation(self._refrigerant)
+        self._saturation_table = None
+
+        # Solvers of the pressure loops, optionally started from the last converged middle pressures
+        self._co_solver = vcc_solver.FixedPoint()
+        self._ev_solver = vcc_solver.FixedPoint()
+        self._warm_start = False
+        self._p_co_offset = 0
+        self._p_ev_offset = 0
+
+        # Accumulated number of iterations of the pressure loops
+        self._iterations = {'condenser': 0, 'condenser_table': 0, 'evaporator': 0, 'evaporator_table': 0}
+
+        # Solved condenser (points 3-6) and evaporator (points 7-9) by their inputs
+        self._co_cache = vcc_cache.LruCache()
+        self._ev_cache = vcc_cache.LruCache()
 
         # Instantiate compressor
         self._compressor = Compressor()
 
+        # Wall time of the stages of calculate, only with instrumentation, see vcc_instrument
+        self._stages = None
+
+        # Superheated vapor properties of points 0, 1, 2 and 9 with set_accuracy('fast'), see vcc_surrogate
+        self._surrogate = None
+
+        # Points of the last calculate(metrics) that are flashed when read
+        self._deferred = []
+
     def calculate_condenser(self):
         # Calculating the pressure in the middle of the condensator
 
-        # Find a start point for the pressure in the middle of the evaporator
-        self._refrigerant.update(CoolProp.QT_INPUTS, 0.5, self._co_temperature)
-        p_co_mid = self._refrigerant.p()
+        # Solved before?
+        key = tuple([getattr(self, '_' + name) for name in condenser_inputs])
 
-        # Start value of the error term
-        p_co_corr = 1e5
+        if self.restore_points(3, 7, self._co_cache.get(key)):
+            self._recalculate_condenser = False
+            return True
 
-        # Error of 1 Pascal
-        while abs(p_co_corr) > 1:
-            # Inlet and outlet is symetric arround the evaporator middle
-            p_co_inlet = p_co_mid+self._co_pressure_drop/2
-            p_co_outlet = p_co_mid-self._co_pressure_drop/2
+        # Converge on the saturation table first, if there is one
+        p_co_mid = numpy.nan
 
-            # Inlet data
-            self._refrigerant.update(CoolProp.PQ_INPUTS, p_co_inlet, 1)
-            t_co_inlet = self._refrigerant.T()
+        if self._saturation_table is not None:
+            try:
+                p_co_mid = self.converge_condenser(self._saturation_table.p(0.5, self._co_temperature),
+                                                   self._saturation_table)
+            except vcc_solver.ConvergenceError:
+                p_co_mid = numpy.nan
 
-            # Outlet data
-            self._refrigerant.update(CoolProp.PQ_INPUTS, p_co_outlet, 0)
-            t_co_outlet = self._refrigerant.T()
+            self._iterations['condenser_table'] += self._co_solver.iterations
 
-            # Objective, minimize following
-            # This is the temperature difference, since the temperature drop is almos linear it applys to all points
-            # As well inlet as outlet and mid
-            t_co_diff = t_co_inlet/2 + t_co_outlet/2 - self._co_temperature
+        # Find a start point for the pressure in the middle of the condenser
+        # With warm start it is shifted by how far the last solution ended up from its start point
+        if not numpy.isfinite(p_co_mid):
+            p_co_mid = p_co_start = self._saturation.p(0.5, self._co_temperature)
 
-            # Evaluate the pressure at the inlet generated given the temperature correction
-            self._refrigerant.update(CoolProp.QT_INPUTS, 1, t_co_inlet - t_co_diff)
-            p_co_corr = self._refrigerant.p() - p_co_inlet
-
-            # Correct the pressure
-            p_co_mid += p_co_corr
+            if self._warm_start:
+                p_co_mid += self._p_co_offset
+        else:
+            p_co_start = p_co_mid
 
-            #print 'Pg', p_co_mid, 'Ti', t_co_inlet-k, 'To', t_co_outlet-k, ' Td', t_co_diff, ' Pc', p_co_corr
+        # Finish with exact flashes
+        p_co_mid = self.converge_condenser(p_co_mid, self._saturation)
+        self._p_co_offset = p_co_mid - p_co_start
+        self._iterations['condenser'] += self._co_solver.iterations
 
         # Condenser inlet
         self._p[3] = p_co_mid+self._co_pressure_drop/2
@@ -199,40 +319,50 @@ class Vcc:
         self._s[6] = self._refrigerant.smass()
         self._d[6] = self._refrigerant.rhomass()
 
+        self._co_cache.put(key, self.store_points(3, 7))
+
         self._recalculate_condenser = False
 
         return True
 
-    def calculate_evaporator(self):
-        # The enthalpy before expansion valve is the same as after the valve because the expansion valve
-        # doesn't perform any thermodynamic work. It's just a trade in specific volume, pressure and temperature.
-        self._h[7] = self._h[6]
+    def converge_condenser(self, p_co_mid, saturation):
+        # Solve the pressure in the middle of the condenser with the saturation properties of saturation
 
-        # Start by guessing at Q = 0.667 since according to the Honeywell recommendation the temperature in the evaporator
-        # is 1/3 of bubble temperature and 2/3 och dew temperature for a given pressure.
+        def correction(p_co_mid):
+            # Inlet and outlet is symetric arround the evaporator middle
+            p_co_inlet = p_co_mid+self._co_pressure_drop/2
+            p_co_outlet = p_co_mid-self._co_pressure_drop/2
 
-        # This gives an estimated pressure in the middle of the evaporator
-        self._refrigerant.update(CoolProp.QT_INPUTS, 0.667, self._ev_temperature)
-        p_ev_mid = self._refrigerant.p()
+            # Inlet data
+            t_co_inlet = saturation.T(p_co_inlet, 1)
+
+            # Outlet data
+            t_co_outlet = saturation.T(p_co_outlet, 0)
 
-        # Start value of the error term
-        p_ev_corr = 1e5
+            # Objective, minimize following
+            # This is the temperature difference, since the temperature drop is almos linear it applys to all points
+            # As well inlet as outlet and mid
+            t_co_diff = t_co_inlet/2 + t_co_outlet/2 - self._co_temperature
+
+            # Evaluate the pressure at the inlet generated given the temperature correction
+            return saturation.p(1, t_co_inlet - t_co_diff) - p_co_inlet
 
-        # Error of 1 Pascal allowed
-        while abs(p_ev_corr) > 1:
+        # Correct the pressure until the correction is within the tolerance of the solver, 1 Pascal by default
+        return self._co_solver.solve(correction, p_co_mid)
 
+    def converge_evaporator(self, p_ev_mid, saturation):
+        # Solve the pressure in the middle of the evaporator with the saturation properties of saturation
+
+        def correction(p_ev_mid):
             # Inlet and outlet pressure is symmetric around the evaporator middle pressure
             p_ev_inlet = p_ev_mid+self._ev_pressure_drop/2
             p_ev_outlet = p_ev_mid-self._ev_pressure_drop/2
 
             # Inlet data
-            self._refrigerant.update(CoolProp.HmassP_INPUTS, self._h[7], p_ev_inlet)
-            q_ev_inlet = self._refrigerant.Q()
-            t_ev_inlet = self._refrigerant.T()
+            q_ev_inlet, t_ev_inlet = saturation.QT(self._h[7], p_ev_inlet)
 
             # Outlet data
-            self._refrigerant.update(CoolProp.PQ_INPUTS, p_ev_outlet, 1)
-            t_ev_outlet = self._refrigerant.T()
+            t_ev_outlet = saturation.T(p_ev_outlet, 1)
 
             # Objective, minimize following:
 
@@ -241,13 +371,52 @@ class Vcc:
             t_ev_diff = t_ev_inlet/2 + t_ev_outlet/2 - self._ev_temperature
 
             # Evaluate the pressure at the inlet generated given the temperature correction
-            self._refrigerant.update(CoolProp.QT_INPUTS, q_ev_inlet, t_ev_inlet - t_ev_diff)
-            p_ev_corr = self._refrigerant.p() - p_ev_inlet
+            return saturation.p(q_ev_inlet, t_ev_inlet - t_ev_diff) - p_ev_inlet
+
+        # Correct the pressure until the correction is within the tolerance of the solver, 1 Pascal by default
+        return self._ev_solver.solve(correction, p_ev_mid)
 
-            # Correct the pressure
-            p_ev_mid += p_ev_corr
+    def calculate_evaporator(self):
+        # Solved before? The evaporator depends on the condenser through the enthalpy before the expansion valve
+        key = tuple([getattr(self, '_' + name) for name in evaporator_inputs] + [self._h[6]])
 
-            #print 'Pg', p_ev_mid, 'Ti', t_ev_inlet-k, 'To', t_ev_outlet-k, ' Td', t_ev_diff, ' Qg', q_ev_inlet, ' Pc', p_ev_corr
+        if self.restore_points(7, 10, self._ev_cache.get(key)):
+            self._recalculate_evaporator = False
+            return True
+
+        # The enthalpy before expansion valve is the same as after the valve because the expansion valve
+        # doesn't perform any thermodynamic work. It's just a trade in specific volume, pressure and temperature.
+        self._h[7] = self._h[6]
+
+        # Start by guessing at Q = 0.667 since according to the Honeywell recommendation the temperature in the evaporator
+        # is 1/3 of bubble temperature and 2/3 och dew temperature for a given pressure.
+
+        # Converge on the saturation table first, if there is one
+        p_ev_mid = numpy.nan
+
+        if self._saturation_table is not None:
+            try:
+                p_ev_mid = self.converge_evaporator(self._saturation_table.p(0.667, self._ev_temperature),
+                                                    self._saturation_table)
+            except vcc_solver.ConvergenceError:
+                p_ev_mid = numpy.nan
+
+            self._iterations['evaporator_table'] += self._ev_solver.iterations
+
+        # This gives an estimated pressure in the middle of the evaporator
+        # With warm start it is shifted by how far the last solution ended up from its estimate
+        if not numpy.isfinite(p_ev_mid):
+            p_ev_mid = p_ev_start = self._saturation.p(0.667, self._ev_temperature)
+
+            if self._warm_start:
+                p_ev_mid += self._p_ev_offset
+        else:
+            p_ev_start = p_ev_mid
+
+        # Finish with exact flashes
+        p_ev_mid = self.converge_evaporator(p_ev_mid, self._saturation)
+        self._p_ev_offset = p_ev_mid - p_ev_start
+        self._iterations['evaporator'] += self._ev_solver.iterations
 
         # Assign pressures
         self._p[7] = p_ev_mid+self._ev_pressure_drop/2
@@ -289,30 +458,59 @@ class Vcc:
         #  super heating is the case.
         if self._ev_super_heat == 0:
             self._refrigerant.update(CoolProp.PQ_INPUTS, self._p[9], 1)
+
+            #  Oh again? Yes every time...
+            self._h[9] = self._refrigerant.hmass()
+            self._s[9] = self._refrigerant.smass()
+            self._d[9] = self._refrigerant.rhomass()
         else:
-            self._refrigerant.update(CoolProp.PT_INPUTS, self._p[9], self._T[9])
+            self.flash_pT(9)
 
-        #  Oh again? Yes every time...
-        self._h[9] = self._refrigerant.hmass()
-        self._s[9] = self._refrigerant.smass()
-        self._d[9] = self._refrigerant.rhomass()
+        self._ev_cache.put(key, self.store_points(7, 10))
 
         # The evaporator is done calculated until changes that affects the data calls for recalculation
         self._recalculate_evaporator = False
 
         return True
 
-    def calculate(self):
+    def store_points(self, start, stop):
+        # Copy of the state points start to stop-1
+        return (self._T[start:stop].copy(), self._p[start:stop].copy(), self._h[start:stop].copy(),
+                self._s[start:stop].copy(), self._d[start:stop].copy(), self._x[start:stop].copy())
+
+    def restore_points(self, start, stop, points):
+        # Put back state points from store_points(), False if there are none
+        if points is None:
+            return False
+
+        self._T[start:stop], self._p[start:stop], self._h[start:stop], \
+            self._s[start:stop], self._d[start:stop], self._x[start:stop] = points
+
+        return True
+
+    def calculate(self, metrics=None):
         # Begin calculations
+        # With metrics, names of vcc_metrics, points 1 and 2 are only flashed as far as the metrics read them
+        stages = self._stages
+        self._deferred = []
+
+        if stages is not None:
+            stages.start()
 
         # <---- Condenser ---->
         if self._recalculate_condenser:
             self.calculate_condenser()
 
+        if stages is not None:
+            stages.lap('condenser')
+
         # <---- Evaporator ---->
         if self._recalculate_evaporator:
             self.calculate_evaporator()
 
+        if stages is not None:
+            stages.lap('evaporator')
+
         # <---- Compressor inlet / Suction line outlet ---->
         #  The effects of the suction line are applied
         self._p[0] = self._p[9] - self._sl_pressure_drop
@@ -321,21 +519,32 @@ class Vcc:
         #  To close values to the envelope returns errors. As mentioned before.
         if self._ev_super_heat == 0 and self._sl_temperature_change == 0:
             self._refrigerant.update(CoolProp.QT_INPUTS, 1, self._T[0])
+
+            # Oh here we go again...
+            self._h[0] = self._refrigerant.hmass()
+            self._s[0] = self._refrigerant.smass()
+            self._d[0] = self._refrigerant.rhomass()
         else:
-            self._refrigerant.update(CoolProp.PT_INPUTS, self._p[0], self._T[0])
+            self.flash_pT(0)
 
-        # Oh here we go again...
-        self._h[0] = self._refrigerant.hmass()
-        self._s[0] = self._refrigerant.smass()
-        self._d[0] = self._refrigerant.rhomass()
+        if stages is not None:
+            stages.lap('suction_line')
 
         # <---- Compressor outlet / Discharge line inlet ---->
         self._p[1] = self._p[3] + self._dl_pressure_drop
 
         #  Now it's interesting. The entropy before the compressor and the
         #  pressure afterwards results in the isentropic state after the compressor.
-        self._refrigerant.update(CoolProp.PSmass_INPUTS, self._p[1], self._s[0])
-        self._h[1] = self._h1k_is = self._refrigerant.hmass()
+        h1k_is = numpy.nan
+
+        if self._surrogate is not None:
+            h1k_is = self._surrogate.ps(self._p[1], self._s[0])
+
+        if numpy.isnan(h1k_is):
+            self._refrigerant.update(CoolProp.PSmass_INPUTS, self._p[1], self._s[0])
+            h1k_is = self._refrigerant.hmass()
+
+        self._h[1] = self._h1k_is = h1k_is
 
         # Calculate compressor performance
         self._compressor.calculate(self._ev_temperature, self._co_temperature)
@@ -350,85 +559,248 @@ class Vcc:
                 #  compressor, the enthalpy can be calculated.
                 self._h[1] = (self._h1k_is - self._h[0]) / self._compressor.set_efficiency + self._h[0]
 
-        # With the enthalpy and pressure know: give me the values knoooow!
-        self._refrigerant.update(CoolProp.HmassP_INPUTS, self._h[1], self._p[1])
-        self._T[1] = self._refrigerant.T()
-        self._s[1] = self._refrigerant.smass()
-        self._d[1] = self._refrigerant.rhomass()
+        if stages is not None:
+            stages.lap('compressor')
 
-        # <---- Discharge line outlet / Condenser inlet ---->
         # Pressure is the same as at the condenser inlet
         self._p[2] = self._p[3]
 
-        # Subtract the temperature from the compressor outlet temperature
-        self._T[2] = self._T[1] - self._dl_temperature_change
+        # Points 1 and 2 are left to resolve()
+        self._deferred = [1, 2]
+
+        if metrics is None:
+            self.resolve()
+        else:
+            for index in self._deferred:
+                for name in deferred_properties[index]:
+                    getattr(self, '_' + name)[index] = numpy.nan
 
-        # Calculate
-        self._refrigerant.update(CoolProp.PT_INPUTS, self._p[2], self._T[2])
+            # The metrics flash the points they read
+            for name in metrics:
+                metric = vcc_metrics.metrics[name]
 
-        # Assign results
-        self._h[2] = self._refrigerant.hmass()
-        self._s[2] = self._refrigerant.smass()
-        self._d[2] = self._refrigerant.rhomass()
+                # A relative variant reads the same points as its metric
+                if metric.baseline:
+                    metric = vcc_metrics.metrics[name[0:-len('_relative')]]
+
+                metric(self)
+
+        if stages is not None:
+            stages.lap('discharge_line')
 
         return True
 
-    # <--- Performance data --->
+    def resolve(self, index=None, name=None):
+        # Flash the point index, or all points, left by calculate(metrics). With the name of a property, e.g. 'T',
+        # only if the property is one of the deferred_properties of the point.
+        if index is not None and index not in self._deferred:
+            return True
 
-    def discharge_temperature(self):
+        if name is not None and name not in deferred_properties[index]:
+            return True
 
-        return self._T[1]
+        if 1 in self._deferred:
+            # With the enthalpy and pressure know: give me the values knoooow!
+            self.flash_ph(1)
+            self._deferred.remove(1)
 
-    def mass_flow_rate(self):
-        # Is the compressor modeled with polynomial or fixed value
-        if self._compressor.EN12900:
-            # m dot from compressor
-            return self._compressor.mass_flow_rate()
-        else:
-            # m dot theoretical
-            return self._volumetric_flow_rate * self._d[0]
+        if index != 1 and 2 in self._deferred:
+            # <---- Discharge line outlet / Condenser inlet ---->
+            # Subtract the temperature from the compressor outlet temperature
+            self._T[2] = self._T[1] - self._dl_temperature_change
 
-    def compressor_power(self):
+            # Calculate
+            self.flash_pT(2)
+            self._deferred.remove(2)
 
-        return self.compressor_specific_power() * self.mass_flow_rate()
+        return True
 
-    def compressor_specific_power(self):
+    def flash_pT(self, index):
+        # Enthalpy, entropy and density of a superheated vapor point from its pressure and temperature
+        # A point without temperature, e.g. outside of the compressor envelope, is left nan
+        if numpy.isnan(self._T[index]):
+            self._h[index] = self._s[index] = self._d[index] = numpy.nan
 
-        if self._compressor.EN12900:
-            return self._compressor.specific_power()
-        else:
-            return self._h[1]-self._h[0]
+            return False
 
-    def volumetric_flow_rate(self):
-        # V dot index 2
-        return self.mass_flow_rate() / (self._d[0])
+        if self._surrogate is not None:
+            self._h[index], self._s[index], self._d[index] = self._surrogate.pT(self._p[index], self._T[index])
 
-    def cooling_capacity(self):
-        # Q dot
-        return self.mass_flow_rate() * (self._h[0] - self._h[6])
+            if not numpy.isnan(self._h[index]):
+                return True
 
-    def volumetric_cooling_capacity(self):
-        # enthalpy at the compressor inlet - enthalpy at evaporator inlet / specific volume at compressor inlet
-        return (self._h[0] - self._h[6]) * self._d[0]
+        self._refrigerant.update(CoolProp.PT_INPUTS, self._p[index], self._T[index])
+        self._h[index] = self._refrigerant.hmass()
+        self._s[index] = self._refrigerant.smass()
+        self._d[index] = self._refrigerant.rhomass()
 
-    def cop_1(self):
-        # Heating COP1
-        # Enthalpy(Expansion valve to Compressor outlet) / (Compressor intel to outlet)
-        return (self._h[1] - self._h[6]) / (self._h[1] - self._h[0])
+        return True
 
-    def cop_2(self):
-        # Cooling COP2
-        # Enthalpy(Expansion valve to Compressor inlet) / (Compressor intel to outlet)
-        return (self._h[0] - self._h[7]) / (self._h[1] - self._h[0])
+    def flash_ph(self, index):
+        # Temperature, entropy and density of a superheated vapor point from its pressure and enthalpy
+        # A point without enthalpy, e.g. outside of the compressor envelope, is left nan
+        if numpy.isnan(self._h[index]):
+            self._T[index] = self._s[index] = self._d[index] = numpy.nan
 
-    def isentropic_efficiency(self):
-        # Isentropic
-        return (self._h1k_is - self._h[0])/(self._h[1] - self._h[0])
+            return False
+
+        if self._surrogate is not None:
+            self._T[index], self._s[index], self._d[index] = self._surrogate.ph(self._p[index], self._h[index])
+
+            if not numpy.isnan(self._T[index]):
+                return True
+
+        self._refrigerant.update(CoolProp.HmassP_INPUTS, self._h[index], self._p[index])
+        self._T[index] = self._refrigerant.T()
+        self._s[index] = self._refrigerant.smass()
+        self._d[index] = self._refrigerant.rhomass()
+
+        return True
+
+    def batch_inputs(self, ev_temperatures, co_temperatures, **overrides):
+        # The inputs of arrays of operating points as a dict of equally long arrays, None for an unknown input
+        columns = {'ev_temperature': ev_temperatures, 'co_temperature': co_temperatures}
+
+        for name in overrides:
+            if name not in input_names:
+                print('Vcc calculate batch: Unknown input ' + str(name))
+                return None
+
+            columns[name] = overrides[name]
+
+        names = list(columns.keys())
+        arrays = numpy.broadcast_arrays(*[numpy.atleast_1d(numpy.asarray(columns[name], dtype=numpy.float))
+                                          for name in names])
+
+        return dict(zip(names, [numpy.array(a.ravel()) for a in arrays]))
+
+    def solve_points(self, columns, compressor_data=None, errors='raise', metrics=None):
+        # Generator that solves the operating points of batch_inputs() one at a time. It yields the position of every
+        # point and its exception, empty if it was solved, while the solution is on the instance. The inputs and the
+        # compressor are restored when all points are done or the generator is closed. With metrics every point is
+        # solved with calculate(metrics).
+        # The points are solved sorted by their condenser and then evaporator inputs. Neighbouring points then share
+        # the condenser solution, which is only recalculated when one of its inputs changes.
+        size = len(columns['ev_temperature'])
+        sort_keys = [columns[name] if name in columns else numpy.zeros(size)
+                     for name in reversed(condenser_inputs + evaporator_inputs)]
+
+        if metrics is not None and vcc_metrics.unknown(metrics):
+            raise ValueError('Unknown metrics ' + ', '.join(vcc_metrics.unknown(metrics)))
+
+        # Keep the inputs and the compressor
+        input_data = self.get_input_data()
+        compressor = copy.copy(self._compressor)
+
+        self._compressor.quiet = True
+
+        try:
+            for i in numpy.lexsort(sort_keys):
+                for name in columns:
+                    self.set_input(name, columns[name][i])
+
+                if compressor_data is not None:
+                    self.set_compressor_data(compressor_data[i])
+
+                error = ''
+
+                if errors == 'record':
+                    try:
+                        self.calculate(metrics)
+                    except Exception as exception:
+                        error = exception.__class__.__name__ + ': ' + str(exception)
+
+                        # The next point starts over from the inputs
+                        self._recalculate_condenser = True
+                        self._recalculate_evaporator = True
+                else:
+                    self.calculate(metrics)
+
+                yield i, error
+        finally:
+            # The points left by the last calculate(metrics) are flashed with the inputs of that point, before the
+            # inputs are restored. If that fails they stay nan.
+            try:
+                self.resolve()
+            except Exception:
+                self._deferred = []
+
+            self._compressor.quiet = False
+            self._compressor = compressor
+            self.set_input_data(input_data)
+
+    def calculate_batch(self, ev_temperatures, co_temperatures, compressor_data=None, errors='raise', metrics=None,
+                        **overrides):
+        # Solve the cycle for arrays of operating points. Any other input of input_data, e.g. ev_super_heat or
+        # ll_pressure_drop, can be given per point as keyword. Scalars are broadcast over all points and inputs
+        # that are not given are taken from the instance. compressor_data is an optional list with the compressor
+        # file of every point, e.g. the Bitzer files of the super heating variants.
+        # With errors='record' a point that fails, e.g. a flash that REFPROP does not converge, is left as nan and
+        # its exception is kept in batch.errors instead of aborting the batch.
+        # With metrics, names of vcc_metrics, only the state points that the metrics read are solved, the others are
+        # nan in the batch, see calculate(metrics).
+        # The points are streamed one by one instead with vcc_stream.records().
+        columns = self.batch_inputs(ev_temperatures, co_temperatures, **overrides)
+
+        if columns is None:
+            return None
+
+        batch = VccBatch(len(columns['ev_temperature']))
+
+        if metrics is not None and vcc_metrics.unknown(metrics):
+            print('Vcc calculate batch: Unknown metrics ' + ', '.join(vcc_metrics.unknown(metrics)))
+            return None
+
+        if compressor_data is not None and len(compressor_data) != len(batch):
+            print('Vcc calculate batch: ' + str(len(compressor_data)) + ' compressor files for ' + str(len(batch)) +
+                  ' operating points')
+            return None
+
+        input_data = self.get_input_data()
+
+        for name in input_names:
+            if name in columns:
+                batch.inputs[name] = columns[name]
+            else:
+                batch.inputs[name] = numpy.repeat(numpy.float(input_data[name]), len(batch))
+
+        # Operating points outside of the application limits of the compressor are masked instead of printed
+        if compressor_data is None:
+            batch.in_envelope[:] = self._compressor.in_envelope(batch.inputs['ev_temperature'],
+                                                                batch.inputs['co_temperature'])
+
+        batch.finish(self)
+
+        for i, error in self.solve_points(columns, compressor_data, errors, metrics):
+            if compressor_data is not None:
+                batch.in_envelope[i] = self._compressor.in_envelope(batch.inputs['ev_temperature'][i],
+                                                                    batch.inputs['co_temperature'][i])
+                batch.finish(self)
+
+            if error:
+                batch.errors[i] = error
+            else:
+                batch.store(i, self)
+
+        if not batch.in_envelope.all():
+            print(batch._compressor._refrigerant_name + " compressor error: " + str(numpy.sum(~batch.in_envelope)) +
+                  " operating points out of range")
+
+        if batch.failed().any():
+            print(batch._compressor._refrigerant_name + " calculate batch: " + str(numpy.sum(batch.failed())) +
+                  " operating points failed")
+
+        return batch
+
+    # <--- Performance data --->
+    # Inherited from Performance, the same functions as of VccBatch
 
     # <--- Print data --->
 
     def output_list(self, mode=0):
-        # Print
+        # Print, with the points left by calculate(metrics)
+        self.resolve()
+
         print('   id       t          p        h          s          d         x')
 
         for i in range(0,10):
@@ -446,7 +818,9 @@ class Vcc:
                     ))
 
     def compare_list(self, reference_data):
-        # Print
+        # Print, with the points left by calculate(metrics)
+        self.resolve()
+
         print('   id       t          p        h          s          d         x')
 
         for i in range(0,10):
@@ -467,32 +841,18 @@ class Vcc:
 
     def build_envelope(self, resolution=40):
 
-        # Get the temperature at minimum pressure at 1 bar
+        # Bubble and dew curves, from the temperature at minimum pressure of 0.5 bar to the critical temperature
         # Below is uninteresting since during leakage the air would leak in instead of refrigerant out.
-        self._refrigerant.update(CoolProp.PQ_INPUTS, 0.5e5, 0)
-        self.temperature_min = self._refrigerant.T()
+        # Computed once per refrigerant composition and resolution, see vcc_cache.saturation_dome()
+        dome = vcc_cache.saturation_dome(self._refrigerant, self._refrigerant_data, 0.5e5, resolution)
 
-        # Get the critical temperature, top of the two-phase plot
-        self.temperature_critical = self._refrigerant.true_critical_point()[0]
-
-        # Create a vector with temperatures
-        self.temperature_range = numpy.linspace(self.temperature_min, self.temperature_critical, resolution)
+        self.temperature_min = dome['T'][0]
+        self.temperature_critical = dome['T'][-1]
+        self.temperature_range = numpy.array(dome['T'])
 
         # The data matrix
-        bubble_h, bubble_p = [], []
-        dew_h, dew_p = [], []
-
-        # Loop through all temperatures
-        for i in range(0, len(self.temperature_range)):
-            # Calculate the envelope for Q = 0
-            self._refrigerant.update(CoolProp.QT_INPUTS, 0, self.temperature_range[i])
-            bubble_h.append(self._refrigerant.hmass()/1e3)
-            bubble_p.append(self._refrigerant.p()/1e5)
-
-            # Calculate the envelope for Q = 1
-            self._refrigerant.update(CoolProp.QT_INPUTS, 1, self.temperature_range[i])
-            dew_h.append(self._refrigerant.hmass()/1e3)
-            dew_p.append(self._refrigerant.p()/1e5)
+        bubble_h, bubble_p = list(dome['bubble_h']/1e3), list(dome['bubble_p']/1e5)
+        dew_h, dew_p = list(dome['dew_h']/1e3), list(dome['dew_p']/1e5)
 
         # Repair top
         repair_h = numpy.array([bubble_h[-2], bubble_h[-1], dew_h[-1], dew_h[-2]])
@@ -510,9 +870,11 @@ class Vcc:
             bubble_p.append(repair_func(repair_range[r]))
 
         # Return a combined bubble and dew boundary in enthalpy and pressure, with the repaired top
-        return {'h': numpy.append(bubble_h, numpy.flipud(dew_h), 1), 'p': numpy.append(bubble_p, numpy.flipud(dew_p), 1)}
+        return {'h': numpy.append(bubble_h, numpy.flipud(dew_h)), 'p': numpy.append(bubble_p, numpy.flipud(dew_p))}
 
     def plot_hlogp(self):
+        self.resolve()
+
         # Initialize
         ax = pyplot.subplot()
         ax.set_yscale('log')
@@ -547,33 +909,19 @@ class Vcc:
         return True
 
     def plot_sT(self):
+        self.resolve()
 
         # Initialize plot
         fig = pyplot.figure()
         ax = fig.add_subplot(111)
 
-        # Get the temperature at minimum pressure at 1 bar
+        # Bubble and dew curves from the temperature at minimum pressure of 1 bar to the critical temperature
         # Below is uninteresting since during leakage the air would leak in instead of refrigerant out.
-        self._refrigerant.update(CoolProp.PQ_INPUTS, 1e5, 0)
-        temperature_min = self._refrigerant.T()
-
-        # Get the critical temperature, top of the two-phase plot
-        temperature_critical = self._refrigerant.true_critical_point()[0]
-
-        # Create a vector with temperatures
-        temperature_range = numpy.linspace(temperature_min, temperature_critical, 40)
-
-        # The data matrix
-        bubble, dew = [], []
+        dome = vcc_cache.saturation_dome(self._refrigerant, self._refrigerant_data, 1e5, 40)
 
-        for i in range(0, len(temperature_range)):
-            # Calculate the envelope for Q = 0
-            self._refrigerant.update(CoolProp.QT_INPUTS, 0, temperature_range[i])
-            bubble.append(self._refrigerant.smass()/1e3)
-
-            # Calculate the envelope for Q = 1
-            self._refrigerant.update(CoolProp.QT_INPUTS, 1, temperature_range[i])
-            dew.append(self._refrigerant.smass()/1e3)
+        temperature_range = dome['T']
+        bubble = dome['bubble_s']/1e3
+        dew = dome['dew_s']/1e3
 
         # Plot the saturation curves
         ax.plot(bubble, temperature_range-k, '-k')
@@ -630,6 +978,151 @@ class Vcc:
         self._ll_temperature_change = input_data["ll_temperature_change"]
         self._ll_pressure_drop = input_data["ll_pressure_drop"]
 
+        # Everything may have changed
+        self._recalculate_condenser = True
+        self._recalculate_evaporator = True
+
+        return True
+
+    def get_input_data(self):
+        # The current inputs in the same format as set_input_data() takes them
+        return dict((name, getattr(self, '_' + name)) for name in input_names)
+
+    def set_input(self, name, value):
+        # Set a single input by its input_data name and flag what has to be recalculated
+        if name not in input_names:
+            print('Vcc set input: Unknown input ' + str(name))
+            return False
+
+        value = float(value)
+
+        if getattr(self, '_' + name) != value:
+            setattr(self, '_' + name, value)
+
+            if name in condenser_inputs:
+                self._recalculate_condenser = True
+                self._recalculate_evaporator = True
+            elif name in evaporator_inputs:
+                self._recalculate_evaporator = True
+
+        return True
+
+    def build_saturation_table(self, resolution=200, p_min=0.5e5, p_max=None):
+        # Tabulate the saturation properties for the pressure loops, see vcc_saturation
+        self.set_saturation_table(vcc_saturation.SaturationTable(self._refrigerant, p_min, p_max, resolution))
+
+        return self._saturation_table.error
+
+    def set_saturation_table(self, table):
+        # A table may be shared by instances of the same refrigerant, None turns it off
+        self._saturation_table = table
+        self.clear_cache()
+
+        return True
+
+    def set_accuracy(self, accuracy='exact', **box):
+        # 'exact' flashes every state point, 'fast' takes the superheated vapor points 0, 1, 2 and 9 from the
+        # surrogate of the refrigerant, which is built the first time, see vcc_surrogate. The box of the surrogate,
+        # e.g. p_min or super_heat_max, can be given as keywords.
+        if accuracy == 'fast':
+            self.set_surrogate(vcc_surrogate.surrogate(self._refrigerant, self._refrigerant_data, **box))
+        elif accuracy == 'exact':
+            self.set_surrogate(None)
+        else:
+            print('Vcc set accuracy: Unknown accuracy ' + str(accuracy))
+            return False
+
+        return True
+
+    def set_surrogate(self, surrogate):
+        # A surrogate may be shared by instances of the same refrigerant, None turns it off
+        self._surrogate = surrogate
+        self.clear_cache()
+
+        return True
+
+    def set_solver(self, solver='fixed_point', tolerance=1, max_iterations=100, warm_start=False):
+        # Solver of the condenser and evaporator pressure loops, see vcc_solver
+        # With warm start the start estimates of the loops are corrected by the offset the last solution had from its
+        # estimate. The offset from pressure drops and glide changes little when a sweep moves to a neighbouring
+        # temperature. The results then depend on the order of the points within the tolerance.
+        self._co_solver = vcc_solver.solver(solver, tolerance, max_iterations)
+        self._ev_solver = vcc_solver.solver(solver, tolerance, max_iterations)
+        self._warm_start = warm_start
+        self.clear_cache()
+
+        return True
+
+    def set_cache_size(self, size):
+        # Number of condenser and evaporator solutions to keep, 0 turns the caches off
+        self._co_cache.size = size
+        self._ev_cache.size = size
+        self.clear_cache()
+
+        return True
+
+    def clear_cache(self):
+        self._co_cache.clear()
+        self._ev_cache.clear()
+
+        return True
+
+    def cache_info(self):
+        # Hits, misses and hit rates of the condenser and evaporator caches
+        return {'condenser': self._co_cache.info(), 'evaporator': self._ev_cache.info()}
+
+    def iterations(self):
+        # Accumulated iterations of the pressure loops, every iteration costs three flashes
+        return dict(self._iterations)
+
+    def set_instrumentation(self, enabled=True, proxy=None):
+        # Count the flashes by input pair and time the stages of calculate, see vcc_instrument
+        # proxy wraps the AbstractState, vcc_instrument.ProfilingState also records the latency of every flash.
+        # Enabling again starts over with new counters.
+        if self._stages is not None:
+            self._refrigerant = self._refrigerant.state
+            self._stages = None
+
+        if enabled:
+            if proxy is None:
+                proxy = vcc_instrument.CountingState
+
+            self._refrigerant = proxy(self._refrigerant)
+            self._stages = vcc_instrument.Stages()
+
+        # The pressure loops flash on the same state
+        self._saturation = vcc_saturation.Saturation(self._refrigerant)
+
+        return True
+
+    def stats(self):
+        # Iterations of the pressure loops, cache and surrogate hit rates and with instrumentation the wall time per stage of
+        # calculate and the number of flashes per input pair
+        stats = {'iterations': self.iterations(), 'cache': self.cache_info()}
+
+        if self._surrogate is not None:
+            stats['surrogate'] = self._surrogate.info()
+
+        if self._stages is not None:
+            stats.update(self._stages.info())
+            stats['updates'] = self._refrigerant.info()
+
+            if isinstance(self._refrigerant, vcc_instrument.ProfilingState):
+                stats['latency'] = self._refrigerant.profile()
+
+        return stats
+
+    def reset_stats(self):
+        for name in self._iterations:
+            self._iterations[name] = 0
+
+        self._co_cache.hits = self._co_cache.misses = 0
+        self._ev_cache.hits = self._ev_cache.misses = 0
+
+        if self._stages is not None:
+            self._stages.reset()
+            self._refrigerant.reset()
+
         return True
 
     def set_volumetric_flow_rate(self, value):
@@ -642,11 +1135,9 @@ class Vcc:
 
     def set_compressor_data(self, compressor_data):
 
+        # The condenser and the evaporator do not depend on the compressor and are kept
         self._compressor.set(compressor_data)
 
-        self._recalculate_evaporator = True
-        self._recalculate_condenser = True
-
         return True
 
     def set_sub_cooling(self, value):
@@ -677,23 +1168,190 @@ class Vcc:
 
     # <--- get variables --->
     def T(self, index):
+        self.resolve(index, 'T')
+
         return self._T[index]
 
     def p(self, index):
         return self._p[index]
 
     def h(self, index):
+        self.resolve(index, 'h')
+
         return self._h[index]
 
     def s(self, index):
+        self.resolve(index, 's')
+
         return self._s[index]
 
     def d(self, index):
+        self.resolve(index, 'd')
+
         return self._d[index]
 
     def x(self, index):
         return self._x[index]
 
+# Results of Vcc.calculate_batch()
+# The state points are kept in an (N, 10) structured array with the fields of state_dtype. The getters are the ones of
+# Vcc and the performance functions those of Performance, only returning arrays with one value per operating point.
+class VccBatch(Performance):
+
+    def __init__(self, size):
+        # State points of all operating points
+        self.states = numpy.zeros((size, 10), dtype=state_dtype)
+        self.states[:] = numpy.nan
+
+        # Inputs of every operating point, named as in input_data
+        self.inputs = {}
+
+        # Isentropic compressor outlet enthalpy
+        self._h1k_is = numpy.zeros(size, dtype=numpy.float)
+
+        # Operating points within the application limits of the compressor polynomials
+        self.in_envelope = numpy.ones(size, dtype=numpy.bool_)
+
+        # Exception of every operating point that failed, empty if it was solved
+        self.errors = numpy.array([''] * size, dtype=object)
+
+        # Compressor with one polynomial result per operating point
+        self._compressor = Compressor()
+        self._compressor._Q = numpy.zeros(size, dtype=numpy.float)
+        self._compressor._P = numpy.zeros(size, dtype=numpy.float)
+        self._compressor._m = numpy.zeros(size, dtype=numpy.float)
+        self._compressor._I = numpy.zeros(size, dtype=numpy.float)
+
+        self._volumetric_flow_rate = 0
+
+        self._views()
+
+    def _views(self):
+        # Transposed views of the states, self._h[0] is then the compressor inlet enthalpy of every operating point
+        # which lets the performance functions read exactly as in Vcc
+        self._T = self.states['T'].T
+        self._p = self.states['p'].T
+        self._h = self.states['h'].T
+        self._s = self.states['s'].T
+        self._d = self.states['d'].T
+        self._x = self.states['x'].T
+
+    def __len__(self):
+        return len(self.states)
+
+    def failed(self):
+        # Operating points that failed with errors='record'
+        return self.errors != ''
+
+    def __getstate__(self):
+        # The views are not pickled but rebuilt, e.g. when a batch is returned from a worker process
+        state = self.__dict__.copy()
+
+        for name in ('_T', '_p', '_h', '_s', '_d', '_x'):
+            del state[name]
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views()
+
+    def store(self, index, vcc):
+        # Copy the calculated cycle of a Vcc instance into row index
+        self.states['T'][index] = vcc._T
+        self.states['p'][index] = vcc._p
+        self.states['h'][index] = vcc._h
+        self.states['s'][index] = vcc._s
+        self.states['d'][index] = vcc._d
+        self.states['x'][index] = vcc._x
+
+        self._h1k_is[index] = vcc._h1k_is
+
+        self._compressor._Q[index] = vcc._compressor._Q
+        self._compressor._P[index] = vcc._compressor._P
+        self._compressor._m[index] = vcc._compressor._m
+        self._compressor._I[index] = vcc._compressor._I
+
+        return True
+
+    def finish(self, vcc):
+        # Settings that are common for all operating points
+        self._compressor.EN12900 = vcc._compressor.EN12900
+        self._compressor.set_efficiency = vcc._compressor.set_efficiency
+        self._compressor._refrigerant_name = vcc._compressor._refrigerant_name
+        self._volumetric_flow_rate = vcc._volumetric_flow_rate
+
+        return True
+
+    def take(self, indices):
+        # A new batch with the operating points of indices (index array or boolean mask)
+        indices = numpy.arange(len(self))[indices]
+
+        batch = VccBatch(len(indices))
+        batch.states[:] = self.states[indices]
+        batch.inputs = dict((name, self.inputs[name][indices]) for name in self.inputs)
+        batch._h1k_is[:] = self._h1k_is[indices]
+        batch.in_envelope[:] = self.in_envelope[indices]
+        batch.errors[:] = self.errors[indices]
+
+        for name in ('_Q', '_P', '_m', '_I'):
+            getattr(batch._compressor, name)[:] = getattr(self._compressor, name)[indices]
+
+        batch.finish(self)
+
+        return batch
+
+    # <--- get variables --->
+    def T(self, index):
+        return self._T[index]
+
+    def p(self, index):
+        return self._p[index]
+
+    def h(self, index):
+        return self._h[index]
+
+    def s(self, index):
+        return self._s[index]
+
+    def d(self, index):
+        return self._d[index]
+
+    def x(self, index):
+        return self._x[index]
+
+def concatenate_batches(batches):
+    # Join batches in the given order into one
+    batch = VccBatch(sum([len(b) for b in batches]))
+
+    if len(batches) == 0:
+        return batch
+
+    batch.states[:] = numpy.concatenate([b.states for b in batches])
+    batch.inputs = dict((name, numpy.concatenate([b.inputs[name] for b in batches])) for name in batches[0].inputs)
+    batch._h1k_is[:] = numpy.concatenate([b._h1k_is for b in batches])
+    batch.in_envelope[:] = numpy.concatenate([b.in_envelope for b in batches])
+    batch.errors[:] = numpy.concatenate([b.errors for b in batches])
+
+    for name in ('_Q', '_P', '_m', '_I'):
+        getattr(batch._compressor, name)[:] = numpy.concatenate([getattr(b._compressor, name) for b in batches])
+
+    batch.finish(batches[0])
+
+    return batch
+
+def monomials(ev_temperatures, co_temperatures):
+    # EN 12900
+    # y = c1 + c2*to + c3*tc + c4*to^2 + c5*to*tc + c6*tc^2 + c7*to^3 + c8*tc*to^2 + c9*to*tc^2 + c10*tc^3
+    # The ten monomials of the operating points along the first axis, to and tc in C
+    to, tc = numpy.broadcast_arrays(numpy.asarray(ev_temperatures, dtype=numpy.float) - k,
+                                    numpy.asarray(co_temperatures, dtype=numpy.float) - k)
+
+    to2 = to * to
+    tc2 = tc * tc
+
+    return numpy.array([numpy.ones_like(to), to, tc, to2, to * tc, tc2, to2 * to, tc * to2, to * tc2, tc2 * tc])
+
 class Compressor:
 
     def __init__(self):
@@ -714,32 +1372,25 @@ class Compressor:
 
         self._refrigerant_name = ""
 
+        # No printed errors for operating points outside of the application limits, see in_envelope()
+        self.quiet = False
+
     def set(self, object):
         # object=filename or isentropic efficiencyt as float
 
         if isinstance(object, six.string_types):
-            if os.path.isfile(os.path.join(os.getcwd(), 'input', 'compressor', object)):
-                # https://www.bitzer.de/websoftware/Calculate.aspx
-                workbook = xlrd.open_workbook(os.path.join(os.getcwd(), 'input', 'compressor', object))
-                print('Loaded compressor data: ' + object)
-
-                # Set working sheet
-                worksheet = workbook.sheet_by_index(0)
+            # Parsed once from the xls files, see vcc_catalog
+            entry = vcc_catalog.default().get(object)
 
+            if entry is not None:
                 # Refrigerant name
-                self._refrigerant_name = worksheet.cell_value(12,3)
+                self._refrigerant_name = entry['refrigerant']
 
-                # Polynomial parameters
-                for r in range(0,4):
-                    for c in range(0,10):
-                        self.parameters[r,c] = worksheet.cell_value(27+r,1+c)
+                # Polynomial parameters, a copy of the ones of the catalog
+                self.parameters = entry['parameters'].copy()
 
                 # Boundaries
-                self._tc_min = worksheet.cell_value(35, 3) + k
-                self._tc_max = worksheet.cell_value(35, 5) + k
-
-                self._to_min = worksheet.cell_value(34, 3) + k
-                self._to_max = worksheet.cell_value(34, 5) + k
+                self._to_min, self._to_max, self._tc_min, self._tc_max = entry['limits']
 
                 self.EN12900 = True
 
@@ -755,42 +1406,50 @@ class Compressor:
             print('Crompressor set: Error')
 
     def calculate(self, ev_temperature, co_temperature):
+        # Outside of the application limits the results are nan, not the ones of the last operating point
         if self.EN12900:
             if ev_temperature <= self._to_max and ev_temperature >= self._to_min:
                 if co_temperature <= self._tc_max and co_temperature >= self._tc_min:
-                    self._Q = self.core(0, ev_temperature, co_temperature)
-                    self._P = self.core(1, ev_temperature, co_temperature)
-                    self._m = self.core(2, ev_temperature, co_temperature)
-                    self._I = self.core(3, ev_temperature, co_temperature)
+                    self._Q, self._P, self._m, self._I = self.evaluate(ev_temperature, co_temperature)
 
                     return True
-                else:
+                elif not self.quiet:
                     print(self._refrigerant_name + " compressor error: Condenser temperature out of range")
                     print("Min: " + str(self._tc_min-k) + " Is: " + str(co_temperature-k) + " Max: " + str(self._tc_max-k))
-            else:
+            elif not self.quiet:
                 print(self._refrigerant_name + " compressor error: Evaporator temperature out of range")
                 print("Min: " + str(self._to_min-k) + " Is: " + str(ev_temperature-k) + " Max: " + str(self._to_max-k))
         else:
 
             return True
 
+        self._Q = self._P = self._m = self._I = numpy.nan
+
         return False
 
+    def in_envelope(self, ev_temperatures, co_temperatures):
+        # Mask of the operating points within the application limits of the polynomial
+        ev_temperatures = numpy.asarray(ev_temperatures)
+        co_temperatures = numpy.asarray(co_temperatures)
+
+        if not self.EN12900:
+            return numpy.ones(numpy.broadcast(ev_temperatures, co_temperatures).shape, dtype=numpy.bool_)
+
+        return (ev_temperatures >= self._to_min) & (ev_temperatures <= self._to_max) & \
+               (co_temperatures >= self._tc_min) & (co_temperatures <= self._tc_max)
+
+    def evaluate(self, ev_temperatures, co_temperatures, basis=None):
+        # All four polynomials, Q P m I, for scalars or arrays of operating points in one product with the
+        # parameters. Returns an array of shape (4,) + the shape of the operating points.
+        # The monomial basis of a fixed map can be computed once and passed on.
+        if basis is None:
+            basis = monomials(ev_temperatures, co_temperatures)
+
+        return numpy.tensordot(self.parameters, basis, 1)
+
     def core(self, mode, ev_temperature, co_temperature):
-        # EN 12900
-        # y = c1 + c2*to + c3*tc + c4*to^2 + c5*to*tc + c6*tc^2 + c7*to^3 + c8*tc*to^2 + c9*to*tc^2 + c10*tc^3
-        to = ev_temperature-k
-        tc = co_temperature-k
-        return self.parameters[mode, 0] + \
-               self.parameters[mode, 1]*to + \
-               self.parameters[mode, 2]*tc + \
-               self.parameters[mode, 3]*numpy.power(to, 2) + \
-               self.parameters[mode, 4]*to*tc + \
-               self.parameters[mode, 5]*numpy.power(tc, 2) + \
-               self.parameters[mode, 6]*numpy.power(to, 3) + \
-               self.parameters[mode, 7]*tc*numpy.power(to, 2) + \
-               self.parameters[mode, 8]*to*numpy.power(tc, 2) + \
-               self.parameters[mode, 9]*numpy.power(tc, 3)
+        # EN 12900, one of the polynomials Q P m I
+        return self.evaluate(ev_temperature, co_temperature)[mode]
 
     def mass_flow_rate(self):
         # Unit: kg/s
@@ -801,58 +1460,74 @@ class Compressor:
         return self._P / self.mass_flow_rate()
 
 def data_intersect(a_x, a_y, b_x, b_y):
+    # Intersections of the series a and b, both linear between their data points
+    # The series are interpolated onto their combined x values within the range they share. Every sign change of
+    # the difference, and every point where they are equal, is an intersection.
+
+    # Several series can be intersected at once, given as rows of a_y and b_y. The x values are either shared by all
+    # rows or given with one row per series. A single series returns the arrays of x and y values of all
+    # intersections, several series return a list with one such pair per row.
+    a_x, a_y = numpy.asarray(a_x, dtype=numpy.float), numpy.asarray(a_y, dtype=numpy.float)
+    b_x, b_y = numpy.asarray(b_x, dtype=numpy.float), numpy.asarray(b_y, dtype=numpy.float)
+
+    if a_y.ndim == 1 and b_y.ndim == 1:
+        return _intersect_rows(a_x, a_y[numpy.newaxis], b_x, b_y[numpy.newaxis])[0]
+
+    a_y, b_y = numpy.atleast_2d(a_y), numpy.atleast_2d(b_y)
+    rows = max(len(a_y), len(b_y))
+    a_y = numpy.broadcast_to(a_y, (rows, a_x.shape[-1]))
+    b_y = numpy.broadcast_to(b_y, (rows, b_x.shape[-1]))
+
+    # Shared x values are intersected in one pass
+    if a_x.ndim == 1 and b_x.ndim == 1:
+        return _intersect_rows(a_x, a_y, b_x, b_y)
+
+    a_x = numpy.broadcast_to(a_x, a_y.shape)
+    b_x = numpy.broadcast_to(b_x, b_y.shape)
 
-    # Combined x vector
+    return [_intersect_rows(a_x[r], a_y[r:r + 1], b_x[r], b_y[r:r + 1])[0] for r in range(0, rows)]
+
+def _interpolate_rows(x, x_data, y_data):
+    # Linear interpolation of every row of y_data at the increasing values x within the range of x_data
+    index = numpy.clip(numpy.searchsorted(x_data, x, 'right') - 1, 0, len(x_data) - 2)
+    weight = (x - x_data[index]) / (x_data[index + 1] - x_data[index])
+
+    return y_data[:, index] * (1 - weight) + y_data[:, index + 1] * weight
+
+def _intersect_rows(a_x, a_y, b_x, b_y):
+    # Intersections of the rows of a_y and b_y over the shared x values a_x and b_x
+    a_order = numpy.argsort(a_x, kind='mergesort')
+    b_order = numpy.argsort(b_x, kind='mergesort')
+    a_x, a_y = a_x[a_order], a_y[:, a_order]
+    b_x, b_y = b_x[b_order], b_y[:, b_order]
+
+    # Combined x vector within the range of both
     c_x = numpy.union1d(a_x, b_x)
+    c_x = c_x[(c_x >= max(a_x[0], b_x[0])) & (c_x <= min(a_x[-1], b_x[-1]))]
+
+    if len(c_x) < 2 or len(a_x) < 2 or len(b_x) < 2:
+        return [(numpy.zeros(0), numpy.zeros(0)) for r in range(0, len(a_y))]
+
+    # Both series on the combined x values and their difference
+    c_a = _interpolate_rows(c_x, a_x, a_y)
+    c_b = _interpolate_rows(c_x, b_x, b_y)
+    c_d = c_a - c_b
+
+    # Sign changes between two points and points where the series are equal
+    crossing = c_d[:, :-1] * c_d[:, 1:] < 0
+    equal = c_d == 0
+
+    row, col = numpy.nonzero(crossing)
+    fraction = c_d[row, col] / (c_d[row, col] - c_d[row, col + 1])
+
+    x = numpy.concatenate([c_x[col] + fraction * (c_x[col + 1] - c_x[col]), c_x[numpy.nonzero(equal)[1]]])
+    y = numpy.concatenate([c_a[row, col] + fraction * (c_a[row, col + 1] - c_a[row, col]), c_a[equal]])
+    row = numpy.concatenate([row, numpy.nonzero(equal)[0]])
+
+    # Split per row in increasing x
+    order = numpy.lexsort((x, row))
+    x, y, row = x[order], y[order], row[order]
+
+    bounds = numpy.searchsorted(row, numpy.arange(0, len(a_y) + 1))
 
-    # Shift register
-    a_i = [0, 0]
-    a_s = 0
-    b_i = [0, 0]
-    b_s = 0
-
-    # Loop through all x values
-    for i in range(0, len(c_x)):
-
-        # Search for instance of x value
-        a_w = numpy.where(a_x==c_x[i])[0]
-        b_w = numpy.where(b_x==c_x[i])[0]
-
-        # In vector a?
-        if len(a_w) > 0:
-            # Shift the array index
-            a_i[0] = a_i[1]
-            a_i[1] = a_w[0]
-            a_s += 1
-
-        # In vector b?
-        if len(b_w) > 0:
-            # Shift the array index
-            b_i[0] = b_i[1]
-            b_i[1] = b_w[0]
-            b_s += 1
-
-        # Is there ar flip of values?
-        # Meaning that the shif registers indicates a intersection
-        if a_s >= 2 and b_s >= 2:
-            if (a_y[a_i[0]] > b_y[b_i[0]] and a_y[a_i[1]] < b_y[b_i[1]]) or \
-               (a_y[a_i[0]] < b_y[b_i[0]] and a_y[a_i[1]] > b_y[b_i[1]]):
-
-                a_s = 0
-                b_s = 0
-
-                p_a = numpy.polyfit([a_x[a_i[0]], a_x[a_i[1]]], [a_y[a_i[0]], a_y[a_i[1]]], 1)
-                p_b = numpy.polyfit([b_x[b_i[0]], b_x[b_i[1]]], [b_y[b_i[0]], b_y[b_i[1]]], 1)
-                p_c = p_a - p_b
-
-                print("intersection at: " + str(numpy.roots(p_c)[0]))
-
-                val_a = numpy.polyval(p_a, c_x)
-                val_b = numpy.polyval(p_b, c_x)
-
-                #pyplot.plot(a_x, a_y, '*r')
-                #pyplot.plot(c_x, val_a, '-r')
-
-                #pyplot.plot(b_x, b_y, '*b')
-                #pyplot.plot(c_x, val_b, '-b')
-                #pyplot.show()
+    return [(x[bounds[r]:bounds[r + 1]], y[bounds[r]:bounds[r + 1]]) for r in range(0, len(a_y))]
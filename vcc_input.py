@@ -11,43 +11,68 @@ import os
 # Constants
 k = 273.15
 
-def refrigerant(name):
-    # Refrigerant data
+# Property backend of CoolProp used by refrigerant() unless another is given, e.g. 'HEOS', the tabular 'BICUBIC&HEOS',
+# 'TTSE&HEOS' and 'BICUBIC&REFPROP', see vcc_backends for their accuracy and speed. Set it before the Vcc instances
+# are created to run a whole script on another backend.
+default_backend = 'REFPROP'
+
+# Fluid names of REFPROP that are written differently in the fluid library of CoolProp
+heos_names = {
+    'R134A': 'R134a',
+    'R143A': 'R143a',
+    'R1234YF': 'R1234yf',
+    'R1234ZE': 'R1234ze(E)'
+}
+
+def fluid_names(fluids, backend):
+    # The fluid string for backend, the REFPROP names are kept for REFPROP and tables built on it
+    if backend.split('&')[-1] == 'REFPROP':
+        return fluids
+
+    return '&'.join([heos_names.get(fluid.upper(), fluid) for fluid in fluids.split('&')])
+
+def blend(name, fluids, fractions, backend=None):
+    # Refrigerant data of the fluids, e.g. 'R32&R125', with the mole fractions
     refrigerant_data = numpy.zeros(5, dtype=numpy.object)
 
+    if backend is None:
+        backend = default_backend
+
+    # Backend and the fluid names it knows
+    refrigerant_data[0] = name
+    refrigerant_data[1] = backend
+    refrigerant_data[2] = fluid_names(fluids, backend)
+    refrigerant_data[3] = fractions
+
+    # Fluid string with the mole fractions of a mixture
+    fluids = refrigerant_data[2].split('&')
+
+    if len(fluids) > 1:
+        refrigerant_data[4] = backend + '::' + '&'.join(['%s[%r]' % (fluids[i], refrigerant_data[3][i])
+                                                         for i in range(0, len(fluids))])
+    else:
+        refrigerant_data[4] = backend + '::' + refrigerant_data[2]
+
+    return refrigerant_data
+
+def refrigerant(name, backend=None):
+    # Refrigerant data
     # Defined since predefined mixtures did not want to run under Mac...
     if name.find('R404A') > -1:
-        refrigerant_data[0] = 'R404A'
-        refrigerant_data[1] = 'REFPROP'
-        refrigerant_data[2] = 'R125&R134A&R143A'
-        refrigerant_data[3] = (0.357816784026318, 0.0382639950410712, 0.603919220932611)
-        refrigerant_data[4] = 'REFPROP::R125[0.357816784026318]&R134A[0.0382639950410712]&R143A[0.603919220932611]'
+        return blend('R404A', 'R125&R134A&R143A',
+                     (0.357816784026318, 0.0382639950410712, 0.603919220932611), backend)
     elif name.find('R448A') > -1:
-        refrigerant_data[0] = 'R448A'
-        refrigerant_data[1] = 'REFPROP'
-        refrigerant_data[2] = 'R32&R125&R1234YF&R134A&R1234ZE'
-        refrigerant_data[3] = (0.431218201988559, 0.186914131481992, 0.151319256485899, 0.177586673617217, 0.0529617364263329)
-        refrigerant_data[4] = 'REFPROP::R32[0.431218201988559]&R125[0.186914131481992]&R1234YF[0.151319256485899]&R134A[0.177586673617217]&R1234ZE[0.0529617364263329]'
+        return blend('R448A', 'R32&R125&R1234YF&R134A&R1234ZE',
+                     (0.431218201988559, 0.186914131481992, 0.151319256485899, 0.177586673617217, 0.0529617364263329),
+                     backend)
     elif name.find('R449A') > -1:
-        refrigerant_data[0] = 'R449A'
-        refrigerant_data[1] = 'REFPROP'
-        refrigerant_data[2] = 'R32&R125&R1234YF&R134A'
-        refrigerant_data[3] = (0.407364566995509, 0.179481207732065, 0.193480840388364, 0.219673384884062)
-        refrigerant_data[4] = 'REFPROP::R32[0.407364566995509]&R125[0.179481207732065]&R1234YF[0.193480840388364]&R134A[0.219673384884062]'
+        return blend('R449A', 'R32&R125&R1234YF&R134A',
+                     (0.407364566995509, 0.179481207732065, 0.193480840388364, 0.219673384884062), backend)
     elif name.find('R407F') > -1:
-        refrigerant_data[0] = 'R407F'
-        refrigerant_data[1] = 'REFPROP'
-        refrigerant_data[2] = 'R32&R125&R134A'
-        refrigerant_data[3] = (0.473194694453358, 0.205109095413331, 0.321696210133311)
-        refrigerant_data[4] = 'REFPROP::R32[0.473194694453358]&R125[0.205109095413331]&R134A[0.321696210133311]'
-    else:
-        refrigerant_data[0] = name
-        refrigerant_data[1] = 'REFPROP'
-        refrigerant_data[2] = name
-        refrigerant_data[3] = [1.0]
-        refrigerant_data[4] = 'REFPROP::' + name
+        return blend('R407F', 'R32&R125&R134A',
+                     (0.473194694453358, 0.205109095413331, 0.321696210133311), backend)
 
-    return refrigerant_data
+    return blend(name, name, [1.0], backend)
 
 # Sandbox input data
 def manual():
@@ -0,0 +1,167 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import CoolProp.CoolProp as CoolProp
+from timeit import default_timer
+import bisect
+import heapq
+import json
+
+# Description:
+# This file contains the opt-in instrumentation of Vcc, see Vcc.set_instrumentation() and Vcc.stats().
+
+# CountingState is a proxy of a CoolProp AbstractState that counts the update calls per input pair and passes
+# everything on to the state. Stages accumulates the wall time of the stages of Vcc.calculate(). Without
+# instrumentation Vcc works on the AbstractState directly and only checks that no Stages is set.
+
+# ProfilingState also times every update. It keeps a latency histogram per input pair on logarithmic bins and the
+# slowest updates with their inputs, which shows the state points that are worth caching or tabulating. It can be
+# used by Vcc, set_instrumentation(True, vcc_instrument.ProfilingState), or wrap the AbstractState of any script.
+
+# Example:
+# R448A.set_instrumentation(True)
+# R448A.calculate_batch(t_evap, t_cond_mid)
+# print(R448A.stats())
+#
+# refrigerant = vcc_instrument.ProfilingState(CoolProp.AbstractState("REFPROP", "R125&R1234yf"))
+# ...
+# refrigerant.save('profile.json')
+
+# <--- File begin --->
+
+# Names of the input pairs used by the cycle model
+input_pairs = {
+    CoolProp.PQ_INPUTS: 'PQ_INPUTS',
+    CoolProp.QT_INPUTS: 'QT_INPUTS',
+    CoolProp.PT_INPUTS: 'PT_INPUTS',
+    CoolProp.HmassP_INPUTS: 'HmassP_INPUTS',
+    CoolProp.PSmass_INPUTS: 'PSmass_INPUTS'
+}
+
+def pair_name(pair):
+    return input_pairs.get(pair, str(pair))
+
+# AbstractState that counts its updates
+class CountingState(object):
+
+    def __init__(self, state):
+        self.state = state
+
+        # Number of updates by input pair
+        self.counts = {}
+
+    def update(self, pair, value_1, value_2):
+        self.counts[pair] = self.counts.get(pair, 0) + 1
+
+        return self.state.update(pair, value_1, value_2)
+
+    def __getattr__(self, name):
+        # Everything else is the AbstractState
+        return getattr(self.state, name)
+
+    def reset(self):
+        self.counts = {}
+
+    def info(self):
+        # Updates by the name of the input pair
+        return dict((pair_name(pair), self.counts[pair]) for pair in self.counts)
+
+# Accumulated wall time of named stages
+class Stages:
+
+    def __init__(self):
+        self.time = {}
+        self.calls = {}
+        self._last = default_timer()
+
+    def start(self):
+        self._last = default_timer()
+
+    def lap(self, stage):
+        # Add the time since the last start or lap to stage
+        now = default_timer()
+
+        self.time[stage] = self.time.get(stage, 0.0) + now - self._last
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+        self._last = now
+
+    def reset(self):
+        self.time = {}
+        self.calls = {}
+
+    def info(self):
+        return {'time': dict(self.time), 'calls': dict(self.calls)}
+
+# AbstractState that also times its updates
+class ProfilingState(CountingState):
+
+    def __init__(self, state, slowest=20, bins_per_decade=4):
+        CountingState.__init__(self, state)
+
+        # Latency histograms by input pair on logarithmic bins from 100 ns to 1 s, the last bin takes the rest
+        self.edges = [10 ** (-7 + float(i) / bins_per_decade) for i in range(0, 7 * bins_per_decade + 1)]
+        self.histograms = {}
+        self.time = {}
+        self.failures = {}
+
+        # Heap of the slowest updates as (seconds, input pair, first input, second input, failed)
+        self.slowest = slowest
+        self._slowest = []
+
+    def update(self, pair, value_1, value_2):
+        start = default_timer()
+        failed = False
+
+        try:
+            return self.state.update(pair, value_1, value_2)
+        except:
+            failed = True
+            raise
+        finally:
+            seconds = default_timer() - start
+
+            self.counts[pair] = self.counts.get(pair, 0) + 1
+            self.time[pair] = self.time.get(pair, 0.0) + seconds
+
+            if pair not in self.histograms:
+                self.histograms[pair] = [0] * len(self.edges)
+            self.histograms[pair][max(bisect.bisect_right(self.edges, seconds) - 1, 0)] += 1
+
+            if failed:
+                self.failures[pair] = self.failures.get(pair, 0) + 1
+
+            if len(self._slowest) < self.slowest:
+                heapq.heappush(self._slowest, (seconds, pair, value_1, value_2, failed))
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, (seconds, pair, value_1, value_2, failed))
+
+    def reset(self):
+        CountingState.reset(self)
+        self.histograms = {}
+        self.time = {}
+        self.failures = {}
+        self._slowest = []
+
+    def profile(self):
+        # Latency statistics by input pair and the slowest updates, slowest first
+        pairs = {}
+
+        for pair in self.counts:
+            pairs[pair_name(pair)] = {
+                'count': self.counts[pair],
+                'failures': self.failures.get(pair, 0),
+                'total': self.time[pair],
+                'mean': self.time[pair] / self.counts[pair],
+                'histogram': self.histograms[pair]
+            }
+
+        slowest = [{'seconds': seconds, 'pair': pair_name(pair), 'inputs': [value_1, value_2], 'failed': failed}
+                   for seconds, pair, value_1, value_2, failed in sorted(self._slowest, reverse=True)]
+
+        return {'edges': self.edges, 'pairs': pairs, 'slowest': slowest}
+
+    def save(self, path):
+        # The profile as JSON
+        with open(path, 'w') as stream:
+            json.dump(self.profile(), stream, indent=1, sort_keys=True)
+
+        return True
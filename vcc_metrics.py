@@ -0,0 +1,95 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import collections
+
+# Description:
+# This file contains the registry of the metrics that the comparison scripts evaluate on the cycle results.
+
+# A metric is a named function of a cycle result, a Vcc or the VccBatch of a sweep, in the unit it is reported in.
+# On a VccBatch it returns an array with one value per operating point, so a metric is evaluated once for a whole
+# sweep. Every metric registered with relative=True also gets a relative variant, named with the suffix _relative,
+# that is the percent difference to the same metric of a baseline result:
+
+# (metric(result) - metric(baseline)) / metric(baseline) * 1e2
+
+# Example:
+# import vcc_metrics
+#
+# vcc_metrics.register('specific_cooling_capacity', lambda v: (v.h(0) - v.h(6)) / 1e3)
+# print(vcc_metrics.evaluate('cop_2_relative', results['R448A'], results['R404A']))
+
+# <--- File begin --->
+
+# Constants
+k = 273.15
+
+# Metrics by name
+metrics = collections.OrderedDict()
+
+class Metric:
+
+    def __init__(self, name, function, baseline=False):
+        self.name = name
+        self.function = function
+
+        # Does the function also take the result of the baseline
+        self.baseline = baseline
+
+    def __call__(self, result, baseline=None):
+        if self.baseline:
+            return self.function(result, baseline)
+
+        return self.function(result)
+
+def register(name, function, relative=True):
+    # Add a metric and its relative variant
+    metrics[name] = Metric(name, function)
+
+    if relative:
+        metrics[name + '_relative'] = Metric(name + '_relative', lambda result, baseline:
+                                             (function(result) - function(baseline)) / function(baseline) * 1e2,
+                                             baseline=True)
+
+    return metrics[name]
+
+def evaluate(name, result, baseline=None):
+    # Value of the metric name on result, relative metrics compare with baseline
+    metric = metrics[name]
+
+    if metric.baseline and baseline is None:
+        raise ValueError('The metric ' + name + ' needs a baseline result')
+
+    return metric(result, baseline)
+
+def unknown(names):
+    # The names that are not registered metrics
+    return [name for name in names if name not in metrics]
+
+def input_value(result, name):
+    # An input by its input_data name, arrays on a VccBatch
+    if hasattr(result, 'inputs'):
+        return result.inputs[name]
+
+    return getattr(result, '_' + name)
+
+# <--- Inputs --->
+
+register('ev_temperature', lambda v: input_value(v, 'ev_temperature') - k, relative=False)          # [C]
+register('co_temperature', lambda v: input_value(v, 'co_temperature') - k, relative=False)          # [C]
+register('ev_super_heat', lambda v: input_value(v, 'ev_super_heat'), relative=False)                # [K]
+register('co_sub_cooling', lambda v: input_value(v, 'co_sub_cooling'), relative=False)              # [K]
+
+# <--- Performance data --->
+
+register('cop_1', lambda v: v.cop_1())                                                              # [-]
+register('cop_2', lambda v: v.cop_2())                                                              # [-]
+register('cooling_capacity', lambda v: v.cooling_capacity() / 1e3)                                  # [kW]
+register('volumetric_cooling_capacity', lambda v: v.volumetric_cooling_capacity() / 1e3)            # [kJ/m3]
+register('discharge_temperature', lambda v: v.discharge_temperature() - k)                          # [C]
+register('mass_flow_rate', lambda v: v.mass_flow_rate() * 3600)                                     # [kg/h]
+register('volumetric_flow_rate', lambda v: v.volumetric_flow_rate() * 3600)                         # [m3/h]
+register('isentropic_efficiency', lambda v: v.isentropic_efficiency())                              # [-]
+register('compressor_power', lambda v: v.compressor_power() / 1e3)                                  # [kW]
+register('specific_power', lambda v: v.compressor_specific_power())                                 # [J/kg]
+register('pressure_ratio', lambda v: v.p(1) / v.p(0))                                               # [-]
+register('specific_heating_capacity', lambda v: v.h(1) - v.h(6))                                    # [J/kg]
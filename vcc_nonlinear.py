@@ -3,17 +3,16 @@ __author__ = 'Peter Eriksson @ KTH 2015'
 import numpy as numpy
 import CoolProp.CoolProp as CoolProp
 import vcc_input
+import vcc_state
+import vcc_export
 
 # Description:
 # This file illustrates the non-linear behaviour of temperature glide.
 
 refrigerant_data = vcc_input.refrigerant('R448A')
 
-# Initiate CoolProp with AbstractState meaning low-level interface
-refrigerant = CoolProp.AbstractState(refrigerant_data[1], refrigerant_data[2])
-
- # Set mole fractions
-refrigerant.set_mole_fractions(refrigerant_data[3])
+# Initiate CoolProp with AbstractState meaning low-level interface, with mole fractions set
+refrigerant = vcc_state.abstract_state(refrigerant_data, envelope=False)
 
 pressure = 4e5
 k = 273.15
@@ -22,36 +21,21 @@ x = numpy.linspace(0,1,10)
 
 t = numpy.zeros(len(x), numpy.float)
 
-file_1 = open('../../Report/LaTeX/data/Glide-non-linear.dat', 'w+')
-file_2 = open('../../Report/LaTeX/data/Glide-linear.dat', 'w+')
-file_3 = open('../../Report/LaTeX/data/Glide-diff.dat', 'w+')
-
-file_1.write("vapormassquality temperature\n")
-file_2.write("vapormassquality temperature\n")
-file_3.write("vapormassquality temperature\n")
-
-t_min = 0
-t_max = 0
-
-# Loop through all temperatures
+# Loop through all vapor mass qualities
 for i in range(0, len(x)):
-
     refrigerant.update(CoolProp.PQ_INPUTS, pressure, x[i])
-    file_1.write(str("%f %f\n" % (x[i], refrigerant.T()-k)))
-
-    if i==0:
-        t_min = refrigerant.T()-k
-        file_2.write(str("%f %f\n" % (x[i], t_min)))
+    t[i] = refrigerant.T()-k
 
-
-    if i==len(x)-1:
-        t_max=refrigerant.T()-k
-        file_2.write(str("%f %f\n" % (x[i], t_max)))
+t_min = t[0]
+t_max = t[-1]
 
 refrigerant.update(CoolProp.PQ_INPUTS, pressure, 0.5)
-file_3.write(str("%f %f\n" % (0.5, (t_min+t_max)/2)))
-file_3.write(str("%f %f\n" % (0.5, refrigerant.T()-k)))
 
-file_1.close()
-file_2.close()
-file_3.close()
\ No newline at end of file
+folder = '../../Report/LaTeX/data/'
+header = ["vapormassquality", "temperature"]
+
+vcc_export.write_all([
+    (folder + 'Glide-non-linear.dat', header, [x, t]),
+    (folder + 'Glide-linear.dat', header, [[x[0], x[-1]], [t_min, t_max]]),
+    (folder + 'Glide-diff.dat', header, [[0.5, 0.5], [(t_min+t_max)/2, refrigerant.T()-k]])
+])
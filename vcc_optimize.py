@@ -0,0 +1,323 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import vcc_functions
+import vcc_input
+import multiprocessing
+import argparse
+import numpy
+
+# Description:
+# This file searches the mole fractions of a set of components for blends that replace R404A.
+
+# A candidate blend is solved with calculate_batch on the operating points of the search, with the input_data and
+# compressor of the search, and compared with R404A solved the same way. It has three objectives, all minimized:
+
+# gwp           GWP (AR4, 100 years) of the blend, the mass weighted GWP of the components [-]
+# capacity      largest deviation of the cooling capacity from R404A over the operating points [%]
+# discharge     largest deviation of the discharge temperature from R404A over the operating points [K]
+
+# The search keeps the blends that are not dominated in all three objectives, the Pareto front. The first generation
+# is drawn evenly over all compositions, the following ones half around the blends of the front and half evenly
+# again. The mole fractions are rounded to step, so a composition that is drawn again is taken from the cache instead
+# of building a new AbstractState with its phase envelope. Only new compositions count towards the budget. A cache
+# may be passed on to the next search of the same components and inputs.
+
+# The candidates of a generation are split over worker processes, each builds a Vcc per candidate. A candidate that
+# fails in any operating point gets infinite objectives and is never part of the front.
+
+# On platforms that spawn instead of fork processes (Windows) the calling script must guard the call to optimize()
+# with if __name__ == '__main__':
+
+# Example:
+# python vcc_optimize.py R32 R125 R1234YF R134A --budget 200 --jobs 8
+#
+# import vcc_optimize
+#
+# result = vcc_optimize.optimize('R32&R125&R1234YF&R134A', vcc_input.real_system2(), budget=200, jobs=8)
+# vcc_optimize.report(result)
+
+# <--- File begin --->
+
+# Constants
+k = 273.15
+
+# GWP of the components (IPCC AR4, 100 years) by their REFPROP names
+gwp = {
+    'R32': 675,
+    'R125': 3500,
+    'R134A': 1430,
+    'R143A': 4470,
+    'R1234YF': 4,
+    'R1234ZE': 7
+}
+
+# Molar mass of the components [kg/mol]
+molar_mass = {
+    'R32': 0.052024,
+    'R125': 0.120022,
+    'R134A': 0.102032,
+    'R143A': 0.084041,
+    'R1234YF': 0.114042,
+    'R1234ZE': 0.114042
+}
+
+# Names of the objectives in the columns of a result
+objectives = ('gwp', 'capacity', 'discharge')
+
+# Candidate Vcc settings of this process
+_workers = {}
+
+# REFPROP names of the fluids of CoolProp, e.g. R1234ze(E)
+refprop_names = dict((name.upper(), refprop) for refprop, name in vcc_input.heos_names.items())
+
+def names(components):
+    # The REFPROP names of the components, as used in gwp and molar_mass
+    return [refprop_names.get(c.upper(), c.upper()) for c in components.split('&')]
+
+def mass_fractions(components, fractions):
+    # Mass fractions of the mole fractions
+    masses = numpy.array([molar_mass[c] for c in names(components)]) * numpy.asarray(fractions)
+
+    return masses / numpy.sum(masses)
+
+def blend_gwp(components, fractions):
+    # Mass weighted GWP of the blend
+    return float(numpy.dot(mass_fractions(components, fractions), [gwp[c] for c in names(components)]))
+
+def pareto(values):
+    # Mask of the rows that no other row is at least as good as in all columns and better in one, rows that are not
+    # finite are never on the front
+    values = numpy.asarray(values, dtype=numpy.float)
+    front = numpy.all(numpy.isfinite(values), axis=1)
+
+    for i in numpy.flatnonzero(front):
+        others = values[front]
+        dominated = numpy.all(others <= values[i], axis=1) & numpy.any(others < values[i], axis=1)
+
+        if numpy.any(dominated):
+            front[i] = False
+
+    return front
+
+def rounded(fractions, step):
+    # Mole fractions rounded to step and summing to one, as integer steps
+    fractions = numpy.asarray(fractions, dtype=numpy.float)
+    steps = int(round(1 / step))
+    counts = numpy.floor(fractions / numpy.sum(fractions) * steps).astype(int)
+
+    # The steps lost in rounding down go to the largest remainders
+    remainders = fractions / numpy.sum(fractions) * steps - counts
+    counts[numpy.argsort(-remainders)[0:steps - numpy.sum(counts)]] += 1
+
+    return tuple(counts.tolist())
+
+def evaluate(refrigerant_data, settings):
+    # Cooling capacity and discharge temperature over the operating points, rows 0 and 1
+    vcc = vcc_functions.Vcc(refrigerant_data, shared=False)
+    vcc.set_input_data(settings['input_data'])
+    vcc.set_volumetric_flow_rate(settings['volumetric_flow_rate'])
+    vcc.set_compressor_data(settings['efficiency'])
+
+    batch = vcc.calculate_batch(settings['ev_temperatures'], settings['co_temperatures'], errors='record')
+
+    values = numpy.array([batch.cooling_capacity(), batch.discharge_temperature()], dtype=numpy.float)
+    values[:, batch.failed()] = numpy.nan
+
+    return values
+
+def _initialize(components, backend, settings):
+    # The components and settings of a worker process
+    _workers.clear()
+    _workers['components'] = components
+    _workers['backend'] = backend
+    _workers['settings'] = settings
+
+def _solve(task):
+    # Evaluate a chunk of compositions, a composition that can not be created is nan
+    step, keys = task
+    values = []
+
+    for key in keys:
+        fractions = [count * step for count in key]
+        refrigerant_data = vcc_input.blend(_workers['components'], _workers['components'], fractions,
+                                           _workers['backend'])
+
+        try:
+            values.append(evaluate(refrigerant_data, _workers['settings']))
+        except Exception:
+            values.append(numpy.nan * numpy.zeros((2, len(_workers['settings']['ev_temperatures']))))
+
+    return values
+
+def _draw(random, front, size, step, n):
+    # Compositions of a generation, half around the front and half evenly
+    keys = []
+
+    for i in range(0, size):
+        if len(front) > 0 and i % 2 == 0:
+            # Concentrated around a blend of the front, a mole fraction of zero stays close to zero
+            center = numpy.array(front[random.randint(len(front))], dtype=numpy.float) * step
+            fractions = random.dirichlet(center * 50 + 0.05)
+        else:
+            fractions = random.dirichlet(numpy.ones(n))
+
+        keys.append(rounded(fractions, step))
+
+    return keys
+
+def optimize(components, input_data, budget=100, ev_temperatures=None, co_temperatures=None, efficiency=None,
+             volumetric_flow_rate=0.00653, reference='R404A', backend=None, step=0.01, population=16, jobs=1,
+             chunks_per_job=1, seed=0, cache=None):
+    # Pareto front of the mole fractions of components, e.g. 'R32&R125&R1234YF', within budget new compositions
+    # The isentropic efficiency defaults to the one of input_data. The cache dict of objectives by composition is
+    # filled in and may be passed on to the next search.
+    if backend is None:
+        backend = vcc_input.default_backend
+
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+
+    if efficiency is None:
+        efficiency = input_data['efficiency_isentropic']
+
+    if not efficiency > 0:
+        print('Optimize: an isentropic efficiency is needed, the compressor files are refrigerant specific')
+        return None
+
+    reference_data = vcc_input.refrigerant(reference, backend)
+
+    for component in names(components) + names(reference_data[2]):
+        if component not in gwp:
+            print('Optimize: no GWP of ' + component)
+            return None
+
+    if ev_temperatures is None:
+        ev_temperatures = numpy.array([-35, -25, -10]) + k
+
+    if co_temperatures is None:
+        co_temperatures = numpy.array([40, 40, 40]) + k
+
+    if cache is None:
+        cache = {}
+
+    settings = {
+        'input_data': input_data,
+        'efficiency': efficiency,
+        'volumetric_flow_rate': volumetric_flow_rate,
+        'ev_temperatures': numpy.asarray(ev_temperatures, dtype=numpy.float),
+        'co_temperatures': numpy.asarray(co_temperatures, dtype=numpy.float)
+    }
+
+    # The reference is solved in this process
+    baseline = evaluate(reference_data, settings)
+
+    if not numpy.all(numpy.isfinite(baseline)):
+        print('Optimize: the reference ' + reference + ' fails in an operating point')
+        return None
+
+    n = len(components.split('&'))
+    random = numpy.random.RandomState(seed)
+    pool = None
+
+    if jobs > 1:
+        pool = multiprocessing.Pool(jobs, _initialize, (components, backend, settings))
+    else:
+        _initialize(components, backend, settings)
+
+    evaluated = 0
+    front = []
+
+    try:
+        # Generations until the budget is spent, or until the draws only give compositions of the cache
+        repeats = 0
+
+        while evaluated < budget and repeats < 10:
+            keys = []
+
+            for key in _draw(random, front, population, step, n):
+                if key not in cache and key not in keys and evaluated + len(keys) < budget:
+                    keys.append(key)
+
+            repeats = repeats + 1 if len(keys) == 0 else 0
+
+            if len(keys) == 0:
+                continue
+
+            # Contiguous chunks of the generation
+            splits = numpy.array_split(numpy.arange(len(keys)), max(1, min(len(keys), jobs * chunks_per_job)))
+            tasks = [(step, [keys[i] for i in indices]) for indices in splits]
+
+            if pool is not None:
+                values = sum(pool.map(_solve, tasks, 1), [])
+            else:
+                values = sum([_solve(task) for task in tasks], [])
+
+            for key, value in zip(keys, values):
+                fractions = [count * step for count in key]
+                deviation = numpy.array([numpy.max(numpy.abs(value[0] / baseline[0] - 1)) * 100,
+                                         numpy.max(numpy.abs(value[1] - baseline[1]))])
+
+                if not numpy.all(numpy.isfinite(deviation)):
+                    deviation[:] = numpy.inf
+
+                cache[key] = {'fractions': fractions, 'gwp': blend_gwp(components, fractions),
+                              'capacity': float(deviation[0]), 'discharge': float(deviation[1]),
+                              'values': value}
+
+            evaluated += len(keys)
+
+            # The front of all compositions of the cache so far
+            known = list(cache.keys())
+            front = [known[i] for i in numpy.flatnonzero(pareto([[cache[key][name] for name in objectives]
+                                                                  for key in known]))]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    keys = list(cache.keys())
+    table = numpy.array([[cache[key][name] for name in objectives] for key in keys], dtype=numpy.float)
+
+    return {
+        'components': components,
+        'reference': reference,
+        'reference_gwp': blend_gwp(reference_data[2], reference_data[3]),
+        'evaluated': evaluated,
+        'fractions': numpy.array([cache[key]['fractions'] for key in keys], dtype=numpy.float),
+        'gwp': table[:, 0],
+        'capacity': table[:, 1],
+        'discharge': table[:, 2],
+        'failed': ~numpy.all(numpy.isfinite(table), axis=1),
+        'front': pareto(table)
+    }
+
+def report(result):
+    # The blends of the front sorted by GWP
+    components = result['components'].split('&')
+    front = numpy.flatnonzero(result['front'])
+    front = front[numpy.argsort(result['gwp'][front])]
+
+    print(str(result['evaluated']) + ' compositions evaluated, ' + str(int(numpy.sum(result['failed']))) +
+          ' failed, ' + str(len(front)) + ' on the front')
+    print('Reference ' + result['reference'] + ', GWP %.0f' % result['reference_gwp'])
+    print(''.join(['%9s' % component for component in components]) + ' %7s %13s %14s' %
+          ('GWP', 'capacity [%]', 'discharge [K]'))
+
+    for i in front:
+        print(''.join(['%9.2f' % f for f in result['fractions'][i]]) + ' %7.0f %13.2f %14.2f' %
+              (result['gwp'][i], result['capacity'][i], result['discharge'][i]))
+
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Blends of the components that replace R404A at a low GWP')
+    parser.add_argument('components', nargs='+', help='Components by their REFPROP names, e.g. R32 R125 R1234YF')
+    parser.add_argument('--budget', type=int, default=100, help='Number of compositions to evaluate')
+    parser.add_argument('--jobs', type=int, default=None, help='Worker processes, the number of cpus by default')
+    parser.add_argument('--backend', default=vcc_input.default_backend, help='Property backend, e.g. HEOS')
+    parser.add_argument('--step', type=float, default=0.01, help='Step of the mole fractions')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the search')
+    arguments = parser.parse_args()
+
+    report(optimize('&'.join(arguments.components), vcc_input.real_system2(), arguments.budget,
+                    backend=arguments.backend, step=arguments.step, jobs=arguments.jobs, seed=arguments.seed))
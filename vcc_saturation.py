@@ -0,0 +1,196 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import numpy as numpy
+import CoolProp.CoolProp as CoolProp
+from scipy.interpolate import InterpolatedUnivariateSpline
+
+# Description:
+# This file contains the saturation properties used by the condenser and evaporator pressure loops of Vcc.
+
+# Saturation evaluates them with exact flashes on the AbstractState of the Vcc instance.
+
+# SaturationTable evaluates them from a table that is built once per refrigerant. Temperature, enthalpy, entropy and
+# specific volume are tabulated against pressure on a number of vapor mass quality levels between the bubble (Q = 0) and dew
+# (Q = 1) curves. Along pressure the table uses cubic splines in log(p), between the quality levels it interpolates
+# linearly which follows the non-linear glide of the zeotropic mixtures. The table is validated against exact flashes
+# half way between the nodes and the largest deviations are kept in SaturationTable.error.
+
+# The pressure loops converge on the table and finish with exact flashes, which then only need one or two iterations.
+# The table thereby changes the number of flashes, not the accuracy of the results.
+
+# Example:
+# R448A = vcc_functions.Vcc(vcc_input.refrigerant('R448A'))
+# R448A.build_saturation_table(resolution=200)
+# print(R448A._saturation_table.error)
+
+# <--- File begin --->
+
+def critical_point(refrigerant):
+    # Temperature and pressure at the top of the two-phase region
+    try:
+        temperature_critical = refrigerant.true_critical_point()[0]
+        refrigerant.update(CoolProp.QT_INPUTS, 0, temperature_critical)
+
+        return temperature_critical, refrigerant.p()
+
+    except ValueError:
+        # Not implemented by all backends, e.g. pure fluids with HEOS
+        return refrigerant.T_critical(), refrigerant.p_critical()
+
+def dome(refrigerant, p_min, resolution):
+    # Bubble and dew curves from the bubble temperature at p_min up to the critical temperature
+    # Rows: temperature, bubble pressure, enthalpy and entropy, dew pressure, enthalpy and entropy
+    refrigerant.update(CoolProp.PQ_INPUTS, p_min, 0)
+    temperature_min = refrigerant.T()
+
+    # Get the critical temperature, top of the two-phase plot
+    temperature_critical = critical_point(refrigerant)[0]
+
+    curves = numpy.zeros((7, resolution), dtype=numpy.float)
+    curves[0] = numpy.linspace(temperature_min, temperature_critical, resolution)
+
+    for i in range(0, resolution):
+        # Calculate the envelope for Q = 0
+        refrigerant.update(CoolProp.QT_INPUTS, 0, curves[0, i])
+        curves[1:4, i] = refrigerant.p(), refrigerant.hmass(), refrigerant.smass()
+
+        # Calculate the envelope for Q = 1
+        refrigerant.update(CoolProp.QT_INPUTS, 1, curves[0, i])
+        curves[4:7, i] = refrigerant.p(), refrigerant.hmass(), refrigerant.smass()
+
+    return curves
+
+# Saturation properties from exact flashes
+class Saturation:
+
+    def __init__(self, refrigerant):
+        self._refrigerant = refrigerant
+
+    def T(self, p, q):
+        # Temperature at pressure and vapor mass quality
+        self._refrigerant.update(CoolProp.PQ_INPUTS, p, q)
+        return self._refrigerant.T()
+
+    def p(self, q, T):
+        # Pressure at vapor mass quality and temperature
+        self._refrigerant.update(CoolProp.QT_INPUTS, q, T)
+        return self._refrigerant.p()
+
+    def QT(self, h, p):
+        # Vapor mass quality and temperature at enthalpy and pressure
+        self._refrigerant.update(CoolProp.HmassP_INPUTS, h, p)
+        return self._refrigerant.Q(), self._refrigerant.T()
+
+# Saturation properties from a table
+class SaturationTable:
+
+    def __init__(self, refrigerant, p_min=0.5e5, p_max=None, resolution=200, qualities=11, validate=True):
+        # The highest pressure defaults to 95 % of the pressure at the critical temperature
+        if p_max is None:
+            p_max = 0.95 * critical_point(refrigerant)[1]
+
+        self.p_min = p_min
+        self.p_max = p_max
+        self.resolution = resolution
+
+        # Nodes
+        self._q = numpy.linspace(0, 1, qualities)
+        self._x = numpy.linspace(numpy.log(p_min), numpy.log(p_max), resolution)
+
+        # Tabulated properties, one row per quality level
+        self._values = {}
+        for name in ('T', 'h', 's', 'v'):
+            self._values[name] = numpy.zeros((qualities, resolution), dtype=numpy.float)
+
+        for j in range(0, len(self._q)):
+            for i in range(0, len(self._x)):
+                refrigerant.update(CoolProp.PQ_INPUTS, numpy.exp(self._x[i]), self._q[j])
+                self._values['T'][j, i] = refrigerant.T()
+                self._values['h'][j, i] = refrigerant.hmass()
+                self._values['s'][j, i] = refrigerant.smass()
+                self._values['v'][j, i] = 1 / refrigerant.rhomass()
+
+        # Splines along log(p) and the inverse splines of log(p) along the temperature
+        self._splines = {}
+        for name in self._values:
+            self._splines[name] = [InterpolatedUnivariateSpline(self._x, self._values[name][j], k=3)
+                                   for j in range(0, len(self._q))]
+
+        self._inverse = [InterpolatedUnivariateSpline(self._values['T'][j], self._x, k=3)
+                         for j in range(0, len(self._q))]
+
+        # Largest deviations from exact flashes, in K, J/kg, J/kgK, kg/m3 and Pa
+        self.error = {}
+
+        if validate:
+            self.validate(refrigerant)
+
+    def validate(self, refrigerant):
+        # Compare with exact flashes half way between the pressure nodes and half way between the quality levels
+        x_mid = (self._x[1:] + self._x[:-1]) / 2
+        q_mid = (self._q[1:] + self._q[:-1]) / 2
+
+        points = [(x, q) for x in x_mid for q in self._q] + [(x, q) for x in self._x[1:-1] for q in q_mid]
+
+        self.error = {'T': 0.0, 'h': 0.0, 's': 0.0, 'd': 0.0, 'p': 0.0}
+
+        for x, q in points:
+            p = numpy.exp(x)
+            refrigerant.update(CoolProp.PQ_INPUTS, p, q)
+
+            self.error['T'] = max(self.error['T'], abs(self.T(p, q) - refrigerant.T()))
+            self.error['h'] = max(self.error['h'], abs(self.value('h', p, q) - refrigerant.hmass()))
+            self.error['s'] = max(self.error['s'], abs(self.value('s', p, q) - refrigerant.smass()))
+            self.error['d'] = max(self.error['d'], abs(self.value('d', p, q) - refrigerant.rhomass()))
+            self.error['p'] = max(self.error['p'], abs(self.p(q, refrigerant.T()) - p))
+
+        return self.error
+
+    def covers(self, p):
+        return self.p_min <= p <= self.p_max
+
+    def _levels(self, q):
+        # The two quality levels around q and the weight of the upper one
+        j = min(max(numpy.searchsorted(self._q, q) - 1, 0), len(self._q) - 2)
+        return j, (q - self._q[j]) / (self._q[j + 1] - self._q[j])
+
+    def value(self, name, p, q):
+        # Tabulated property at pressure and vapor mass quality, nan outside of the table
+        if not self.covers(p) or not 0 <= q <= 1:
+            return numpy.nan
+
+        # The density is interpolated as specific volume which is close to linear in the quality
+        if name == 'd':
+            return 1 / self.value('v', p, q)
+
+        x = numpy.log(p)
+        j, w = self._levels(q)
+
+        return (1 - w) * float(self._splines[name][j](x)) + w * float(self._splines[name][j + 1](x))
+
+    def T(self, p, q):
+        return self.value('T', p, q)
+
+    def p(self, q, T):
+        if not 0 <= q <= 1:
+            return numpy.nan
+
+        j, w = self._levels(q)
+        p = numpy.exp((1 - w) * float(self._inverse[j](T)) + w * float(self._inverse[j + 1](T)))
+
+        return p if self.covers(p) else numpy.nan
+
+    def QT(self, h, p):
+        if not self.covers(p):
+            return numpy.nan, numpy.nan
+
+        # The enthalpy rises with the quality at constant pressure
+        x = numpy.log(p)
+        h_levels = [float(spline(x)) for spline in self._splines['h']]
+
+        if not h_levels[0] <= h <= h_levels[-1]:
+            return numpy.nan, numpy.nan
+
+        q = numpy.interp(h, h_levels, self._q)
+
+        return q, self.T(p, q)
@@ -0,0 +1,117 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import numpy as numpy
+
+# Description:
+# This file contains the solvers of the condenser and evaporator pressure loops of Vcc.
+
+# A solver finds the pressure where the correction of the loop is zero. The correction is the pressure change that
+# the loop would apply in the next fixed point step, and the loop is converged when it is below the tolerance.
+
+# FixedPoint applies the correction as it is, which is the original loop of Vcc. It converges linearly and slows down
+# near the critical point or with large pressure drops.
+# Secant uses the last two corrections to extrapolate to zero. As soon as two corrections of opposite sign are known
+# the root is bracketed, and steps that would leave the bracket are replaced by bisection.
+
+# Both stop with a ConvergenceError after max_iterations instead of looping forever. A correction that is not a
+# number ends the solve with nan, which is how a saturation table signals that it does not cover the state.
+
+# Example:
+# R404A.set_solver('secant', tolerance=1, max_iterations=50, warm_start=True)
+
+# <--- File begin --->
+
+class ConvergenceError(Exception):
+    pass
+
+# Fixed point iteration
+class FixedPoint:
+
+    def __init__(self, tolerance=1, max_iterations=100):
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+
+        # Number of corrections evaluated in the last solve
+        self.iterations = 0
+
+    def solve(self, correction, x):
+        self.iterations = 0
+
+        # Start value of the error term
+        dx = numpy.inf
+
+        while abs(dx) > self.tolerance:
+            if self.iterations >= self.max_iterations:
+                raise ConvergenceError('No convergence in %d iterations, last correction %g' % (self.iterations, dx))
+
+            dx = correction(x)
+            self.iterations += 1
+
+            # Correct
+            x += dx
+
+        return x
+
+# Secant iteration with bracketing fallback
+class Secant(FixedPoint):
+
+    def solve(self, correction, x):
+        self.iterations = 0
+
+        # The first step is a fixed point step
+        x_last = x
+        dx_last = correction(x)
+        self.iterations += 1
+
+        if not numpy.isfinite(dx_last) or abs(dx_last) <= self.tolerance:
+            return x + dx_last
+
+        x = x + dx_last
+
+        # Bracket of the root, once found
+        bracket = None
+
+        while True:
+            if self.iterations >= self.max_iterations:
+                raise ConvergenceError('No convergence in %d iterations, last correction %g' % (self.iterations, dx_last))
+
+            dx = correction(x)
+            self.iterations += 1
+
+            if not numpy.isfinite(dx) or abs(dx) <= self.tolerance:
+                return x + dx
+
+            # A change of sign brackets the root, the end with the same sign as the new correction is then replaced
+            if bracket is None:
+                if dx * dx_last < 0:
+                    bracket = [(x_last, dx_last), (x, dx)]
+            elif dx * bracket[0][1] > 0:
+                bracket[0] = (x, dx)
+            else:
+                bracket[1] = (x, dx)
+
+            # Secant step, a flat secant falls back to the fixed point step
+            if dx != dx_last:
+                x_next = x - dx * (x - x_last) / (dx - dx_last)
+            else:
+                x_next = x + dx
+
+            # Bisection if the step leaves the bracket
+            if bracket is not None:
+                lower = min(bracket[0][0], bracket[1][0])
+                upper = max(bracket[0][0], bracket[1][0])
+
+                if not lower < x_next < upper:
+                    x_next = (lower + upper) / 2
+
+            x_last, dx_last = x, dx
+            x = x_next
+
+solvers = {'fixed_point': FixedPoint, 'secant': Secant}
+
+def solver(name, tolerance=1, max_iterations=100):
+    # Instantiate a solver by name
+    if name not in solvers:
+        raise ValueError('Unknown solver ' + str(name) + ', choose one of ' + ', '.join(sorted(solvers.keys())))
+
+    return solvers[name](tolerance, max_iterations)
@@ -0,0 +1,83 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import CoolProp.CoolProp as CoolProp
+import os
+import threading
+
+# Description:
+# This file hands out CoolProp AbstractStates, shared by all Vcc instances of the same refrigerant.
+
+# Creating an AbstractState, setting the mole fractions and building the phase envelope is the slowest part of
+# instantiating a Vcc, especially for REFPROP mixtures. The states are therefore kept by the refrigerant key
+# (backend, fluid string, mole fractions) of vcc_input.refrigerant(name) and reused, the envelope is built once.
+
+# An AbstractState is not thread safe, so the states are kept per thread. A Vcc should be used in the thread that
+# created it. A forked worker process, e.g. of vcc_sweep, does not use the states of its parent but builds its own.
+# Sharing a state within a thread is safe since Vcc updates the state before every read.
+
+# The tabular backends of CoolProp, e.g. 'BICUBIC&HEOS', do not build a phase envelope. Their states are created
+# without it and interpolate the saturation properties in their own tables instead. The tables are built on the
+# first update and kept by CoolProp in memory and on disk, in ~/.CoolProp/Tables.
+
+# The state of a refrigerant is shared as long as its mole fractions are not changed, scripts that change them,
+# like vcc_zeotropic, create their own state with new_state().
+
+# Example:
+# state = vcc_state.abstract_state(vcc_input.refrigerant('R448A'))
+
+# <--- File begin --->
+
+# States of the current process and thread
+_local = threading.local()
+
+def key(refrigerant_data):
+    # Backend, fluid string and mole fractions
+    return refrigerant_data[1], refrigerant_data[2], tuple([float(f) for f in refrigerant_data[3]])
+
+def _states():
+    # A forked process inherits the states of its parent thread, start over with its own
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.states = {}
+
+    return _local.states
+
+def tabular(refrigerant_data):
+    # Tables on top of another backend, e.g. 'TTSE&REFPROP'
+    return refrigerant_data[1].find('&') > -1
+
+def new_state(refrigerant_data, envelope=True):
+    # A new state that is not shared
+    state = CoolProp.AbstractState(refrigerant_data[1], refrigerant_data[2])
+
+    # Set mole fractions, the tables of a pure fluid have none
+    if len(refrigerant_data[3]) > 1 or not tabular(refrigerant_data):
+        state.set_mole_fractions(refrigerant_data[3])
+
+    # Build custom composition envelope
+    if envelope and not tabular(refrigerant_data):
+        state.build_phase_envelope(refrigerant_data[0])
+
+    return state
+
+def abstract_state(refrigerant_data, envelope=True):
+    # The shared state of the refrigerant in this thread
+    states = _states()
+    name = key(refrigerant_data)
+
+    if name not in states:
+        states[name] = {'state': new_state(refrigerant_data, envelope), 'envelope': envelope}
+
+    # A state created without the envelope gets it when asked for
+    elif envelope and not states[name]['envelope']:
+        if not tabular(refrigerant_data):
+            states[name]['state'].build_phase_envelope(refrigerant_data[0])
+        states[name]['envelope'] = True
+
+    return states[name]['state']
+
+def clear():
+    # Forget the states of this thread
+    _states().clear()
+
+    return True
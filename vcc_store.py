@@ -0,0 +1,200 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import vcc_functions
+import vcc_metrics
+import vcc_export
+import numpy
+import tempfile
+import shutil
+import json
+import re
+import os
+
+# Description:
+# This file contains the columnar store of sweep results.
+
+# The store is a folder with a manifest.json and one .npy file per column and chunk. Every append of a VccBatch adds
+# a chunk with the columns:
+
+# states        (N, 10) state points with the fields T, p, h, s, d and x, see vcc_functions.state_dtype
+# h1k_is        (N) isentropic compressor outlet enthalpy
+# in_envelope   (N) operating point within the application limits of the compressor
+# Q, P, m, I    (N) compressor polynomial results
+# input.<name>  (N) input of input_data, e.g. input.ev_temperature
+# index         (N) optional position of the operating points in a sweep, see vcc_sweep
+
+# The manifest lists the chunks of every refrigerant with their size, compressor settings and the exceptions of the
+# points that failed. It is replaced atomically after the column files are written. Columns are read memory mapped,
+# a refrigerant with one chunk is then loaded without copying. Any metric of vcc_metrics and the .dat files of the
+# report can be derived from the store without solving the cycles again.
+
+# Example:
+# import vcc_store
+#
+# store = vcc_store.Store('results/compare', overwrite=True)
+# store.append('R448A', results['R448A'])
+# store.write_dat('COP2_MR_R448A.dat', 'R448A', 'ev_temperature', 'cop_2_relative', 'evaporator', 'COP2',
+#                 where={'co_temperature': 35 + k}, baseline='R404A')
+
+# <--- File begin --->
+
+manifest_name = 'manifest.json'
+
+# Columns besides the inputs, with the attribute of VccBatch they are stored from
+columns = {'states': 'states', 'h1k_is': '_h1k_is', 'in_envelope': 'in_envelope'}
+compressor_columns = ('Q', 'P', 'm', 'I')
+
+class Store:
+
+    def __init__(self, path, overwrite=False):
+        self.path = path
+
+        if overwrite and os.path.isdir(path):
+            shutil.rmtree(path)
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        self.manifest = {'version': 1, 'refrigerants': {}}
+
+        if os.path.isfile(os.path.join(path, manifest_name)):
+            with open(os.path.join(path, manifest_name), 'r') as stream:
+                self.manifest = json.load(stream)
+
+    def refrigerants(self):
+        return sorted(self.manifest['refrigerants'].keys())
+
+    def size(self, refrigerant):
+        # Number of operating points of a refrigerant
+        return sum([chunk['size'] for chunk in self.manifest['refrigerants'].get(refrigerant, [])])
+
+    def _file(self, refrigerant, chunk, column):
+        # File names keep to letters, digits and a few separators
+        return os.path.join(self.path, '%s-%d-%s.npy' % (re.sub('[^A-Za-z0-9_.()]', '_', refrigerant), chunk, column))
+
+    def append(self, refrigerant, batch, points=None):
+        # Add the operating points of a VccBatch as a new chunk of refrigerant, optionally with their positions
+        chunks = self.manifest['refrigerants'].setdefault(refrigerant, [])
+        index = len(chunks)
+
+        if points is not None:
+            numpy.save(self._file(refrigerant, index, 'index'), numpy.asarray(points, dtype=numpy.int64))
+
+        for column in columns:
+            numpy.save(self._file(refrigerant, index, column), getattr(batch, columns[column]))
+
+        for column in compressor_columns:
+            numpy.save(self._file(refrigerant, index, column), getattr(batch._compressor, '_' + column))
+
+        for name in batch.inputs:
+            numpy.save(self._file(refrigerant, index, 'input.' + name), batch.inputs[name])
+
+        chunks.append({
+            'size': len(batch),
+            'inputs': sorted(batch.inputs.keys()),
+            'EN12900': bool(batch._compressor.EN12900),
+            'set_efficiency': float(batch._compressor.set_efficiency),
+            'refrigerant_name': str(batch._compressor._refrigerant_name),
+            'volumetric_flow_rate': float(batch._volumetric_flow_rate),
+            'index': points is not None,
+            'errors': dict((str(i), str(batch.errors[i])) for i in numpy.flatnonzero(batch.failed()))
+        })
+
+        self.save()
+
+        return True
+
+    def save(self):
+        # Replace the manifest through a temporary file, an interrupted append leaves the previous manifest
+        handle, temporary = tempfile.mkstemp(suffix='.json', dir=self.path)
+
+        with os.fdopen(handle, 'w') as stream:
+            json.dump(self.manifest, stream, indent=1, sort_keys=True)
+
+        path = os.path.join(self.path, manifest_name)
+
+        # Windows does not rename onto an existing file
+        if os.name == 'nt' and os.path.isfile(path):
+            os.remove(path)
+
+        os.rename(temporary, path)
+
+        return True
+
+    def column(self, refrigerant, column):
+        # One column of all chunks of refrigerant, memory mapped if there is only one chunk
+        chunks = self.manifest['refrigerants'][refrigerant]
+        arrays = [numpy.load(self._file(refrigerant, i, column), mmap_mode='r') for i in range(0, len(chunks))]
+
+        if len(arrays) == 1:
+            return arrays[0]
+
+        return numpy.concatenate(arrays)
+
+    def _chunk(self, refrigerant, index):
+        # The VccBatch of one chunk on the memory mapped columns
+        chunk = self.manifest['refrigerants'][refrigerant][index]
+
+        batch = vcc_functions.VccBatch(0)
+        batch.states = numpy.load(self._file(refrigerant, index, 'states'), mmap_mode='r')
+        batch._h1k_is = numpy.load(self._file(refrigerant, index, 'h1k_is'), mmap_mode='r')
+        batch.in_envelope = numpy.load(self._file(refrigerant, index, 'in_envelope'), mmap_mode='r')
+
+        for column in compressor_columns:
+            setattr(batch._compressor, '_' + column, numpy.load(self._file(refrigerant, index, column), mmap_mode='r'))
+
+        for name in chunk['inputs']:
+            batch.inputs[name] = numpy.load(self._file(refrigerant, index, 'input.' + name), mmap_mode='r')
+
+        batch._compressor.EN12900 = chunk['EN12900']
+        batch._compressor.set_efficiency = chunk['set_efficiency']
+        batch._compressor._refrigerant_name = chunk['refrigerant_name']
+        batch._volumetric_flow_rate = chunk['volumetric_flow_rate']
+
+        batch.errors = numpy.array([''] * chunk['size'], dtype=object)
+        for i in chunk.get('errors', {}):
+            batch.errors[int(i)] = chunk['errors'][i]
+
+        batch._views()
+
+        return batch
+
+    def load(self, refrigerant):
+        # All operating points of refrigerant as one VccBatch
+        batches = [self._chunk(refrigerant, i) for i in range(0, len(self.manifest['refrigerants'][refrigerant]))]
+
+        if len(batches) == 1:
+            return batches[0]
+
+        return vcc_functions.concatenate_batches(batches)
+
+    def select(self, refrigerant, where=None):
+        # The operating points of refrigerant where the inputs have the given values, e.g. {'co_temperature': 308.15}
+        batch = self.load(refrigerant)
+
+        if not where:
+            return batch
+
+        mask = numpy.ones(len(batch), dtype=numpy.bool_)
+
+        for name in where:
+            mask &= batch.inputs[name] == where[name]
+
+        return batch.take(mask)
+
+    def dat(self, path, refrigerant, x, y, xlabel, ylabel, where=None, baseline=None):
+        # The file of the metrics x and y for vcc_export, relative metrics compare with the refrigerant baseline
+        result = self.select(refrigerant, where)
+
+        if baseline is not None:
+            baseline = self.select(baseline, where)
+
+        return path, [xlabel, ylabel], [vcc_metrics.evaluate(x, result, baseline),
+                                        vcc_metrics.evaluate(y, result, baseline)]
+
+    def write_dat(self, path, refrigerant, x, y, xlabel, ylabel, where=None, baseline=None):
+        # A pgfplots .dat file of the metrics x and y
+        file = self.dat(path, refrigerant, x, y, xlabel, ylabel, where, baseline)
+        vcc_export.write_dat(*file)
+
+        return file[2]
@@ -0,0 +1,271 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import vcc_metrics
+import vcc_export
+import numpy
+import threading
+import os
+from six.moves import queue
+from timeit import default_timer
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Description:
+# This file streams the operating points of a sweep to the .dat files and plots while the sweep is running.
+
+# records() solves the operating points like Vcc.calculate_batch(), but yields a record for every point as soon as
+# it is solved. A record is a dict with the position of the point in the sweep ('index'), its inputs by their
+# input_data names ('inputs'), the metrics of vcc_metrics that are asked for, whether it is within the compressor
+# envelope ('in_envelope') and its exception ('error', empty if it was solved). The metrics of a failed point are nan.
+# Only the state points that the metrics read are solved, see Vcc.calculate(metrics).
+# The relative metrics of vcc_metrics need a baseline result and can not be streamed.
+
+# The records are consumed in background threads while the next points are solved. Every Consumer reads a bounded
+# queue, run() blocks when the queue of a consumer is full, so a slow consumer holds the sweep back instead of the
+# records piling up in memory. DatFile writes the rows of a .dat file through vcc_export.DatStream, LivePlot redraws a
+# png with the Agg backend. Neither keeps the records, the memory does not grow with the number of points. LivePlot
+# keeps the points of its lines, thinned to every other point when a line gets longer than max_points.
+
+# The points are solved sorted by condenser and evaporator temperature, see Vcc.solve_points(), so the rows of a file
+# at one condenser temperature come in the order of the evaporator temperature. If the sweep is interrupted the
+# .dat files are left as .part files with the rows that were solved.
+
+# Example:
+# import vcc_stream
+#
+# source = vcc_stream.records(R448A, t_evap, t_cond_mid, metrics=['ev_temperature', 'cop_2'])
+# vcc_stream.run(source, [vcc_stream.Consumer([
+#     vcc_stream.DatFile(folder + 'COP2_M_R448A.dat', ['evaporator', 'COP2'], 'ev_temperature', 'cop_2'),
+#     vcc_stream.LivePlot('COP2_M_R448A.png', 'ev_temperature', 'cop_2', group='co_temperature')])])
+
+# <--- File begin --->
+
+# Metrics of a record unless others are asked for
+default_metrics = ('ev_temperature', 'co_temperature', 'cop_2', 'cooling_capacity', 'discharge_temperature')
+
+def records(vcc, ev_temperatures, co_temperatures, metrics=None, compressor_data=None, errors='record', **overrides):
+    # Generator of one record per operating point as it is solved, the arguments are the ones of calculate_batch()
+    if metrics is None:
+        metrics = default_metrics
+
+    columns = vcc.batch_inputs(ev_temperatures, co_temperatures, **overrides)
+
+    if columns is None:
+        return
+
+    if vcc_metrics.unknown(metrics):
+        print('Records: Unknown metrics ' + ', '.join(vcc_metrics.unknown(metrics)))
+        return
+
+    # A record has no baseline to compare with
+    relative = [name for name in metrics if vcc_metrics.metrics[name].baseline]
+
+    if relative:
+        raise ValueError('Records: The metrics ' + ', '.join(relative) + ' need a baseline result, stream the '
+                         'metrics themselves and compare afterwards')
+
+    if compressor_data is not None and len(compressor_data) != len(columns['ev_temperature']):
+        print('Records: ' + str(len(compressor_data)) + ' compressor files for ' +
+              str(len(columns['ev_temperature'])) + ' operating points')
+        return
+
+    points = vcc.solve_points(columns, compressor_data, errors, metrics)
+
+    # Closing the records closes the points, which restores the inputs of the Vcc
+    try:
+        for i, error in points:
+            record = {'index': int(i), 'error': error,
+                      'inputs': dict((name, float(columns[name][i])) for name in columns)}
+
+            record['in_envelope'] = bool(vcc._compressor.in_envelope(columns['ev_temperature'][i],
+                                                                     columns['co_temperature'][i]))
+
+            for name in metrics:
+                record[name] = numpy.nan if error else float(vcc_metrics.evaluate(name, vcc))
+
+            yield record
+    finally:
+        points.close()
+
+# Handles the records of a bounded queue in a background thread
+class Consumer(threading.Thread):
+
+    def __init__(self, handlers, size=100):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        # Callables that take a record, with an optional close(complete)
+        self.handlers = handlers
+        self.queue = queue.Queue(maxsize=size)
+
+        # First exception of a handler, the records after it are dropped
+        self.error = None
+        self.complete = False
+
+    def put(self, record):
+        # Waits while the queue is full
+        self.queue.put(record)
+
+        return True
+
+    def run(self):
+        while True:
+            record = self.queue.get()
+
+            if record is None:
+                break
+
+            # The queue is emptied after an error, the producer would wait forever otherwise
+            if self.error is not None:
+                continue
+
+            try:
+                for handler in self.handlers:
+                    handler(record)
+            except Exception as error:
+                self.error = error
+
+        for handler in self.handlers:
+            if hasattr(handler, 'close'):
+                try:
+                    handler.close(self.complete and self.error is None)
+                except Exception as error:
+                    if self.error is None:
+                        self.error = error
+
+    def finish(self, complete=True):
+        # Handle the records left in the queue and close the handlers
+        self.complete = complete
+        self.queue.put(None)
+        self.join()
+
+        return self.error is None
+
+def run(source, consumers):
+    # Pass every record of source on to all consumers, returns the number of records
+    # The sweep stops at the first exception of a consumer, which is raised when the consumers are closed
+    # A source that is a generator, e.g. records(), is closed when the sweep stops
+    for consumer in consumers:
+        consumer.start()
+
+    count = 0
+    complete = False
+
+    try:
+        for record in source:
+            if any([consumer.error is not None for consumer in consumers]):
+                break
+
+            for consumer in consumers:
+                consumer.put(record)
+
+            count += 1
+        else:
+            complete = True
+    finally:
+        getattr(source, 'close', lambda: None)()
+
+        for consumer in consumers:
+            consumer.finish(complete)
+
+    for consumer in consumers:
+        if consumer.error is not None:
+            raise consumer.error
+
+    return count
+
+# Rows of the metrics x and y of a .dat file
+class DatFile:
+
+    def __init__(self, path, header, x, y, where=None):
+        self.x = x
+        self.y = y
+
+        # Only the records with these inputs, e.g. {'co_temperature': 308.15}, as Store.select()
+        self.where = where
+
+        self._stream = vcc_export.DatStream(path, header)
+
+    def __call__(self, record):
+        if self.where:
+            for name in self.where:
+                if record['inputs'][name] != self.where[name]:
+                    return False
+
+        return self._stream.write(record[self.x], record[self.y])
+
+    def close(self, complete=True):
+        return self._stream.close(complete)
+
+# Lines of the metrics x and y, redrawn to a png file
+class LivePlot:
+
+    def __init__(self, path, x, y, group=None, interval=5.0, max_points=1000):
+        self.path = path
+        self.x = x
+        self.y = y
+
+        # Name of the metric that splits the points into lines, e.g. co_temperature
+        self.group = group
+
+        # Seconds between the redraws
+        self.interval = interval
+        self.max_points = max_points
+
+        # Points and the number of records per kept point by line
+        self._lines = {}
+        self._drawn = default_timer()
+
+        self._figure = Figure()
+        FigureCanvasAgg(self._figure)
+        self._axes = self._figure.add_subplot(111)
+
+    def __call__(self, record):
+        key = record[self.group] if self.group is not None else ''
+        line = self._lines.setdefault(key, {'x': [], 'y': [], 'step': 1, 'count': 0})
+
+        # Every step:th record of the line is kept
+        if line['count'] % line['step'] == 0:
+            line['x'].append(record[self.x])
+            line['y'].append(record[self.y])
+
+            if len(line['x']) > self.max_points:
+                line['x'] = line['x'][::2]
+                line['y'] = line['y'][::2]
+                line['step'] *= 2
+
+        line['count'] += 1
+
+        if default_timer() - self._drawn > self.interval:
+            self.draw()
+
+        return True
+
+    def draw(self):
+        # Redraw all lines and replace the png file
+        self._axes.clear()
+
+        for key in sorted(self._lines):
+            line = self._lines[key]
+            order = numpy.argsort(line['x'])
+
+            self._axes.plot(numpy.array(line['x'])[order], numpy.array(line['y'])[order], '.-',
+                            label=str(key) if self.group is not None else None)
+
+        self._axes.set_xlabel(self.x)
+        self._axes.set_ylabel(self.y)
+
+        if self.group is not None:
+            self._axes.legend(title=self.group, loc='best')
+
+        temporary = self.path + '.part'
+        self._figure.savefig(temporary, format=os.path.splitext(self.path)[1][1:] or 'png')
+        vcc_export.replace(temporary, self.path)
+
+        self._drawn = default_timer()
+
+        return True
+
+    def close(self, complete=True):
+        # The last redraw, also of an interrupted sweep
+        return self.draw()
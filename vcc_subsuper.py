@@ -2,6 +2,8 @@ __author__ = 'Peter Eriksson @ KTH 2015'
 
 import vcc_input
 import vcc_functions
+import vcc_metrics
+import vcc_export
 import numpy
 
 # Description:
@@ -45,10 +47,8 @@ ops = [
             'name':'Super-heating',
             'xlabel':'evaporator',
             'ylabel':'COP2',
-            'xfunc':'tch',
-            'yfunc':'"VCC_"+aref+".cop_2()"',
-            'sub_cooling':'input_data["co_sub_cooling"]',
-            'super_heating':'t_range[t]',
+            'x':'ev_super_heat',
+            'y':'cop_2',
             'prefix':'Super'
         },
 
@@ -56,10 +56,8 @@ ops = [
             'name':'Super-heating-specific-power',
             'xlabel':'evaporator',
             'ylabel':'COP2',
-            'xfunc':'tch',
-            'yfunc':'"VCC_"+aref+"._compressor.specific_power()"',
-            'sub_cooling':'input_data["co_sub_cooling"]',
-            'super_heating':'t_range[t]',
+            'x':'ev_super_heat',
+            'y':'specific_power',
             'prefix':'Super'
         },
 
@@ -67,10 +65,8 @@ ops = [
             'name':'Super-heating-discharge-temperature',
             'xlabel':'evaporator',
             'ylabel':'dischargetemperature',
-            'xfunc':'tch',
-            'yfunc':'"VCC_"+aref+".T(1)-k"',
-            'sub_cooling':'input_data["co_sub_cooling"]',
-            'super_heating':'t_range[t]',
+            'x':'ev_super_heat',
+            'y':'discharge_temperature',
             'prefix':'Super'
         },
 
@@ -78,10 +74,8 @@ ops = [
             'name':'Super-heating-capacity',
             'xlabel':'evaporator',
             'ylabel':'COP2',
-            'xfunc':'tch',
-            'yfunc':'"VCC_"+aref+"._h[1]-VCC_"+aref+"._h[6]"',
-            'sub_cooling':'input_data["co_sub_cooling"]',
-            'super_heating':'t_range[t]',
+            'x':'ev_super_heat',
+            'y':'specific_heating_capacity',
             'prefix':'Super'
         },
 
@@ -90,10 +84,8 @@ ops = [
             'name':'Sub-cooling',
             'xlabel':'evaporator',
             'ylabel':'COP2',
-            'xfunc':'tch',
-            'yfunc':'"VCC_"+aref+".cop_2()"',
-            'sub_cooling':'t_range[t]',
-            'super_heating':'input_data["ev_super_heat"]',
+            'x':'co_sub_cooling',
+            'y':'cop_2',
             'prefix':'Sub',
             'calc_intersect':True
         },
@@ -117,13 +109,6 @@ for r in range(0, len(refs)):
     values[refs[r]] = dict()
 
     for o in range(0, len(ops)):
-        filename = str("%s_%s" % (ops[o]['name'], refs[r]))
-        path = str("%s%s.dat" % (folder, filename))
-        print("Opened file: " + filename)
-
-        locals()[str("FILE_%s_%s" % (ops[o]['name'], refs[r]))] = open(path, 'w+')
-        locals()[str("FILE_%s_%s" % (ops[o]['name'], refs[r]))].write(ops[o]['xlabel']+" "+ops[o]['ylabel']+"\n")
-
         if ops[o]['prefix'] == 'Super':
             values[refs[r]][o] = {
                                 'xvalue': numpy.zeros(len(super_range)),
@@ -138,9 +123,13 @@ for r in range(0, len(refs)):
 
 
 
+# Files to export
+files = []
+
 # Calculate
 # Loop through refrigerants
 for r in range(0, len(refs)):
+    results = dict()
 
     for o in range(0, len(ops)):
 
@@ -149,42 +138,43 @@ for r in range(0, len(refs)):
         else:
             t_range = sub_range
 
-        # Loop through temperatures
-        for t in range(0, len(t_range)):
+        # The varied input is the x metric of the operation, one compressor file per temperature
+        if (ops[o]['prefix'], ops[o]['x']) not in results:
+            results[(ops[o]['prefix'], ops[o]['x'])] = locals()["VCC_" + refs[r]].calculate_batch(
+                input_data['ev_temperature'], input_data['co_temperature'],
+                compressor_data=[refs[r] + compressor_name + "-" + ops[o]['prefix'] + "-" + str(t) + ".xls"
+                                 for t in t_range],
+                **{ops[o]['x']: t_range})
 
-            locals()["VCC_" + refs[r]].set_sub_cooling(eval(ops[o]['sub_cooling']))
-            locals()["VCC_" + refs[r]].set_super_heating(eval(ops[o]['super_heating']))
+        result = results[(ops[o]['prefix'], ops[o]['x'])]
 
-            # Set compressor
-            locals()["VCC_" + refs[r]].set_compressor_data(refs[r] + compressor_name + "-" + ops[o]['prefix'] + "-" + str(t_range[t]) + ".xls")
-            locals()["VCC_" + refs[r]].calculate()
+        xvalue = vcc_metrics.evaluate(ops[o]['x'], result)
+        yvalue = vcc_metrics.evaluate(ops[o]['y'], result)
 
-            xvalue = eval(eval(ops[o]['xfunc'], {}, {'tch': str(t_range[t]), 'k': str(k), 'ref': refs[0], 'aref': refs[r]}))
-            yvalue = eval(eval(ops[o]['yfunc'], {}, {'ref': refs[0], 'aref': refs[r]}))
+        path = str("%s%s_%s.dat" % (folder, ops[o]['name'], refs[r]))
+        files.append((path, [ops[o]['xlabel'], ops[o]['ylabel']], [xvalue, yvalue]))
 
-            locals()[str("FILE_%s_%s" % (ops[o]['name'], refs[r]))].write(
-                str("%f %f\n" % (xvalue, yvalue))
-            )
+        values[refs[r]][o]['xvalue'][:] = xvalue
+        values[refs[r]][o]['yvalue'][:] = yvalue
 
-            values[refs[r]][o]['xvalue'][t] = xvalue
-            values[refs[r]][o]['yvalue'][t] = yvalue
+    for key in results:
+        print(vcc_metrics.evaluate('discharge_temperature', results[key]))
+        print(vcc_metrics.evaluate('specific_power', results[key]))
+        print(vcc_metrics.evaluate('isentropic_efficiency', results[key]))
 
-            print(locals()["VCC_" + refs[r]].T(1)-273.15)
-            print(locals()["VCC_" + refs[r]]._compressor.specific_power())
-            print(locals()["VCC_" + refs[r]].isentropic_efficiency())
+# Write all files at once
+vcc_export.write_all(files)
 
 # Calculate intersections
 # Loop through all operations
 for o in range(0, len(ops)):
-    if ops[o].has_key('calc_intersect'):
-        if ops[o]['calc_intersect']:
-            for r in range(1, len(refs)):
-                print('Intersection of ' + ops[o]['name'] + '_' + refs[r])
+    if ops[o].get('calc_intersect'):
+        for r in range(1, len(refs)):
+            print('Intersection of ' + ops[o]['name'] + '_' + refs[r])
 
-                vcc_functions.data_intersect(values[refs[0]][o]['xvalue'], values[refs[0]][o]['yvalue'],
-                                             values[refs[r]][o]['xvalue'], values[refs[r]][o]['yvalue'])
+            x_intersect, y_intersect = vcc_functions.data_intersect(
+                values[refs[0]][o]['xvalue'], values[refs[0]][o]['yvalue'],
+                values[refs[r]][o]['xvalue'], values[refs[r]][o]['yvalue'])
 
-# Close file streams
-for r in range(0, len(refs)):
-    for op in ops:
-        locals()[str("FILE_%s_%s" % (op['name'], refs[r]))].close()
\ No newline at end of file
+            for i in range(0, len(x_intersect)):
+                print("intersection at: " + str(x_intersect[i]))
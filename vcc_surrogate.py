@@ -0,0 +1,289 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import vcc_saturation
+import vcc_state
+import numpy
+import bisect
+import math
+import CoolProp.CoolProp as CoolProp
+from scipy.interpolate import InterpolatedUnivariateSpline, RectBivariateSpline
+
+# Description:
+# This file contains the surrogate of the superheated vapor properties used by Vcc with set_accuracy('fast').
+
+# After the pressure loops Vcc.calculate() flashes the superheated vapor at the evaporator outlet (point 9), the
+# compressor inlet (point 0), the compressor outlet (point 1, isentropic and real) and the condenser inlet (point 2).
+# Superheat evaluates these from bicubic splines instead. The nodes are spread over log(p) and the superheat above
+# the dew temperature, T - T_dew(p), so the box follows the dew curve and contains no two-phase points. The nodes are
+# denser close to the dew curve where the properties bend the most. Enthalpy, entropy and log(density) are splined
+# and every cell of the splines is turned into a bicubic polynomial, which is evaluated with plain floats. That takes
+# a few microseconds where a call of scipy takes about as long as a flash of a pure fluid with HEOS.
+
+# It maps (p, T) -> (h, s, d), (p, s) -> h and (p, h) -> (T, s, d). The inverse maps start from the nodes of the
+# pressure and finish with Newton steps on the polynomial of the cell. Outside of the box the maps return nan and Vcc falls back to
+# the exact flash. The surrogate is validated against exact flashes half way between the nodes and the largest
+# deviations are kept in Superheat.error.
+
+# surrogate() builds the surrogate of a refrigerant on demand and keeps it for all Vcc instances of the refrigerant.
+
+# Example:
+# R448A = vcc_functions.Vcc(vcc_input.refrigerant('R448A'))
+# R448A.set_accuracy('fast')
+# print(R448A._surrogate.error)
+
+# <--- File begin --->
+
+# Surrogates by refrigerant key and box
+_surrogates = {}
+
+# Coefficients of a cubic from its values and derivatives at the ends of a unit interval
+hermite = numpy.array([[1, 0, 0, 0], [0, 0, 1, 0], [-3, 3, -2, -1], [2, -2, 1, 1]], dtype=numpy.float)
+
+def patches(x, y, spline):
+    # Bicubic coefficients of every cell of a RectBivariateSpline, a[i, j, 4 * m + n] multiplies u**m * v**n where u
+    # and v run from 0 to 1 over the cell
+    dx = numpy.diff(x)[:, None]
+    dy = numpy.diff(y)[None, :]
+
+    # Values and derivatives [[f, f_y], [f_x, f_xy]] on the nodes
+    derivatives = [[spline(x, y, dx=d_x, dy=d_y) for d_y in (0, 1)] for d_x in (0, 1)]
+
+    # Corners of the cells in the cell coordinates, rows u = 0, 1 and the u derivatives there, columns v = 0, 1 and
+    # the v derivatives there
+    corners = numpy.zeros((len(x) - 1, len(y) - 1, 4, 4), dtype=numpy.float)
+
+    for m in range(0, 4):
+        for n in range(0, 4):
+            rows = slice(0, -1) if m % 2 == 0 else slice(1, None)
+            columns = slice(0, -1) if n % 2 == 0 else slice(1, None)
+
+            corners[:, :, m, n] = (derivatives[m // 2][n // 2][rows, columns] * (dx if m > 1 else 1) *
+                                   (dy if n > 1 else 1))
+
+    return numpy.einsum('mk,ijkl,nl->ijmn', hermite, corners, hermite).reshape(len(x) - 1, len(y) - 1, 16)
+
+def cubic(a, t):
+    return a[0] + t * (a[1] + t * (a[2] + t * a[3]))
+
+def bicubic(a, u, v):
+    # Value of the coefficients of patches() at u, v
+    return (cubic(a[0:4], v) + u * (cubic(a[4:8], v) + u * (cubic(a[8:12], v) + u * cubic(a[12:16], v))))
+
+def cubic_dt(a, t):
+    return a[1] + t * (2 * a[2] + 3 * t * a[3])
+
+def along_v(a, u):
+    # Coefficients of the cubic along v at u
+    return [cubic(a[n::4], u) for n in range(0, 4)]
+
+class Superheat:
+
+    def __init__(self, refrigerant, p_min=0.5e5, p_max=None, super_heat_max=120, resolution=(60, 40), validate=True):
+        # The highest pressure defaults to 90 % of the pressure at the critical temperature
+        if p_max is None:
+            p_max = 0.9 * vcc_saturation.critical_point(refrigerant)[1]
+
+        self.p_min = p_min
+        self.p_max = p_max
+        self.super_heat_max = super_heat_max
+        self.resolution = resolution
+
+        # Hits and misses of the box
+        self.hits = 0
+        self.misses = 0
+
+        # Nodes in log(p) and superheat, quadratically denser towards the dew curve
+        self._x = numpy.linspace(numpy.log(p_min), numpy.log(p_max), resolution[0])
+        self._y = super_heat_max * numpy.linspace(0, 1, resolution[1]) ** 2
+
+        values = dict((name, numpy.zeros(resolution, dtype=numpy.float)) for name in ('h', 's', 'd'))
+        dew = numpy.zeros(resolution[0], dtype=numpy.float)
+
+        for i in range(0, len(self._x)):
+            p = numpy.exp(self._x[i])
+
+            for j in range(0, len(self._y)):
+                # The first node is on the dew curve
+                if j == 0:
+                    refrigerant.update(CoolProp.PQ_INPUTS, p, 1)
+                    dew[i] = refrigerant.T()
+                else:
+                    refrigerant.update(CoolProp.PT_INPUTS, p, dew[i] + self._y[j])
+
+                values['h'][i, j] = refrigerant.hmass()
+                values['s'][i, j] = refrigerant.smass()
+                values['d'][i, j] = numpy.log(refrigerant.rhomass())
+
+        # Polynomials of the cells as lists of floats, properties in the order h, s and log(d)
+        self._names = ('h', 's', 'd')
+        coefficients = [patches(self._x, self._y, RectBivariateSpline(self._x, self._y, values[name], kx=3, ky=3))
+                        for name in self._names]
+        self._cells = [[[coefficients[k][i, j].tolist() for k in range(0, 3)] for j in range(0, len(self._y) - 1)]
+                       for i in range(0, len(self._x) - 1)]
+
+        # Cubics of the dew temperature along log(p)
+        dew_spline = InterpolatedUnivariateSpline(self._x, dew, k=3)
+        dx = numpy.diff(self._x)
+        ends = numpy.array([dew[:-1], dew[1:], dew_spline(self._x[:-1], 1) * dx, dew_spline(self._x[1:], 1) * dx])
+        self._dew = numpy.dot(hermite, ends).T.tolist()
+
+        # Node values of h and s along the superheat on every pressure node, to find the cell of an inverse map
+        self._columns = [values[name].tolist() for name in ('h', 's')]
+
+        self._x_nodes = self._x.tolist()
+        self._y_nodes = self._y.tolist()
+        self._dx = dx.tolist()
+        self._dy = numpy.diff(self._y).tolist()
+
+        # Largest deviations from exact flashes, in J/kg, J/kgK, kg/m3 and K
+        self.error = {}
+
+        if validate:
+            self.validate(refrigerant)
+
+    def validate(self, refrigerant):
+        # Compare with exact flashes half way between the nodes
+        x_mid = ((self._x[1:] + self._x[:-1]) / 2).tolist()
+        y_mid = ((self._y[1:] + self._y[:-1]) / 2).tolist()
+
+        self.error = {'h': 0.0, 's': 0.0, 'd': 0.0, 'T': 0.0, 'h_s': 0.0}
+
+        for x in x_mid:
+            p = math.exp(x)
+            T_dew = self._dew_temperature(*self._row(x))
+
+            for y in y_mid:
+                refrigerant.update(CoolProp.PT_INPUTS, p, T_dew + y)
+                h, s, d = self.pT(p, T_dew + y)
+
+                self.error['h'] = max(self.error['h'], abs(h - refrigerant.hmass()))
+                self.error['s'] = max(self.error['s'], abs(s - refrigerant.smass()))
+                self.error['d'] = max(self.error['d'], abs(d - refrigerant.rhomass()))
+                self.error['T'] = max(self.error['T'], abs(self.ph(p, refrigerant.hmass())[0] - refrigerant.T()))
+                self.error['h_s'] = max(self.error['h_s'], abs(self.ps(p, refrigerant.smass()) - refrigerant.hmass()))
+
+        self.hits = 0
+        self.misses = 0
+
+        return self.error
+
+    def _row(self, x):
+        # Cell row of log(p) and the position within it
+        i = min(max(bisect.bisect_right(self._x_nodes, x) - 1, 0), len(self._dx) - 1)
+
+        return i, (x - self._x_nodes[i]) / self._dx[i]
+
+    def _dew_temperature(self, i, u):
+        return cubic(self._dew[i], u)
+
+    def _locate(self, p, T):
+        # Cell and position within it of pressure and temperature, None outside of the box
+        if not self.p_min <= p <= self.p_max:
+            return None
+
+        i, u = self._row(math.log(p))
+        y = T - self._dew_temperature(i, u)
+
+        if not 0 <= y <= self.super_heat_max:
+            return None
+
+        j = min(bisect.bisect_right(self._y_nodes, y) - 1, len(self._dy) - 1)
+
+        return i, j, u, (y - self._y_nodes[j]) / self._dy[j]
+
+    def _properties(self, i, j, u, v):
+        # Enthalpy, entropy and density in a cell
+        a = self._cells[i][j]
+
+        return bicubic(a[0], u, v), bicubic(a[1], u, v), math.exp(bicubic(a[2], u, v))
+
+    def pT(self, p, T):
+        # Enthalpy, entropy and density at pressure and temperature
+        cell = self._locate(p, T)
+
+        if cell is None:
+            self.misses += 1
+            return numpy.nan, numpy.nan, numpy.nan
+
+        self.hits += 1
+
+        return self._properties(*cell)
+
+    def _invert(self, k, p, value):
+        # Cell and position within it where property k has value at pressure, None outside of the box
+        if not self.p_min <= p <= self.p_max:
+            return None
+
+        i, u = self._row(math.log(p))
+
+        # Enthalpy and entropy rise with the superheat at constant pressure. The cell is found on the node values of
+        # the lower pressure node and corrected on the borders of the cells, v = 0 and v = 1.
+        last = len(self._dy) - 1
+        j = min(max(bisect.bisect_right(self._columns[k][i], value) - 1, 0), last)
+        c = along_v(self._cells[i][j][k], u)
+
+        while j > 0 and value < c[0]:
+            j -= 1
+            c = along_v(self._cells[i][j][k], u)
+
+        while j < last and value > sum(c):
+            j += 1
+            c = along_v(self._cells[i][j][k], u)
+
+        if not c[0] <= value <= sum(c):
+            return None
+
+        # Newton steps from the linear interpolation within the cell
+        v = (value - c[0]) / (sum(c) - c[0])
+
+        for n in range(0, 5):
+            step = (cubic(c, v) - value) / cubic_dt(c, v)
+            v = min(max(v - step, 0.0), 1.0)
+
+            if abs(step) < 1e-12:
+                break
+
+        return i, j, u, v
+
+    def ps(self, p, s):
+        # Enthalpy at pressure and entropy
+        cell = self._invert(1, p, s)
+
+        if cell is None:
+            self.misses += 1
+            return numpy.nan
+
+        self.hits += 1
+        i, j, u, v = cell
+
+        return bicubic(self._cells[i][j][0], u, v)
+
+    def ph(self, p, h):
+        # Temperature, entropy and density at pressure and enthalpy
+        cell = self._invert(0, p, h)
+
+        if cell is None:
+            self.misses += 1
+            return numpy.nan, numpy.nan, numpy.nan
+
+        self.hits += 1
+        i, j, u, v = cell
+        a = self._cells[i][j]
+
+        return (self._dew_temperature(i, u) + self._y_nodes[j] + v * self._dy[j], bicubic(a[1], u, v),
+                math.exp(bicubic(a[2], u, v)))
+
+    def info(self):
+        # Hits, misses and hit rate of the box
+        calls = self.hits + self.misses
+
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': float(self.hits) / calls if calls else 0.0}
+
+def surrogate(refrigerant, refrigerant_data, p_min=0.5e5, p_max=None, super_heat_max=120, resolution=(60, 40)):
+    # The surrogate of the refrigerant and box, built the first time it is asked for
+    key = vcc_state.key(refrigerant_data) + (p_min, p_max, super_heat_max, tuple(resolution))
+
+    if key not in _surrogates:
+        _surrogates[key] = Superheat(refrigerant, p_min, p_max, super_heat_max, resolution)
+
+    return _surrogates[key]
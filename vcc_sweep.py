@@ -0,0 +1,246 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import vcc_functions
+import vcc_input
+import vcc_store
+import vcc_metrics
+import multiprocessing
+import hashlib
+import numpy
+import os
+
+# Description:
+# This file runs sweeps of operating points for several refrigerants, split over worker processes.
+
+# The grid is a dict of input_data names with one value per operating point, see grid() below. The points are split
+# in contiguous chunks and every chunk is solved with Vcc.calculate_batch() in a worker process. Each worker builds
+# its own Vcc, and with it its own CoolProp AbstractState, once per refrigerant. The chunks are merged back in grid
+# order, so the result is the same as running all points serially on one Vcc per refrigerant.
+
+# With a checkpoint folder every solved chunk is appended to a vcc_store.Store in a sub folder named by the hash of
+# the inputs, refrigerants, compressor files and operating points. An interrupted sweep that is run again with the
+# same configuration then only solves the points that are missing. Points that fail are recorded with their exception
+# (errors='record') instead of aborting the sweep, they are left as nan and are solved again on the next run.
+
+# On platforms that spawn instead of fork processes (Windows) the calling script must guard the call to run()
+# with if __name__ == '__main__':
+
+# Example:
+# import vcc_sweep
+# import vcc_input
+#
+# points = vcc_sweep.grid([35 + k, 55 + k], numpy.linspace(-40, 0, 30) + k)
+# results = vcc_sweep.run(points, ['R404A', 'R448A'], ['R404A-4GE-30Y.xls', 'R448A-4GE-30Y.xls'],
+#                         vcc_input.real_system2(), jobs=8, checkpoint='results/checkpoint')
+# print(results['R448A'].cop_2())
+
+# <--- File begin --->
+
+# Vcc instances of this process, one per refrigerant
+_workers = {}
+
+def grid(co_temperatures, ev_temperatures, **overrides):
+    # Operating points in the order of the serial loops, condenser temperature outer and evaporator temperature inner
+    co, ev = numpy.meshgrid(co_temperatures, ev_temperatures, indexing='ij')
+
+    points = {'co_temperature': co.ravel(), 'ev_temperature': ev.ravel()}
+
+    # Further inputs as scalars or with one value per operating point
+    for name in overrides:
+        points[name] = overrides[name]
+
+    return points
+
+def configuration(points, refrigerants, compressor_files, input_data):
+    # Hash of everything that decides the results of a sweep, names its checkpoint folder
+    digest = hashlib.sha1()
+    digest.update(repr((sorted(input_data.items()), list(refrigerants), list(compressor_files))).encode('utf-8'))
+
+    for name in sorted(points):
+        digest.update(name.encode('utf-8'))
+        digest.update(numpy.ascontiguousarray(points[name], dtype=numpy.float).tobytes())
+
+    return digest.hexdigest()
+
+def _initialize(input_data, refrigerants, compressor_files):
+    # Build the Vcc:s of a worker process
+    _workers.clear()
+
+    for r in range(0, len(refrigerants)):
+        vcc = vcc_functions.Vcc(vcc_input.refrigerant(refrigerants[r]))
+        vcc.set_input_data(input_data)
+        vcc.set_compressor_data(compressor_files[r])
+
+        _workers[refrigerants[r]] = vcc
+
+def _solve(task):
+    # Solve one chunk of operating points for one refrigerant
+    refrigerant, indices, points, errors = task
+
+    return refrigerant, indices, _workers[refrigerant].calculate_batch(points.pop('ev_temperature'),
+                                                                       points.pop('co_temperature'),
+                                                                       errors=errors, **points)
+
+def _chunk(points, indices):
+    # The operating points of indices, scalars are passed on as they are
+    size = len(points['ev_temperature'])
+    chunk = {}
+
+    for name in points:
+        value = numpy.asarray(points[name])
+
+        if value.ndim > 0 and len(value) == size:
+            chunk[name] = value[indices]
+        else:
+            chunk[name] = value
+
+    return chunk
+
+def _merge(batch, indices):
+    # The last result of every operating point in grid order, a point solved again replaces the one that failed
+    last = len(indices) - 1 - numpy.unique(indices[::-1], return_index=True)[1]
+
+    return batch.take(last)
+
+def run(points, refrigerants, compressor_files, input_data=None, jobs=1, chunks_per_job=4, checkpoint=None,
+        errors='record'):
+    # Solve all operating points for all refrigerants, returns a dict of VccBatch:es by refrigerant name
+    if input_data is None:
+        input_data = vcc_input.manual()
+
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+
+    points = dict(points)
+    points['ev_temperature'], points['co_temperature'] = numpy.broadcast_arrays(
+        numpy.atleast_1d(points['ev_temperature']), numpy.atleast_1d(points['co_temperature']))
+    size = len(points['ev_temperature'])
+
+    # Operating points left to solve per refrigerant
+    missing = dict((refrigerant, numpy.arange(size)) for refrigerant in refrigerants)
+
+    # Solved chunks are kept in the checkpoint store as soon as they are done, a rerun of the same configuration
+    # solves only the points that are missing or failed
+    store = None
+
+    if checkpoint is not None:
+        path = os.path.join(checkpoint, configuration(points, refrigerants, compressor_files, input_data))
+        store = vcc_store.Store(path)
+
+        for refrigerant in refrigerants:
+            if store.size(refrigerant) > 0:
+                solved = store.column(refrigerant, 'index')[~store.load(refrigerant).failed()]
+                missing[refrigerant] = numpy.setdiff1d(missing[refrigerant], solved)
+
+        left = sum([len(missing[refrigerant]) for refrigerant in refrigerants])
+
+        if left < size * len(refrigerants):
+            print('Sweep resumed from ' + path + ': ' + str(left) + ' operating points left')
+
+    # Contiguous chunks keep neighbouring points, and thereby shared condenser solutions, in the same worker
+    tasks = []
+
+    for refrigerant in refrigerants:
+        if len(missing[refrigerant]) > 0:
+            splits = numpy.array_split(missing[refrigerant], max(1, min(len(missing[refrigerant]),
+                                                                         jobs * chunks_per_job)))
+            tasks += [(refrigerant, indices, _chunk(points, indices), errors) for indices in splits]
+
+    solved = dict((refrigerant, []) for refrigerant in refrigerants)
+
+    def done(refrigerant, indices, batch):
+        if store is not None:
+            store.append(refrigerant, batch, indices)
+        else:
+            solved[refrigerant].append((indices, batch))
+
+    if jobs > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(jobs, _initialize, (input_data, refrigerants, compressor_files))
+
+        try:
+            for result in pool.imap_unordered(_solve, tasks, 1):
+                done(*result)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        if len(tasks) > 0:
+            _initialize(input_data, refrigerants, compressor_files)
+
+        for task in tasks:
+            done(*_solve(task))
+
+    # Merge the chunks in grid order
+    results = {}
+
+    for refrigerant in refrigerants:
+        if store is not None:
+            batch, indices = store.load(refrigerant), store.column(refrigerant, 'index')
+        else:
+            batch = vcc_functions.concatenate_batches([b for i, b in solved[refrigerant]])
+            indices = numpy.concatenate([i for i, b in solved[refrigerant]])
+
+        results[refrigerant] = _merge(batch, indices)
+
+        if results[refrigerant].failed().any():
+            print(refrigerant + ': ' + str(numpy.sum(results[refrigerant].failed())) + ' operating points failed')
+
+    return results
+
+def _evaluate(vcc, variable, values, inputs):
+    # Solve the operating points where variable takes values and the other inputs are fixed
+    columns = dict(inputs)
+    columns[variable] = values
+
+    return vcc.calculate_batch(columns.pop('ev_temperature', vcc._ev_temperature),
+                               columns.pop('co_temperature', vcc._co_temperature), **columns)
+
+def refine(vccs, metric, variable, lower, upper, baseline=None, resolution=5, tolerance=0.05, curvature=None,
+           max_points=200, **inputs):
+    # Adaptive sweep of one input between lower and upper, returns the non-uniform grid and a dict of VccBatch:es
+    # Starts from resolution points and bisects every interval that is wider than tolerance where
+    #  - the difference of the metric to the baseline refrigerant changes sign, i.e. a crossover, or
+    #  - the error of a linear interpolation of the metric, estimated from its curvature, is above curvature
+    # curvature defaults to 0.1 % of the span of the metric. Other inputs are fixed by keyword, e.g.
+    # refine(vccs, 'cop_2', 'ev_temperature', -40 + k, 0 + k, baseline='R404A', co_temperature=35 + k)
+    x = numpy.linspace(lower, upper, resolution)
+    results = dict((name, _evaluate(vccs[name], variable, x, inputs)) for name in vccs)
+
+    while len(x) < max_points:
+        y = dict((name, vcc_metrics.evaluate(metric, results[name])) for name in vccs)
+        width = numpy.diff(x)
+        split = numpy.zeros(len(width), dtype=numpy.bool_)
+
+        for name in vccs:
+            # Crossovers with the baseline
+            if baseline is not None and name != baseline:
+                difference = y[name] - y[baseline]
+                split |= numpy.sign(difference[1:]) != numpy.sign(difference[:-1])
+
+            # Second derivative at the inner points, an interval takes the larger of its two ends
+            slope = numpy.diff(y[name]) / width
+            second = numpy.zeros(len(x))
+            second[1:-1] = numpy.abs(2 * numpy.diff(slope) / (x[2:] - x[:-2]))
+
+            limit = curvature
+            if limit is None:
+                limit = 1e-3 * (numpy.nanmax(y[name]) - numpy.nanmin(y[name]))
+
+            split |= numpy.maximum(second[1:], second[:-1]) * width ** 2 / 8 > limit
+
+        split &= width > tolerance
+
+        if not split.any():
+            break
+
+        # Bisect, as many intervals as the point budget allows
+        middle = ((x[1:] + x[:-1]) / 2)[split][:max_points - len(x)]
+        order = numpy.argsort(numpy.concatenate((x, middle)), kind='mergesort')
+
+        x = numpy.concatenate((x, middle))[order]
+
+        for name in vccs:
+            results[name] = vcc_functions.concatenate_batches(
+                [results[name], _evaluate(vccs[name], variable, middle, inputs)]).take(order)
+
+    return x, results
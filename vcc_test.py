@@ -10,7 +10,9 @@ a_y = [2, 3, 4, 5, 6]
 b_x = [0, 1, 2, 4, 6, 8]
 b_y = [6, 6, 5, 4, 3, 2]
 
-vcc_functions.data_intersect(a_x, a_y, b_x, b_y)
+x, y = vcc_functions.data_intersect(a_x, a_y, b_x, b_y)
+
+print("intersection at: " + str(x) + " " + str(y))
 
 
 
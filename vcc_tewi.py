@@ -2,6 +2,7 @@ __author__ = 'PeterE-Mac'
 
 import vcc_functions
 import vcc_input
+import vcc_export
 
 input_data = vcc_input.real_system2()
 
@@ -40,12 +41,6 @@ refs = [
     },
 ]
 
-TEWI_direct = open(str("%s%s.dat" % (folder, 'TEWI-direct')), 'w+')
-TEWI_indirect = open(str("%s%s.dat" % (folder, 'TEWI-indirect')), 'w+')
-
-TEWI_direct.write("CO2e refrigerant\n")
-TEWI_indirect.write("CO2e refrigerant\n")
-
 # Instantiate Vcc:s for each refrigerant
 for r in range(0, len(refs)):
     locals()["REF_" + refs[r]['name']] = vcc_input.refrigerant(refs[r]['name'])
@@ -114,9 +109,6 @@ for r in range(0, len(refs)):
 
     tewi = leakage + recovery + indirect
 
-    TEWI_direct.write(str("%f %s\n" % ((leakage + recovery)/1e3, refs[r]['name'])))
-    TEWI_indirect.write(str("%f %s\n" % (indirect/1e3, refs[r]['name'])))
-
     print(locals()["VCC_" + refs[r]['name']].T(3)-273.15)
 
     print("%s : %.1f  : %.1f : %.0f  : %.1f  : %.2f  : %.2f  : %.2f  : %.3f : %.0f : %.2f : %.0f   : %.1f : %.1f" %
@@ -143,3 +135,11 @@ for r in range(0, len(refs)):
     locals()["VCC_" + refs[r]['name']].calculate()
 
     print(" ")
+
+# Write the parts of TEWI in tonnes CO2e with the refrigerant names
+names = [ref['name'] for ref in refs]
+
+vcc_export.write_all([
+    (str("%s%s.dat" % (folder, 'TEWI-direct')), ["CO2e", "refrigerant"], [[ref['direct']/1e3 for ref in refs], names]),
+    (str("%s%s.dat" % (folder, 'TEWI-indirect')), ["CO2e", "refrigerant"], [[ref['indirect']/1e3 for ref in refs], names])
+])
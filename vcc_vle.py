@@ -0,0 +1,153 @@
+__author__ = 'Peter Eriksson @ KTH 2015'
+
+import vcc_input
+import vcc_cache
+import numpy
+import multiprocessing
+import CoolProp.CoolProp as CoolProp
+
+# Description:
+# This file maps the vapor liquid equilibrium of zeotropic blends over grids of composition and pressure.
+
+# For every composition the mole fractions are set once and the bubble (Q = 0) and dew (Q = 1) points are flashed at
+# all pressures, as in vcc_zeotropic. vle_map() returns one 2D array per property with a row per composition and a
+# column per pressure:
+
+# bubble        bubble temperature [K]
+# dew           dew temperature [K]
+# glide         temperature glide, dew - bubble [K]
+# latent_heat   enthalpy of evaporation, dew - bubble [J/kg]
+
+# The arrays are masked where a flash failed, e.g. close to an azeotrope or above the critical point, instead of
+# aborting the map. The compositions are split in contiguous chunks over worker processes, each with its own
+# AbstractState. The flashes of every composition are persisted with vcc_cache, keyed by backend, fluids, mole
+# fractions and pressures, so a finer or extended grid only flashes the compositions that are new. A composition with
+# a failed flash is not persisted, it is flashed again the next time.
+
+# binary() and simplex() make the composition grids of binary and ternary (or larger) blends.
+
+# Example:
+# import vcc_vle
+#
+# maps = vcc_vle.vle_map('R32&R125&R1234yf', vcc_vle.simplex(3, 20), numpy.linspace(1e5, 20e5, 40), jobs=8)
+# print(maps['glide'].max())
+
+# <--- File begin --->
+
+# Rows of the flashes of one composition
+rows = ('T_bubble', 'T_dew', 'h_bubble', 'h_dew')
+
+# AbstractState of this process
+_workers = {}
+
+def binary(resolution):
+    # Mole fraction of the first fluid from 0 to 1 in resolution steps, with the second fluid making up the rest
+    x = numpy.linspace(0, 1, resolution)
+
+    return numpy.column_stack([x, 1 - x])
+
+def simplex(fluids, resolution):
+    # All compositions of fluids with the mole fractions in steps of 1 / resolution, e.g. 231 ternary blends for 20
+    def split(left, parts):
+        if parts == 1:
+            return [[left]]
+
+        return [[i] + rest for i in range(0, left + 1) for rest in split(left - i, parts - 1)]
+
+    return numpy.array(split(resolution, fluids), dtype=numpy.float) / resolution
+
+def flash(state, fractions, pressures):
+    # The rows of one composition at the pressures, nan where a flash fails
+    values = numpy.zeros((len(rows), len(pressures)), dtype=numpy.float)
+    values[:] = numpy.nan
+
+    try:
+        state.set_mole_fractions(list(fractions))
+    except ValueError:
+        return values
+
+    for j in range(0, len(pressures)):
+        for q in (0, 1):
+            try:
+                state.update(CoolProp.PQ_INPUTS, pressures[j], q)
+                values[q, j] = state.T()
+                values[2 + q, j] = state.hmass()
+            except ValueError:
+                pass
+
+    return values
+
+def _initialize(backend, fluids, state=None):
+    # The AbstractState of a worker process
+    _workers.clear()
+    _workers['state'] = state if state is not None else CoolProp.AbstractState(backend, fluids)
+    _workers['key'] = (backend, fluids)
+
+def _solve(task):
+    # The rows of a chunk of compositions
+    fractions, pressures, cache = task
+    state = _workers['state']
+
+    values = numpy.zeros((len(fractions), len(rows), len(pressures)), dtype=numpy.float)
+
+    for i in range(0, len(fractions)):
+        if cache:
+            key = ('vle',) + _workers['key'] + (tuple([round(float(f), 12) for f in fractions[i]]),
+                                                tuple([float(p) for p in pressures]))
+            values[i] = vcc_cache.persisted(key, lambda: flash(state, fractions[i], pressures),
+                                            lambda rows: numpy.all(numpy.isfinite(rows)))
+        else:
+            values[i] = flash(state, fractions[i], pressures)
+
+    return values
+
+def vle_map(fluids, fractions, pressures, backend=None, jobs=1, chunks_per_job=4, cache=True, state=None):
+    # Masked 2D arrays of the properties by composition and pressure, with the compositions and pressures
+    # fluids is the fluid string of vcc_input, e.g. 'R125&R1234YF', and fractions has a row of mole fractions per
+    # composition. The backend defaults to the one of vcc_input. With state, an AbstractState of the fluids, e.g. a
+    # vcc_instrument.ProfilingState, the map is flashed on it in this process.
+    if backend is None:
+        backend = vcc_input.default_backend
+
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+
+    fluids = vcc_input.fluid_names(fluids, backend)
+    fractions = numpy.atleast_2d(numpy.asarray(fractions, dtype=numpy.float))
+    pressures = numpy.atleast_1d(numpy.asarray(pressures, dtype=numpy.float))
+
+    if fractions.shape[1] != len(fluids.split('&')):
+        print('VLE map: ' + str(fractions.shape[1]) + ' mole fractions for the fluids ' + fluids)
+        return None
+
+    # Contiguous chunks of compositions, the results come back in order
+    splits = numpy.array_split(numpy.arange(len(fractions)), max(1, min(len(fractions), jobs * chunks_per_job)))
+    tasks = [(fractions[indices], pressures, cache) for indices in splits]
+
+    if jobs > 1 and len(tasks) > 1 and state is None:
+        pool = multiprocessing.Pool(jobs, _initialize, (backend, fluids))
+
+        try:
+            values = numpy.concatenate(pool.map(_solve, tasks, 1))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        _initialize(backend, fluids, state)
+        values = numpy.concatenate([_solve(task) for task in tasks])
+
+    values = numpy.ma.masked_invalid(values)
+
+    failed = int(numpy.sum(numpy.ma.getmaskarray(values)[:, 0:2].any(axis=1)))
+
+    if failed > 0:
+        print('VLE map: ' + str(failed) + ' of ' + str(len(fractions) * len(pressures)) + ' points failed')
+
+    return {
+        'fractions': fractions,
+        'pressures': pressures,
+        'bubble': values[:, 0],
+        'dew': values[:, 1],
+        'glide': values[:, 1] - values[:, 0],
+        'latent_heat': values[:, 3] - values[:, 2]
+    }
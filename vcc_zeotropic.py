@@ -2,45 +2,48 @@ __author__ = 'Peter Eriksson @ KTH 2015'
 
 import numpy as numpy
 import CoolProp.CoolProp as CoolProp
+import vcc_export
+import vcc_instrument
+import vcc_vle
 
 # Description:
 # This file illustrates the zeotropic behaviour of temperature glide
 
-# Initiate CoolProp with AbstractState meaning low-level interface
-refrigerant = CoolProp.AbstractState("REFPROP","R125&R1234yf")
-pressure = 101.325e3
-
-k = 273.15
-x = numpy.linspace(0,1,25)
+# Record the latency of the flashes, written to zeotropic_profile.json. The map is then flashed on one profiled
+# AbstractState in this process and not taken from the cache.
+profile = False
 
-# Open files
-file_1 = open('../../Report/LaTeX/data/zeotropic_bubble.dat', 'w+')
-file_2 = open('../../Report/LaTeX/data/zeotropic_dew.dat', 'w+')
-file_3 = open('../../Report/LaTeX/data/zeotropic_diff.dat', 'w+')
+refrigerant = None
 
-file_1.write("mixture temperature\n")
-file_2.write("mixture temperature\n")
-file_3.write("mixture temperature\n")
+if profile:
+    # Initiate CoolProp with AbstractState meaning low-level interface
+    refrigerant = vcc_instrument.ProfilingState(CoolProp.AbstractState("REFPROP", "R125&R1234yf"))
 
-for i in range(0, len(x)):
+pressure = 101.325e3
 
-    # Set mole fractions
-    refrigerant.set_mole_fractions([x[i], 1-x[i]])
+k = 273.15
+x = numpy.linspace(0,1,25)
 
-    refrigerant.update(CoolProp.PQ_INPUTS, pressure, 0)
-    file_1.write(str("%f %f\n" % (x[i], refrigerant.T()-k)))
+# Bubble and dew points of the mixtures, see vcc_vle
+maps = vcc_vle.vle_map("R125&R1234yf", vcc_vle.binary(len(x)), [pressure], backend="REFPROP", cache=not profile,
+                       state=refrigerant)
 
-    if x[i]==0.5:
-        file_3.write(str("%f %f\n" % (x[i], refrigerant.T()-k)))
+# Failed flashes are left as nan
+t_bubble = maps['bubble'][:, 0].filled(numpy.nan)-k
+t_dew = maps['dew'][:, 0].filled(numpy.nan)-k
 
-    refrigerant.update(CoolProp.PQ_INPUTS, pressure, 1)
-    file_2.write(str("%f %f\n" % (x[i], refrigerant.T()-k)))
+# The glide at the equal mixture
+middle = x == 0.5
 
-    if x[i]==0.5:
-        file_3.write(str("%f %f\n" % (x[i], refrigerant.T()-k)))
+folder = '../../Report/LaTeX/data/'
+header = ["mixture", "temperature"]
 
+vcc_export.write_all([
+    (folder + 'zeotropic_bubble.dat', header, [x, t_bubble]),
+    (folder + 'zeotropic_dew.dat', header, [x, t_dew]),
+    (folder + 'zeotropic_diff.dat', header, [numpy.append(x[middle], x[middle]),
+                                             numpy.append(t_bubble[middle], t_dew[middle])])
+])
 
-# Close files
-file_1.close()
-file_2.close()
-file_3.close()
\ No newline at end of file
+if profile:
+    refrigerant.save('zeotropic_profile.json')